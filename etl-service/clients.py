@@ -1,6 +1,7 @@
 from __future__ import annotations
 import os
-from typing import Any, Optional
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Optional
 import httpx
 
 TEAMS_API_BASE   = os.getenv("TEAMS_API_BASE", "http://teams-service:8082").rstrip("/")
@@ -12,7 +13,14 @@ PLAYERS_API_TOKEN = (os.getenv("PLAYERS_API_TOKEN", "") or "").strip()
 MATCHES_API_TOKEN = (os.getenv("MATCHES_API_TOKEN", "") or "").strip()
 
 PAGE_SIZE = int(os.getenv("PAGE_SIZE", "200"))
-MAX_AUTOPAGES = int(os.getenv("MAX_AUTOPAGES", "20"))
+# Tope explícito de páginas por fuente (0 = sin tope). Si se alcanza se avisa
+# y la descarga cuenta como incompleta (no se borran ids ausentes).
+MAX_AUTOPAGES = int(os.getenv("MAX_AUTOPAGES", "10000"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("ETL_HTTP_MAX_CONNECTIONS", "10"))
+HTTP_TIMEOUT = float(os.getenv("ETL_HTTP_TIMEOUT", "15"))
+# Menor que el keep-alive de los upstreams: la descarga puede quedar en pausa
+# (cola llena) y no conviene reusar una conexión que el servidor ya cerró
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("ETL_HTTP_KEEPALIVE_EXPIRY", "2"))
 
 def _hdr(tok: str) -> dict[str, str]:
     if not tok:
@@ -33,46 +41,95 @@ def _as_list_items(data: Any) -> list[dict[str, Any]]:
                 if isinstance(vv, list): return vv
     return []
 
-async def _get_all_pages(url: str, headers: dict, params_flat: dict[str, Any] | None = None) -> list[dict[str, Any]]:
-    acc: list[dict[str, Any]] = []
-    async with httpx.AsyncClient(timeout=15) as cx:
-
-        page = 0
-        while True:
-            params = {"page": page, "size": PAGE_SIZE}
-            if params_flat: params.update(params_flat)
-            r = await cx.get(url, headers=headers, params=params)
-            if r.status_code == 404:
-
-                rr = await cx.get(url, headers=headers, params=params_flat or {})
-                rr.raise_for_status()
-                return _as_list_items(rr.json())
-            r.raise_for_status()
-            data = r.json()
-            chunk = _as_list_items(data)
-            if not chunk:
-                break
-            acc.extend(chunk)
-            if isinstance(data, dict):
-                if data.get("last") is True: break
-                number = data.get("number"); total_pages = data.get("totalPages")
-                if isinstance(number, int) and isinstance(total_pages, int) and number >= (total_pages - 1):
-                    break
-            if len(chunk) < PAGE_SIZE: break
-            page += 1
-            if page >= MAX_AUTOPAGES: break
-    return acc
-
-
-async def fetch_teams() -> list[dict[str, Any]]:
-    return await _get_all_pages(f"{TEAMS_API_BASE}/api/teams", _hdr(TEAMS_API_TOKEN))
-
-async def fetch_players(team_id: Optional[str] = None) -> list[dict[str, Any]]:
+@dataclass
+class Extract:
+    """Estado de la descarga de una fuente (lo llena iter_pages)."""
+    name: str
+    pages: int = 0
+    items: int = 0
+    complete: bool = True   # False si se cortó en MAX_AUTOPAGES o falló
+
+# Un AsyncClient compartido por las tres fuentes durante la corrida
+_client: Optional[httpx.AsyncClient] = None
+
+def client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY),
+        )
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def iter_pages(url: str, headers: dict, params_flat: dict[str, Any] | None, state: Extract) -> AsyncIterator[list[dict[str, Any]]]:
+    """Páginas del upstream de a una (la siguiente se pide cuando se consumió la anterior)."""
+    cx = client()
+    page = 0
+    prev_first: Any = None
+    while True:
+        params = {"page": page, "size": PAGE_SIZE}
+        if params_flat: params.update(params_flat)
+        r = await cx.get(url, headers=headers, params=params)
+        if r.status_code == 404:
+
+            rr = await cx.get(url, headers=headers, params=params_flat or {})
+            rr.raise_for_status()
+            chunk = _as_list_items(rr.json())
+            state.pages += 1; state.items += len(chunk)
+            yield chunk
+            return
+        r.raise_for_status()
+        data = r.json()
+        chunk = _as_list_items(data)
+        if not chunk:
+            return
+        # Un upstream que ignora 'page' devuelve siempre la misma: se corta ahí
+        first = chunk[0].get("id") or chunk[0].get("Id") if isinstance(chunk[0], dict) else None
+        if page > 0 and first is not None and first == prev_first:
+            print(f"[ETL] {state.name}: la página {page} repite la anterior; se detiene la paginación")
+            return
+        prev_first = first
+        state.pages += 1; state.items += len(chunk)
+        yield chunk
+        if isinstance(data, dict):
+            if data.get("last") is True: return
+            number = data.get("number"); total_pages = data.get("totalPages")
+            if isinstance(number, int) and isinstance(total_pages, int) and number >= (total_pages - 1):
+                return
+        if len(chunk) < PAGE_SIZE: return
+        page += 1
+        if MAX_AUTOPAGES and page >= MAX_AUTOPAGES:
+            state.complete = False
+            print(f"[ETL] {state.name}: se alcanzó MAX_AUTOPAGES={MAX_AUTOPAGES} ({state.items} items); "
+                  "descarga incompleta, no se borran ausentes")
+            return
+
+
+def teams_pages(state: Extract) -> AsyncIterator[list[dict[str, Any]]]:
+    return iter_pages(f"{TEAMS_API_BASE}/api/teams", _hdr(TEAMS_API_TOKEN), None, state)
+
+def players_pages(state: Extract, team_id: Optional[str] = None) -> AsyncIterator[list[dict[str, Any]]]:
     q = {"teamId": team_id} if team_id else None
-    return await _get_all_pages(f"{PLAYERS_API_BASE}/api/players", _hdr(PLAYERS_API_TOKEN), q)
+    return iter_pages(f"{PLAYERS_API_BASE}/api/players", _hdr(PLAYERS_API_TOKEN), q, state)
 
-async def fetch_matches(from_: Optional[str] = None, to: Optional[str] = None) -> list[dict[str, Any]]:
+def matches_pages(state: Extract, from_: Optional[str] = None, to: Optional[str] = None) -> AsyncIterator[list[dict[str, Any]]]:
     q: dict[str, Any] = {}
     if from_: q["from"] = from_
     if to:    q["to"]   = to
-    return await _get_all_pages(f"{MATCHES_API_BASE}/api/matches", _hdr(MATCHES_API_TOKEN), q)
+    return iter_pages(f"{MATCHES_API_BASE}/api/matches", _hdr(MATCHES_API_TOKEN), q, state)
+
+async def fetch_match_events(match_id: str) -> Optional[dict[str, Any]]:
+    """Anotaciones y faltas de un partido ({scoreEvents, fouls}); None si el partido ya no existe."""
+    r = await client().get(f"{MATCHES_API_BASE}/api/matches/{match_id}/events", headers=_hdr(MATCHES_API_TOKEN))
+    if r.status_code == 404:
+        return None
+    r.raise_for_status()
+    data = r.json()
+    return data if isinstance(data, dict) else None
@@ -1,69 +1,174 @@
 from __future__ import annotations
 import os, asyncio
-from typing import Any
-from pymongo import MongoClient, UpdateOne, ASCENDING
-from clients import fetch_teams, fetch_players, fetch_matches
-from transforms import normalize_team, normalize_player, normalize_match, compute_team_stats
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING
+from clients import Extract, teams_pages, players_pages, matches_pages, close_client
+from loader import CollectionSync, SyncResult, ensure_tombstone_indexes
+from facts import MatchFacts, ensure_fact_indexes
+from transforms import normalize_team, normalize_player, normalize_match
+from teamstats import TeamStatsDelta, ensure_stats_indexes, mark_dirty
+from scheduler import Job, Scheduler
 
 MONGO_URL  = os.getenv("MONGO_URL", "mongodb://localhost:27017")
 REPORTS_DB = os.getenv("REPORTS_DB", "reports")
-INTERVAL   = int(os.getenv("ETL_INTERVAL_SECONDS", "120"))
 RUN_ONCE   = os.getenv("RUN_ONCE", "0") == "1"
+# Páginas en cola entre extracción y carga, por fuente: acota la memoria
+QUEUE_DEPTH = int(os.getenv("ETL_QUEUE_DEPTH", "8"))
 
-def upsert_many(col, docs: list[dict], key: str):
-    if not docs: return 0
-    ops = [UpdateOne({key: d[key]}, {"$set": d}, upsert=True) for d in docs if d.get(key)]
-    if not ops: return 0
-    res = col.bulk_write(ops, ordered=False)
-    return (res.upserted_count or 0) + (res.modified_count or 0)
+Page = list[dict[str, Any]]
 
-def ensure_indexes(db):
-    db.teams.create_index([("id", ASCENDING)], unique=True)
-    db.players.create_index([("id", ASCENDING)], unique=True)
-    db.players.create_index([("teamId", ASCENDING)])
-    db.matches.create_index([("id", ASCENDING)], unique=True)
-    db.team_stats.create_index([("teamId", ASCENDING)], unique=True)
+async def mark_loaded(db, dataset: str):
+    # report-service lee etl_meta para decidir si el read-model está fresco
+    await db.etl_meta.update_one(
+        {"_id": dataset}, {"$set": {"updatedAt": datetime.now(timezone.utc)}}, upsert=True
+    )
+
+async def ensure_indexes(db):
+    await db.teams.create_index([("id", ASCENDING)], unique=True)
+    await db.players.create_index([("id", ASCENDING)], unique=True)
+    await db.players.create_index([("teamId", ASCENDING)])
+    await db.matches.create_index([("id", ASCENDING)], unique=True)
+    # date es datetime UTC: rangos from/to (history) y partidos por equipo usan índice.
+    # Mismas claves que repo.PAGE_INDEXES de report-service (create_index es idempotente)
+    await db.matches.create_index([("date", ASCENDING), ("status", ASCENDING)])
+    await db.matches.create_index([("homeTeamId", ASCENDING), ("date", ASCENDING), ("id", ASCENDING)])
+    await db.matches.create_index([("awayTeamId", ASCENDING), ("date", ASCENDING), ("id", ASCENDING)])
+    await db.team_stats.create_index([("teamId", ASCENDING)], unique=True)
+    await ensure_tombstone_indexes(db)
+    await ensure_fact_indexes(db)
+    await ensure_stats_indexes(db)
+
+# -------------------------
+# Pipeline: extracción -> cola acotada -> transformación + carga por página
+# -------------------------
+async def extract(pages: AsyncIterator[Page], state: Extract, q: asyncio.Queue):
+    """Productor: empuja páginas a la cola (se bloquea si la carga va atrás). None = fin."""
+    try:
+        async for page in pages:
+            await q.put(page)
+    except BaseException:
+        # Sin centinela: el TaskGroup cancela al consumidor
+        state.complete = False
+        raise
+    await q.put(None)
+
+async def load(
+    db, name: str, key: str, state: Extract, q: asyncio.Queue,
+    transform: Callable[[Page], Page], on_docs: Optional[Callable[[Page], Awaitable[None]]] = None,
+) -> SyncResult:
+    """Consumidor: transforma cada página y la carga sin esperar a la descarga completa."""
+    async with CollectionSync(db, name, key) as sync:
+        while (page := await q.get()) is not None:
+            docs = await sync.add(transform(page))
+            if on_docs:
+                await on_docs(docs)
+        res = await sync.finish(state.complete)
+    await mark_loaded(db, name)
+    print(f"[ETL] {name} {res}, fetched: {state.items} en {state.pages} páginas")
+    return res
+
+async def pipeline(
+    db, name: str, key: str, pages: Callable[[Extract], AsyncIterator[Page]], transform: Callable[[Page], Page],
+) -> SyncResult:
+    """Extracción y carga de una fuente, en paralelo."""
+    state = Extract(name)
+    q: asyncio.Queue = asyncio.Queue(QUEUE_DEPTH)
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(extract(pages(state), state, q))
+        loaded = tg.create_task(load(db, name, key, state, q, transform))
+    return loaded.result()
+
+async def teams_map(db) -> dict[str, str]:
+    return {t["id"]: t.get("name", "") async for t in db.teams.find({}, {"_id": 0, "id": 1, "name": 1})}
+
+# -------------------------
+# Jobs: uno por entidad, cada uno con su cadencia (scheduler.py).
+# Devuelven cuántos documentos cambiaron.
+# -------------------------
+async def run_teams(db) -> int:
+    def transform(page: Page) -> Page:
+        return [normalize_team(t) for t in page if (t.get("id") or t.get("Id"))]
+    return (await pipeline(db, "teams", "id", teams_pages, transform)).changes
+
+async def run_players(db) -> int:
+    # teamName sale de los equipos ya cargados (job teams)
+    team_name_by_id = await teams_map(db)
+
+    def transform(page: Page) -> Page:
+        return [normalize_player(p, team_name_by_id) for p in page if (p.get("id") or p.get("Id"))]
+    return (await pipeline(db, "players", "id", players_pages, transform)).changes
+
+async def run_matches(db) -> int:
+    """Partidos y lo que depende de sus cambios: team_stats (deltas) y eventos/faltas."""
+    team_name_by_id = await teams_map(db)
+    st = Extract("matches")
+    q: asyncio.Queue = asyncio.Queue(QUEUE_DEPTH)
+    # team_stats por deltas de los partidos cambiados
+    stats = await TeamStatsDelta(db).open()
+    # Eventos y faltas: se piden mientras siguen llegando páginas de partidos
+    facts = await MatchFacts(db).open()
+
+    def transform(page: Page) -> Page:
+        return [normalize_match(m) for m in page if (m.get("Id") or m.get("id"))]
+
+    async def on_matches(docs: Page) -> None:
+        facts.want(docs)
+        await stats.add(docs)
+
+    async def load_matches() -> SyncResult:
+        try:
+            return await load(db, "matches", "id", st, q, transform, on_matches)
+        finally:
+            facts.close()
+
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(extract(matches_pages(st), st, q))
+        loaded = tg.create_task(load_matches())
+        tg.create_task(facts.run())
+
+    await stats.finish(st.complete, team_name_by_id)
+    await mark_loaded(db, "team_stats")
+    print(f"[ETL] team_stats {stats}")
+
+    r = await facts.finish(st.complete)
+    await mark_loaded(db, "player_stats")
+    print(f"[ETL] match facts {facts}; player_stats {r}")
+    # Faltas/anotaciones nuevas de un partido en juego cambian player_stats sin cambiar el partido
+    return loaded.result().changes + r.changes
+
+JOBS = [
+    # nombre, función, (intervalo base, mínimo, máximo) por defecto en segundos, jobs a adelantar si hubo cambios
+    Job("teams", run_teams, 600, 120, 3600, dependents=("players", "matches")),
+    Job("players", run_players, 300, 60, 1800),
+    Job("matches", run_matches, 60, 15, 600, takeover=mark_dirty,
+        collections=("matches", "etl_match_stats", "etl_match_facts", "player_stats")),
+]
 
 async def run_once(db):
+    """Todos los jobs una vez (RUN_ONCE=1): equipos primero, después jugadores y partidos en paralelo."""
     print("[ETL] start run")
-    teams_raw = await fetch_teams()
-    teams = [normalize_team(t) for t in teams_raw if (t.get("id") or t.get("Id"))]
-    team_name_by_id = {t["id"]: t["name"] for t in teams}
-    n1 = upsert_many(db.teams, teams, "id")
-    print(f"[ETL] teams upserted/updated: {n1}, total fetched: {len(teams)}")
-
-    players_raw = await fetch_players()
-    players = [normalize_player(p, team_name_by_id) for p in players_raw if (p.get("id") or p.get("Id"))]
-    n2 = upsert_many(db.players, players, "id")
-    print(f"[ETL] players upserted/updated: {n2}, total fetched: {len(players)}")
-
-    matches_raw = await fetch_matches()
-    matches = [normalize_match(m) for m in matches_raw if (m.get("Id") or m.get("id"))]
-    n3 = upsert_many(db.matches, matches, "id")
-    print(f"[ETL] matches upserted/updated: {n3}, total fetched: {len(matches)}")
-
-    stats = compute_team_stats(matches)
-    stats_docs = []
-    for tid, s in stats.items():
-        s["teamName"] = team_name_by_id.get(tid, s.get("teamName","") or tid)
-        stats_docs.append(s)
-    n4 = upsert_many(db.team_stats, stats_docs, "teamId")
-    print(f"[ETL] team_stats upserted/updated: {n4}, total computed: {len(stats_docs)}")
+    try:
+        await run_teams(db)
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(run_players(db))
+            tg.create_task(run_matches(db))
+    finally:
+        await close_client()
     print("[ETL] end run")
 
 async def main():
-    client = MongoClient(MONGO_URL)
+    client = AsyncIOMotorClient(MONGO_URL)
     db = client[REPORTS_DB]
-    ensure_indexes(db)
+    await ensure_indexes(db)
     if RUN_ONCE:
         await run_once(db)
         return
-    while True:
-        try:
-            await run_once(db)
-        except Exception as e:
-            print("[ETL] ERROR:", e)
-        await asyncio.sleep(INTERVAL)
+    try:
+        await Scheduler(db, JOBS).run_forever()
+    finally:
+        await close_client()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,191 @@
+from __future__ import annotations
+import asyncio, os
+from typing import Any, Iterable, Optional
+import httpx
+from pymongo import UpdateOne, ASCENDING
+from clients import fetch_match_events
+from loader import HASH_FIELD, MAX_DELETE_FRACTION, WRITE_CHUNK, CollectionSync, SyncResult, _index
+from transforms import normalize_score_event, normalize_foul
+
+# Hechos por partido: anotaciones (score_events) y faltas (fouls) con su
+# jugador. Solo se piden al matches-service los partidos nuevos o cambiados
+# desde la última carga de sus eventos (etl_match_facts guarda matchId -> hash
+# del partido cargado); player_stats se recalcula solo para los jugadores
+# tocados.
+
+# Descargas de eventos en vuelo a la vez
+FACTS_CONCURRENCY = int(os.getenv("ETL_FACTS_CONCURRENCY", "8"))
+# Estados en los que se vuelven a pedir los eventos en cada corrida: una falta
+# no cambia el partido (ni su hash) mientras se juega
+REFRESH_STATUSES = {s.strip() for s in os.getenv("ETL_FACTS_REFRESH_STATUSES", "Live").split(",") if s.strip()}
+
+MARKERS = "etl_match_facts"
+
+async def ensure_fact_indexes(db):
+    for col in (db.score_events, db.fouls):
+        await col.create_index([("id", ASCENDING)], unique=True)
+        await col.create_index([("matchId", ASCENDING)])
+        await col.create_index([("playerId", ASCENDING), ("matchId", ASCENDING)])
+    await db.player_stats.create_index([("playerId", ASCENDING)], unique=True)
+    await db[MARKERS].create_index([("matchId", ASCENDING)], unique=True)
+
+def _type_key(t: str) -> str:
+    # Claves de subdocumento: sin '.' ni '$' inicial
+    return (t or "Sin tipo").replace(".", "_").lstrip("$") or "Sin tipo"
+
+async def player_stats_docs(db, player_ids: list[str]) -> list[dict[str, Any]]:
+    """Estadísticas de los jugadores pedidos, agregadas en Mongo desde los hechos."""
+    rows: dict[str, dict[str, Any]] = {}
+    games: dict[str, set[str]] = {}
+
+    def row(pid: str) -> dict[str, Any]:
+        r = rows.get(pid)
+        if r is None:
+            r = rows[pid] = {"playerId": pid, "games": 0, "points": 0, "scores": 0, "fouls": 0, "foulsByType": {}}
+            games[pid] = set()
+        return r
+
+    match = {"$match": {"playerId": {"$in": player_ids}}}
+    async for g in db.score_events.aggregate([match, {"$group": {
+        "_id": "$playerId",
+        "points": {"$sum": "$points"},
+        "scores": {"$sum": {"$cond": [{"$gt": ["$points", 0]}, 1, 0]}},
+        "matches": {"$addToSet": "$matchId"},
+    }}]):
+        r = row(g["_id"])
+        r["points"] = g["points"]; r["scores"] = g["scores"]
+        games[g["_id"]].update(g["matches"])
+    async for g in db.fouls.aggregate([match, {"$group": {
+        "_id": {"p": "$playerId", "t": "$type"},
+        "n": {"$sum": 1},
+        "matches": {"$addToSet": "$matchId"},
+    }}]):
+        pid = g["_id"]["p"]
+        r = row(pid)
+        r["fouls"] += g["n"]
+        k = _type_key(g["_id"].get("t"))
+        r["foulsByType"][k] = r["foulsByType"].get(k, 0) + g["n"]
+        games[pid].update(g["matches"])
+    # Partidos jugados = partidos con al menos una anotación o falta del jugador
+    for pid, r in rows.items():
+        r["games"] = len(games[pid])
+        r["pointsPerGame"] = round(r["points"] / r["games"], 2) if r["games"] else 0.0
+    return list(rows.values())
+
+
+class MatchFacts:
+    """
+    Etapa de eventos del pipeline:
+
+        facts = await MatchFacts(db).open()
+        ... facts.want(docs) por página de partidos (docs con HASH_FIELD) ...
+        await facts.run()              # FACTS_CONCURRENCY descargas en vuelo
+        facts.close()                  # cuando ya no llegan partidos
+        res = await facts.finish(complete)
+
+    Las marcas de etl_match_facts se escriben al final, después de player_stats:
+    si la corrida se corta, los partidos se vuelven a pedir en la siguiente.
+    """
+    def __init__(self, db):
+        self.db = db
+        self._idx = _index(db[MARKERS], "matchId")
+        self._markers: dict[str, Optional[int]] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._seen: set[str] = set()
+        self._done: dict[str, int] = {}
+        self.players: set[str] = set()
+        self.fetched = 0
+        self.failed = 0
+        self.missing = 0
+        self.gone = 0
+
+    async def open(self) -> "MatchFacts":
+        self._markers = await self._idx.load()
+        return self
+
+    def want(self, matches: Iterable[dict[str, Any]]) -> None:
+        for m in matches:
+            mid, h = m["id"], m[HASH_FIELD]
+            self._seen.add(mid)
+            if self._markers.get(mid) != h or m.get("status") in REFRESH_STATUSES:
+                self._queue.put_nowait((mid, h))
+
+    def close(self) -> None:
+        for _ in range(FACTS_CONCURRENCY):
+            self._queue.put_nowait(None)
+
+    async def run(self) -> None:
+        await asyncio.gather(*(self._worker() for _ in range(FACTS_CONCURRENCY)))
+
+    async def _worker(self) -> None:
+        while (item := await self._queue.get()) is not None:
+            await self._load(*item)
+
+    async def _load(self, match_id: str, h: int) -> None:
+        try:
+            data = await fetch_match_events(match_id)
+        except httpx.HTTPError as e:
+            # Sin marca: se reintenta en la próxima corrida
+            self.failed += 1
+            if self.failed <= 3:
+                print(f"[ETL] eventos del partido {match_id}: {e!r}")
+            return
+        if data is None:
+            self.missing += 1
+            return
+        events = [normalize_score_event(e, match_id) for e in data.get("scoreEvents") or data.get("ScoreEvents") or []]
+        fouls = [normalize_foul(f, match_id) for f in data.get("fouls") or data.get("Fouls") or []]
+        await self._replace(match_id, events, fouls)
+        self.players.update(d["playerId"] for d in events + fouls if d["playerId"])
+        self._done[match_id] = h
+        self.fetched += 1
+
+    async def _replace(self, match_id: str, events: list[dict[str, Any]], fouls: list[dict[str, Any]]) -> None:
+        """Reemplaza los hechos del partido; los jugadores que tenía antes también cuentan como tocados."""
+        for col, docs in ((self.db.score_events, events), (self.db.fouls, fouls)):
+            self.players.update(p for p in await col.distinct("playerId", {"matchId": match_id}) if p)
+            await col.delete_many({"matchId": match_id})
+            if docs:
+                await col.insert_many(docs, ordered=False)
+
+    async def finish(self, complete: bool) -> SyncResult:
+        """Borra los hechos de partidos desaparecidos, recalcula player_stats y escribe las marcas."""
+        gone = [k for k in self._markers if k not in self._seen] if complete else []
+        if gone and len(gone) > MAX_DELETE_FRACTION * len(self._markers):
+            print(f"[ETL] match facts: desaparecieron {len(gone)}/{len(self._markers)} partidos; no se borra nada")
+            gone = []
+        self.gone = len(gone)
+        for i in range(0, len(gone), WRITE_CHUNK):
+            await self._drop(gone[i:i + WRITE_CHUNK])
+
+        players = sorted(self.players)
+        async with CollectionSync(self.db, "player_stats", "playerId") as sync:
+            for i in range(0, len(players), WRITE_CHUNK):
+                chunk = players[i:i + WRITE_CHUNK]
+                docs = await sync.add(await player_stats_docs(self.db, chunk))
+                # Jugadores que se quedaron sin hechos: fuera de player_stats
+                have = {d["playerId"] for d in docs}
+                await sync.remove([p for p in chunk if p not in have])
+            res = await sync.finish(False)
+
+        done = list(self._done.items())
+        for i in range(0, len(done), WRITE_CHUNK):
+            await self.db[MARKERS].bulk_write(
+                [UpdateOne({"matchId": k}, {"$set": {HASH_FIELD: h}}, upsert=True) for k, h in done[i:i + WRITE_CHUNK]],
+                ordered=False,
+            )
+        for i in range(0, len(gone), WRITE_CHUNK):
+            await self.db[MARKERS].delete_many({"matchId": {"$in": gone[i:i + WRITE_CHUNK]}})
+        self._markers.update(done)
+        for k in gone:
+            self._markers.pop(k, None)
+        return res
+
+    async def _drop(self, match_ids: list[str]) -> None:
+        for col in (self.db.score_events, self.db.fouls):
+            self.players.update(p for p in await col.distinct("playerId", {"matchId": {"$in": match_ids}}) if p)
+            await col.delete_many({"matchId": {"$in": match_ids}})
+
+    def __str__(self) -> str:
+        return (f"fetched={self.fetched} failed={self.failed} missing={self.missing} "
+                f"players={len(self.players)} gone={self.gone}")
@@ -0,0 +1,185 @@
+from __future__ import annotations
+import asyncio, hashlib, json, os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+from pymongo import UpdateOne, ASCENDING
+
+# Carga incremental: cada documento guarda el hash de su contenido normalizado
+# y el ETL recuerda id -> hash por colección. Solo se escriben los nuevos o
+# cambiados; los ids que desaparecieron del upstream se borran y dejan una
+# lápida en etl_tombstones.
+
+HASH_FIELD = "contentHash"
+# Si en una corrida desaparece más que esta fracción de ids, no se borra nada
+# (upstream vacío o a medias por un error, no bajas reales)
+MAX_DELETE_FRACTION = float(os.getenv("ETL_MAX_DELETE_FRACTION", "0.5"))
+TOMBSTONE_TTL_SECONDS = int(os.getenv("ETL_TOMBSTONE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Operaciones por bulk_write (una escritura en vuelo por colección)
+WRITE_CHUNK = int(os.getenv("ETL_WRITE_CHUNK", "1000"))
+
+def content_hash(d: dict[str, Any]) -> int:
+    """Hash estable (independiente del orden de claves) como int64 con signo (BSON long)."""
+    raw = json.dumps(d, sort_keys=True, default=str, separators=(",", ":")).encode()
+    return int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "big", signed=True)
+
+@dataclass
+class SyncResult:
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+
+    @property
+    def changes(self) -> int:
+        return self.new + self.changed + self.deleted
+
+    def __str__(self) -> str:
+        return f"new={self.new} changed={self.changed} unchanged={self.unchanged} deleted={self.deleted}"
+
+class HashIndex:
+    """id -> hash de lo que hay en Mongo para una colección; se lee una vez y se mantiene en memoria."""
+    def __init__(self, col, key: str):
+        self.col = col
+        self.key = key
+        self.hashes: Optional[dict[str, Optional[int]]] = None
+
+    async def load(self) -> dict[str, Optional[int]]:
+        if self.hashes is None:
+            # Documentos previos a la carga incremental no tienen hash: cuentan como cambiados
+            hashes: dict[str, Optional[int]] = {}
+            async for d in self.col.find({}, {"_id": 0, self.key: 1, HASH_FIELD: 1}):
+                if d.get(self.key):
+                    hashes[d[self.key]] = d.get(HASH_FIELD)
+            self.hashes = hashes
+        return self.hashes
+
+    def reset(self) -> None:
+        self.hashes = None
+
+_indexes: dict[str, HashIndex] = {}
+
+def _index(col, key: str) -> HashIndex:
+    # pymongo y motor crean un objeto Collection por acceso: se compara por igualdad (db + nombre)
+    idx = _indexes.get(col.name)
+    if idx is None or idx.col != col:
+        idx = _indexes[col.name] = HashIndex(col, key)
+    return idx
+
+def reset_indexes(*names: str) -> None:
+    """Olvida los índices en memoria de esas colecciones (otro proceso pudo escribirlas)."""
+    for name in names:
+        idx = _indexes.get(name)
+        if idx is not None:
+            idx.reset()
+
+async def ensure_tombstone_indexes(db):
+    await db.etl_tombstones.create_index([("collection", ASCENDING), ("deletedAt", ASCENDING)])
+    await db.etl_tombstones.create_index("deletedAt", expireAfterSeconds=TOMBSTONE_TTL_SECONDS)
+
+
+class CollectionSync:
+    """
+    Carga por tandas de una colección mientras llegan las páginas:
+
+        async with CollectionSync(db, "players", "id") as sync:
+            for page in ...: await sync.add(docs)
+            result = await sync.finish(complete)
+
+    Las escrituras van en bulk_write de WRITE_CHUNK operaciones; la siguiente
+    tanda se arma mientras la anterior se escribe. `finish(complete=True)`
+    borra los ids que no vinieron en esta corrida.
+    """
+    def __init__(self, db, name: str, key: str):
+        self.db = db
+        self.name = name
+        self.key = key
+        self.col = db[name]
+        self.result = SyncResult()
+        self._idx = _index(self.col, key)
+        self._hashes: dict[str, Optional[int]] = {}
+        self._seen: set[str] = set()
+        self._ops: list[UpdateOne] = []
+        self._written: dict[str, int] = {}
+        self._inflight: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "CollectionSync":
+        self._hashes = await self._idx.load()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            if self._inflight is not None:
+                self._inflight.cancel()
+            # Escritura a medias: se relee de Mongo en la próxima corrida
+            self._idx.reset()
+
+    async def add(self, docs: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Encola los docs nuevos/cambiados; devuelve los docs únicos de la página,
+        cada uno con su HASH_FIELD (lo usan las etapas que dependen de cambios).
+        """
+        unique = []
+        for d in docs:
+            k = d.get(self.key)
+            if not k or k in self._seen:
+                continue
+            self._seen.add(k)
+            unique.append(d)
+            h = d[HASH_FIELD] = content_hash(d)
+            if k in self._hashes:
+                if self._hashes[k] == h:
+                    self.result.unchanged += 1
+                    continue
+                self.result.changed += 1
+            else:
+                self.result.new += 1
+            self._ops.append(UpdateOne({self.key: k}, {"$set": d}, upsert=True))
+            self._written[k] = h
+        if len(self._ops) >= WRITE_CHUNK:
+            await self._flush()
+        return unique
+
+    async def _flush(self) -> None:
+        await self._wait()
+        if not self._ops:
+            return
+        ops, written = self._ops, self._written
+        self._ops, self._written = [], {}
+
+        async def write() -> None:
+            await self.col.bulk_write(ops, ordered=False)
+            self._hashes.update(written)
+        self._inflight = asyncio.create_task(write())
+
+    async def _wait(self) -> None:
+        if self._inflight is not None:
+            task, self._inflight = self._inflight, None
+            await task
+
+    async def finish(self, complete: bool) -> SyncResult:
+        await self._flush()
+        await self._wait()
+        gone = [k for k in self._hashes if k not in self._seen] if complete else []
+        if gone and len(gone) > MAX_DELETE_FRACTION * len(self._hashes):
+            print(f"[ETL] {self.name}: desaparecieron {len(gone)}/{len(self._hashes)} ids; no se borra nada (ETL_MAX_DELETE_FRACTION)")
+            gone = []
+        await self.remove(gone)
+        return self.result
+
+    async def remove(self, keys: list[str]) -> None:
+        """Borra `keys` de la colección y del índice, dejando lápida (finish lo usa con los ausentes)."""
+        keys = [k for k in keys if k in self._hashes]
+        if not keys:
+            return
+        now = datetime.now(timezone.utc)
+        for i in range(0, len(keys), WRITE_CHUNK):
+            chunk = keys[i:i + WRITE_CHUNK]
+            await self.col.delete_many({self.key: {"$in": chunk}})
+            await self.db.etl_tombstones.insert_many(
+                [{"collection": self.name, "key": k, "deletedAt": now} for k in chunk]
+            )
+        for k in keys:
+            del self._hashes[k]
+            self._seen.discard(k)
+        self.result.deleted += len(keys)
@@ -0,0 +1,183 @@
+from __future__ import annotations
+import asyncio, os, signal, socket, uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from loader import reset_indexes
+
+# Un job por entidad, cada uno con su cadencia. El estado de cada job vive en
+# un documento de etl_leases que hace de lease (owner, expiresAt, heartbeatAt)
+# y de agenda (interval, nextRunAt, seq): con varias réplicas solo una corre
+# un job a la vez y la cadencia es una sola. Si la réplica que lo tiene muere,
+# el lease vence y otra lo toma en la siguiente pasada.
+#
+# Cadencia adaptativa: una corrida sin cambios multiplica el intervalo por
+# BACKOFF (hasta max); una con cambios lo divide por BACKOFF (hasta min).
+
+LEASES = "etl_leases"
+LEASE_TTL_SECONDS = float(os.getenv("ETL_LEASE_TTL_SECONDS", "60"))
+# Cada cuánto se buscan jobs vencidos
+TICK_SECONDS = float(os.getenv("ETL_SCHEDULER_TICK_SECONDS", "5"))
+BACKOFF = float(os.getenv("ETL_BACKOFF_FACTOR", "2"))
+OWNER = os.getenv("ETL_OWNER_ID") or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _seconds(job: str, kind: str, default: float) -> float:
+    # ETL_TEAMS_INTERVAL_SECONDS, ETL_TEAMS_MIN_INTERVAL_SECONDS, ETL_TEAMS_MAX_INTERVAL_SECONDS...
+    return float(os.getenv(f"ETL_{job.upper()}_{kind}_SECONDS", str(default)))
+
+@dataclass
+class Job:
+    name: str
+    run: Callable[[Any], Awaitable[int]]   # db -> documentos cambiados
+    interval: float
+    min_interval: float
+    max_interval: float
+    # Jobs que se adelantan si este encontró cambios (p. ej. teamName en players)
+    dependents: tuple[str, ...] = ()
+    # Colecciones con índice en memoria: se olvidan si otra réplica corrió el job
+    collections: tuple[str, ...] = ()
+    # Llamado si la corrida anterior (de cualquier réplica) no terminó limpia
+    takeover: Optional[Callable[[], None]] = None
+
+    def __post_init__(self):
+        self.interval = _seconds(self.name, "INTERVAL", self.interval)
+        self.min_interval = _seconds(self.name, "MIN_INTERVAL", self.min_interval)
+        self.max_interval = _seconds(self.name, "MAX_INTERVAL", self.max_interval)
+        self.collections = self.collections or (self.name,)
+
+    def next_interval(self, current: float, changes: Optional[int]) -> float:
+        if changes is None:          # falló: se reintenta con el intervalo base
+            return min(current, self.interval)
+        if changes:
+            return max(self.min_interval, current / BACKOFF)
+        return min(self.max_interval, current * BACKOFF)
+
+
+class Scheduler:
+    def __init__(self, db, jobs: list[Job], owner: str = OWNER):
+        self.db = db
+        self.col = db[LEASES]
+        self.jobs = jobs
+        self.owner = owner
+        self._running: dict[str, asyncio.Task] = {}
+        # seq de la última corrida que terminó este proceso, por job
+        self._seq: dict[str, int] = {}
+
+    async def _ensure(self) -> None:
+        for job in self.jobs:
+            await self.col.update_one(
+                {"_id": job.name},
+                {"$setOnInsert": {"owner": None, "expiresAt": _EPOCH, "nextRunAt": _EPOCH,
+                                  "interval": job.interval, "seq": 0, "clean": True}},
+                upsert=True,
+            )
+
+    async def _acquire(self, job: Job) -> Optional[dict[str, Any]]:
+        """Toma el lease si el job está vencido y nadie lo tiene; devuelve el documento previo."""
+        now = _now()
+        return await self.col.find_one_and_update(
+            {"_id": job.name, "nextRunAt": {"$lte": now},
+             "$or": [{"expiresAt": {"$lte": now}}, {"owner": self.owner}]},
+            {"$set": {"owner": self.owner, "expiresAt": now + timedelta(seconds=LEASE_TTL_SECONDS),
+                      "heartbeatAt": now, "startedAt": now, "clean": False}},
+            return_document=ReturnDocument.BEFORE,
+        )
+
+    async def _heartbeat(self, job: Job, task: asyncio.Task) -> None:
+        while True:
+            await asyncio.sleep(LEASE_TTL_SECONDS / 3)
+            now = _now()
+            try:
+                r = await self.col.update_one(
+                    {"_id": job.name, "owner": self.owner},
+                    {"$set": {"expiresAt": now + timedelta(seconds=LEASE_TTL_SECONDS), "heartbeatAt": now}},
+                )
+            except PyMongoError as e:
+                print(f"[ETL] {job.name}: heartbeat falló ({e!r})")
+                continue
+            if r.matched_count == 0:
+                # Otra réplica lo tomó (este proceso estuvo colgado más que el TTL): se corta
+                print(f"[ETL] {job.name}: lease perdido; se cancela la corrida")
+                task.cancel("lease perdido")
+                return
+
+    async def _run(self, job: Job, before: dict[str, Any]) -> None:
+        seq = int(before.get("seq") or 0)
+        if self._seq.get(job.name) != seq:
+            # La última corrida la hizo otra réplica: lo que este proceso recuerda puede estar viejo
+            reset_indexes(*job.collections)
+        if not before.get("clean", True) and job.takeover:
+            job.takeover()
+
+        hb = asyncio.create_task(self._heartbeat(job, asyncio.current_task()))
+        changes: Optional[int] = None
+        t0 = asyncio.get_running_loop().time()
+        try:
+            changes = await job.run(self.db)
+        except asyncio.CancelledError:
+            reset_indexes(*job.collections)
+            if hb.done():
+                return          # lease perdido: el documento ya es de otra réplica
+            raise
+        except Exception as e:
+            reset_indexes(*job.collections)
+            for err in getattr(e, "exceptions", None) or [e]:
+                print(f"[ETL] {job.name} ERROR:", repr(err))
+        finally:
+            hb.cancel()
+
+        interval = job.next_interval(float(before.get("interval") or job.interval), changes)
+        now = _now()
+        r = await self.col.update_one(
+            {"_id": job.name, "owner": self.owner},
+            {"$set": {"expiresAt": now, "nextRunAt": now + timedelta(seconds=interval), "interval": interval,
+                      "seq": seq + 1, "clean": changes is not None, "lastRunAt": now,
+                      "lastChanges": changes, "lastSeconds": round(asyncio.get_running_loop().time() - t0, 3)}},
+        )
+        if r.matched_count:
+            self._seq[job.name] = seq + 1
+        if changes and job.dependents:
+            await self.col.update_many({"_id": {"$in": list(job.dependents)}}, {"$set": {"nextRunAt": now}})
+        print(f"[ETL] job {job.name}: cambios={changes} próximo en {interval:.0f}s")
+
+    async def _release(self) -> None:
+        # Apagado ordenado: los leases quedan libres ya (clean sigue en False: la corrida quedó a medias)
+        await self.col.update_many({"owner": self.owner}, {"$set": {"expiresAt": _now()}})
+
+    async def run_forever(self) -> None:
+        await self._ensure()
+        main = asyncio.current_task()
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGTERM, main.cancel)
+        except (NotImplementedError, RuntimeError):
+            pass
+        print(f"[ETL] scheduler {self.owner}: " +
+              ", ".join(f"{j.name} {j.interval:.0f}s [{j.min_interval:.0f}-{j.max_interval:.0f}]" for j in self.jobs))
+        try:
+            while True:
+                for job in self.jobs:
+                    if job.name in self._running:
+                        continue
+                    try:
+                        before = await self._acquire(job)
+                    except PyMongoError as e:
+                        print(f"[ETL] {job.name}: no se pudo tomar el lease ({e!r})")
+                        continue
+                    if before is not None:
+                        task = asyncio.create_task(self._run(job, before))
+                        self._running[job.name] = task
+                        task.add_done_callback(lambda _t, n=job.name: self._running.pop(n, None))
+                await asyncio.sleep(TICK_SECONDS)
+        finally:
+            for task in list(self._running.values()):
+                task.cancel()
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
+            await asyncio.shield(self._release())
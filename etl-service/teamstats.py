@@ -0,0 +1,210 @@
+from __future__ import annotations
+import os
+from typing import Any, Iterable, Optional
+from pymongo import UpdateOne, DeleteOne, ASCENDING
+import leaguestats
+from loader import HASH_FIELD, MAX_DELETE_FRACTION, WRITE_CHUNK, _index
+from transforms import stats_contribution, contribution_rows, compute_team_stats
+
+# team_stats por deltas: etl_match_stats guarda lo que cada partido aportó a la
+# tabla (matchId -> hash del partido + contribución). Un partido nuevo o
+# cambiado resta su aporte anterior y suma el nuevo con $inc; uno que
+# desaparece resta el suyo. El costo depende de los partidos cambiados, no del
+# historial de la liga.
+
+LEDGER = "etl_match_stats"
+COLUMNS = leaguestats.STAT_COLUMNS   # orden de transforms.contribution_rows
+# Cada cuántas corridas se recalcula la tabla completa desde matches y se
+# corrigen las diferencias (también en la primera corrida del proceso)
+RECONCILE_RUNS = int(os.getenv("ETL_STATS_RECONCILE_RUNS", "30"))
+
+_runs = 0
+# False mientras una corrida aplica deltas: si no terminó, la próxima reconcilia
+_clean = True
+
+def mark_dirty() -> None:
+    """Fuerza la reconciliación en la próxima corrida (p. ej. otra réplica cortó la suya)."""
+    global _clean
+    _clean = False
+
+async def ensure_stats_indexes(db):
+    await db[LEDGER].create_index([("matchId", ASCENDING)], unique=True)
+
+def _add(acc: dict[str, list[int]], c: Optional[list[Any]], sign: int) -> None:
+    if not c:
+        return
+    for tid, vals in contribution_rows(c):
+        row = acc.setdefault(tid, [0] * len(COLUMNS))
+        for i, v in enumerate(vals):
+            row[i] += sign * v
+
+
+class TeamStatsDelta:
+    """
+    Etapa de team_stats del pipeline:
+
+        st = await TeamStatsDelta(db).open()
+        ... await st.add(docs) por página de partidos (docs con HASH_FIELD) ...
+        await st.finish(complete, team_name_by_id)
+
+    Las contribuciones se aplican de a WRITE_CHUNK partidos cambiados; los
+    no cambiados no generan lecturas ni escrituras.
+    """
+    def __init__(self, db):
+        self.db = db
+        self._idx = _index(db[LEDGER], "matchId")
+        self._applied: dict[str, Optional[int]] = {}
+        self._seen: set[str] = set()
+        self._pending: dict[str, tuple[int, Optional[list[Any]]]] = {}
+        self.touched: set[str] = set()
+        self.matches = 0
+        self.removed = 0
+        self.pruned = 0
+        self.corrected: Optional[int] = None
+        self._reconcile = False
+
+    async def open(self) -> "TeamStatsDelta":
+        global _clean
+        self._reconcile = _runs == 0 or not _clean or (RECONCILE_RUNS > 0 and _runs % RECONCILE_RUNS == 0)
+        _clean = False
+        self._applied = await self._idx.load()
+        if not self._applied:
+            # Sin ledger (primera carga o tabla de la versión anterior): se arma desde cero
+            await self.db.team_stats.delete_many({})
+        return self
+
+    async def add(self, matches: Iterable[dict[str, Any]]) -> None:
+        for m in matches:
+            mid, h = m["id"], m[HASH_FIELD]
+            self._seen.add(mid)
+            if self._applied.get(mid) != h:
+                self._pending[mid] = (h, stats_contribution(m))
+        if len(self._pending) >= WRITE_CHUNK:
+            await self._apply()
+
+    async def _previous(self, ids: list[str]) -> dict[str, Optional[list[Any]]]:
+        known = [k for k in ids if k in self._applied]
+        if not known:
+            return {}
+        return {d["matchId"]: d.get("c") async for d in
+                self.db[LEDGER].find({"matchId": {"$in": known}}, {"_id": 0, "matchId": 1, "c": 1})}
+
+    async def _apply(self) -> None:
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        old = await self._previous(list(pending))
+        delta: dict[str, list[int]] = {}
+        for mid, (_, c) in pending.items():
+            _add(delta, old.get(mid), -1)
+            _add(delta, c, +1)
+        await self._inc(delta)
+        await self.db[LEDGER].bulk_write(
+            [UpdateOne({"matchId": mid}, {"$set": {HASH_FIELD: h, "c": c}}, upsert=True)
+             for mid, (h, c) in pending.items()],
+            ordered=False,
+        )
+        self._applied.update((mid, h) for mid, (h, _) in pending.items())
+        self.matches += len(pending)
+
+    async def _inc(self, delta: dict[str, list[int]]) -> None:
+        ops = []
+        for tid, vals in delta.items():
+            if not any(vals):
+                continue   # partido con otro hash pero el mismo marcador y estado
+            inc = dict(zip(COLUMNS, vals))
+            inc["diff"] = inc["pf"] - inc["pa"]
+            ops.append(UpdateOne({"teamId": tid}, {"$inc": inc, "$setOnInsert": {"teamName": tid}}, upsert=True))
+            self.touched.add(tid)
+        if ops:
+            await self.db.team_stats.bulk_write(ops, ordered=False)
+
+    async def finish(self, complete: bool, team_name_by_id: dict[str, str]) -> None:
+        await self._apply()
+        gone = [k for k in self._applied if k not in self._seen] if complete else []
+        if gone and len(gone) > MAX_DELETE_FRACTION * len(self._applied):
+            print(f"[ETL] team_stats: desaparecieron {len(gone)}/{len(self._applied)} partidos; no se descuentan")
+            gone = []
+        for i in range(0, len(gone), WRITE_CHUNK):
+            chunk = gone[i:i + WRITE_CHUNK]
+            delta: dict[str, list[int]] = {}
+            for c in (await self._previous(chunk)).values():
+                _add(delta, c, -1)
+            await self._inc(delta)
+            await self.db[LEDGER].delete_many({"matchId": {"$in": chunk}})
+            for k in chunk:
+                del self._applied[k]
+        self.removed = len(gone)
+
+        # Equipos que se quedaron sin partidos que cuenten: fuera de la tabla
+        if self.touched:
+            r = await self.db.team_stats.delete_many({"teamId": {"$in": list(self.touched)}, "played": {"$lte": 0}})
+            self.pruned = r.deleted_count
+
+        global _runs, _clean
+        if self._reconcile:
+            teams, ledger = await reconcile(self.db)
+            self.corrected = teams + ledger
+            if ledger:
+                # El ledger en memoria ya no coincide: se relee en la próxima corrida
+                self._idx.reset()
+        await self._names(team_name_by_id)
+        _runs += 1
+        _clean = True
+
+    async def _names(self, team_name_by_id: dict[str, str]) -> None:
+        """teamName al día aunque ningún partido del equipo haya cambiado (pocos equipos)."""
+        ops = [UpdateOne({"teamId": tid, "teamName": {"$ne": name}}, {"$set": {"teamName": name}})
+               for tid, name in team_name_by_id.items()]
+        for i in range(0, len(ops), WRITE_CHUNK):
+            await self.db.team_stats.bulk_write(ops[i:i + WRITE_CHUNK], ordered=False)
+
+    def __str__(self) -> str:
+        s = (f"matches_applied={self.matches} matches_removed={self.removed} "
+             f"teams_touched={len(self.touched)} teams_pruned={self.pruned}")
+        if self.corrected is not None:
+            s += f" reconciled(corrected={self.corrected})"
+        return s
+
+
+async def reconcile(db) -> tuple[int, int]:
+    """
+    Recalcula la tabla completa desde matches y la compara con team_stats y el
+    ledger; corrige lo que difiera. Devuelve (equipos corregidos, entradas del ledger corregidas).
+    """
+    expected_ledger: dict[str, tuple[Optional[int], Optional[list[Any]]]] = {}
+    rows = []
+    async for m in db.matches.find({}, {"_id": 0, "id": 1, "status": 1, "homeTeamId": 1, "awayTeamId": 1,
+                                        "homeScore": 1, "awayScore": 1, HASH_FIELD: 1}):
+        expected_ledger[m["id"]] = (m.get(HASH_FIELD), stats_contribution(m))
+        rows.append(m)
+    expected = compute_team_stats(rows)
+    del rows
+
+    ops: list[Any] = []
+    async for d in db.team_stats.find({}, {"_id": 0}):
+        tid = d.get("teamId")
+        want = expected.pop(tid, None)
+        if want is None:
+            ops.append(DeleteOne({"teamId": tid}))
+        elif any(d.get(c) != want[c] for c in (*COLUMNS, "diff")):
+            ops.append(UpdateOne({"teamId": tid}, {"$set": {c: want[c] for c in (*COLUMNS, "diff")}}))
+    for tid, want in expected.items():
+        ops.append(UpdateOne({"teamId": tid}, {"$set": {"teamName": tid, **{c: want[c] for c in (*COLUMNS, "diff")}}},
+                             upsert=True))
+    teams = len(ops)
+    for i in range(0, len(ops), WRITE_CHUNK):
+        await db.team_stats.bulk_write(ops[i:i + WRITE_CHUNK], ordered=False)
+
+    ops = []
+    async for d in db[LEDGER].find({}, {"_id": 0, "matchId": 1, HASH_FIELD: 1, "c": 1}):
+        want_l = expected_ledger.pop(d["matchId"], None)
+        if want_l is None:
+            ops.append(DeleteOne({"matchId": d["matchId"]}))
+        elif (d.get(HASH_FIELD), d.get("c")) != want_l:
+            ops.append(UpdateOne({"matchId": d["matchId"]}, {"$set": {HASH_FIELD: want_l[0], "c": want_l[1]}}))
+    for mid, (h, c) in expected_ledger.items():
+        ops.append(UpdateOne({"matchId": mid}, {"$set": {HASH_FIELD: h, "c": c}}, upsert=True))
+    for i in range(0, len(ops), WRITE_CHUNK):
+        await db[LEDGER].bulk_write(ops[i:i + WRITE_CHUNK], ordered=False)
+    return teams, len(ops)
@@ -0,0 +1,21 @@
+from __future__ import annotations
+import os, sys
+
+import pytest
+
+# Los módulos del ETL se importan planos (como en la imagen: /app + /app/leaguestats)
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), os.path.join(HERE, "..", "..", "shared")]
+
+from mongomock_motor import AsyncMongoMockClient  # noqa: E402
+
+import loader, teamstats  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """Base en memoria con la API de motor; índices y estado de módulo limpios por test."""
+    loader._indexes.clear()
+    teamstats._runs = 0
+    teamstats._clean = True
+    return AsyncMongoMockClient()["reports"]
@@ -0,0 +1,180 @@
+from __future__ import annotations
+import asyncio
+from datetime import timedelta
+
+import loader
+import scheduler
+from scheduler import LEASES, Job, Scheduler, _now
+
+
+class Recorder:
+    """Función de job que anota cada corrida; `block` la deja colgada hasta que la cancelen."""
+    def __init__(self, changes: int = 0, block: bool = False):
+        self.changes = changes
+        self.block = block
+        self.calls = 0
+        self.cancelled = False
+        self.index_was_reset: list[bool] = []
+
+    async def __call__(self, db) -> int:
+        self.calls += 1
+        self.index_was_reset.append(loader._index(db.things, "id").hashes is None)
+        if self.block:
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                self.cancelled = True
+                raise
+        return self.changes
+
+def job(run, **kw) -> Job:
+    # Intervalos en 0: el job vuelve a estar vencido apenas termina
+    return Job("demo", run, 0, 0, 0, collections=("things",), **kw)
+
+async def expire(db) -> None:
+    """Simula que la réplica dueña murió: su lease ya venció."""
+    await db[LEASES].update_one({"_id": "demo"}, {"$set": {"expiresAt": _now() - timedelta(seconds=1)}})
+
+async def lease(db) -> dict:
+    return await db[LEASES].find_one({"_id": "demo"})
+
+
+def test_lease_is_exclusive_until_it_expires(db):
+    async def go():
+        j = job(Recorder())
+        a, b = Scheduler(db, [j], "A"), Scheduler(db, [j], "B")
+        await a._ensure(); await b._ensure()
+
+        assert await a._acquire(j) is not None
+        assert await b._acquire(j) is None            # A lo tiene y no venció
+        assert (await lease(db))["owner"] == "A"
+
+        await expire(db)
+        before = await b._acquire(j)
+        assert before is not None and before["owner"] == "A"
+        assert (await lease(db))["owner"] == "B"
+        assert await a._acquire(j) is None            # ahora es de B
+    asyncio.run(go())
+
+
+def test_heartbeat_cancels_run_when_lease_is_lost(db, monkeypatch):
+    async def go():
+        monkeypatch.setattr(scheduler, "LEASE_TTL_SECONDS", 0.15)
+        run = Recorder(block=True)
+        j = job(run)
+        a, b = Scheduler(db, [j], "A"), Scheduler(db, [j], "B")
+        await a._ensure()
+        task = asyncio.create_task(a._run(j, await a._acquire(j)))
+        await asyncio.sleep(0.02)
+
+        # A se colgó más que el TTL y B tomó el job
+        await expire(db)
+        assert await b._acquire(j) is not None
+
+        await asyncio.sleep(0.3)                      # > TTL/3: al menos un heartbeat
+        assert task.done() and run.cancelled
+        await task                                    # _run termina sin propagar la cancelación
+        doc = await lease(db)
+        assert doc["owner"] == "B" and doc["seq"] == 0   # A no pisa el documento de B
+        assert "demo" not in a._seq
+    asyncio.run(go())
+
+
+def test_heartbeat_keeps_a_slow_run_alive(db, monkeypatch):
+    async def go():
+        monkeypatch.setattr(scheduler, "LEASE_TTL_SECONDS", 0.15)
+
+        async def slow(_db) -> int:
+            await asyncio.sleep(0.4)                  # más que el TTL
+            return 1
+        j = job(slow)
+        a, b = Scheduler(db, [j], "A"), Scheduler(db, [j], "B")
+        await a._ensure()
+        task = asyncio.create_task(a._run(j, await a._acquire(j)))
+        for _ in range(6):
+            await asyncio.sleep(0.06)
+            assert await b._acquire(j) is None
+        await task
+        doc = await lease(db)
+        assert doc["seq"] == 1 and doc["clean"] is True and doc["lastChanges"] == 1
+    asyncio.run(go())
+
+
+def test_unclean_previous_run_triggers_takeover(db):
+    async def go():
+        taken: list[str] = []
+        ja = job(Recorder(), takeover=lambda: taken.append("A"))
+        jb = job(Recorder(), takeover=lambda: taken.append("B"))
+        a, b = Scheduler(db, [ja], "A"), Scheduler(db, [jb], "B")
+        await a._ensure()
+
+        # A toma el job y muere a mitad de corrida: clean queda en False
+        await a._acquire(ja)
+        assert (await lease(db))["clean"] is False
+        await expire(db)
+
+        before = await b._acquire(jb)
+        assert before["clean"] is False
+        await b._run(jb, before)
+        assert taken == ["B"]
+        assert (await lease(db))["clean"] is True
+
+        # Corrida siguiente tras una limpia: sin takeover
+        await a._run(ja, await a._acquire(ja))
+        assert taken == ["B"]
+    asyncio.run(go())
+
+
+def test_failed_run_leaves_lease_unclean(db):
+    async def go():
+        async def boom(_db) -> int:
+            raise RuntimeError("upstream caído")
+        taken: list[int] = []
+        j = job(boom, takeover=lambda: taken.append(1))
+        a = Scheduler(db, [j], "A")
+        await a._ensure()
+        await a._run(j, await a._acquire(j))
+        doc = await lease(db)
+        assert doc["clean"] is False and doc["lastChanges"] is None and doc["seq"] == 1
+        await a._run(j, await a._acquire(j))
+        assert taken == [1]
+    asyncio.run(go())
+
+
+def test_seq_change_resets_hash_indexes(db):
+    async def go():
+        ra, rb = Recorder(), Recorder()
+        ja, jb = job(ra), job(rb)
+        a, b = Scheduler(db, [ja], "A"), Scheduler(db, [jb], "B")
+        await a._ensure()
+
+        await a._run(ja, await a._acquire(ja))        # seq 0 -> 1; primera vez en A: índice sin cargar
+        await loader._index(db.things, "id").load()
+
+        await a._run(ja, await a._acquire(ja))        # seq 1 -> 2: la última corrida fue de A
+        assert ra.index_was_reset == [True, False]
+
+        await b._run(jb, await b._acquire(jb))        # seq 2 -> 3 en B
+        await loader._index(db.things, "id").load()
+        await a._run(ja, await a._acquire(ja))        # A ve seq 3 != 2: olvida lo que recordaba
+        assert ra.index_was_reset == [True, False, True]
+        assert (await lease(db))["seq"] == 4
+    asyncio.run(go())
+
+
+def test_cadence_adapts_and_changes_pull_dependents(db):
+    async def go():
+        busy = Job("busy", Recorder(changes=3), 60, 15, 600, dependents=("quiet",))
+        quiet = Job("quiet", Recorder(), 60, 15, 600)
+        s = Scheduler(db, [busy, quiet], "A")
+        await s._ensure()
+
+        await s._run(quiet, await s._acquire(quiet))
+        q = await db[LEASES].find_one({"_id": "quiet"})
+        assert q["interval"] == 120                   # sin cambios: se alarga
+
+        await s._run(busy, await s._acquire(busy))
+        d = await db[LEASES].find_one({"_id": "busy"})
+        assert d["interval"] == 30                    # con cambios: se acorta
+        assert await s._acquire(quiet) is not None   # adelantado por busy
+    asyncio.run(go())
@@ -0,0 +1,130 @@
+from __future__ import annotations
+import asyncio
+from typing import Any
+
+import pytest
+
+import teamstats
+from loader import CollectionSync
+from teamstats import LEDGER, TeamStatsDelta, mark_dirty
+from transforms import compute_team_stats
+
+COLS = ("played", "wins", "losses", "pf", "pa", "diff")
+NAMES = {"1": "Leones", "2": "Tigres", "3": "Osos"}
+
+
+def match(mid: str, home: str, away: str, hs: int, as_: int, status: str = "Finished") -> dict[str, Any]:
+    return {"id": mid, "homeTeamId": home, "awayTeamId": away, "homeScore": hs, "awayScore": as_, "status": status}
+
+async def run(db, matches: list[dict[str, Any]], complete: bool = True) -> TeamStatsDelta:
+    """Una corrida como la de etl.run_matches: partidos -> deltas -> finish."""
+    st = await TeamStatsDelta(db).open()
+    async with CollectionSync(db, "matches", "id") as sync:
+        await st.add(await sync.add([dict(m) for m in matches]))
+        await sync.finish(complete)
+    await st.finish(complete, NAMES)
+    return st
+
+async def table(db) -> dict[str, dict[str, int]]:
+    return {d["teamId"]: {c: d[c] for c in COLS} async for d in db.team_stats.find({}, {"_id": 0})}
+
+async def recomputed(db) -> dict[str, dict[str, int]]:
+    rows = [m async for m in db.matches.find({}, {"_id": 0})]
+    return {tid: {c: s[c] for c in COLS} for tid, s in compute_team_stats(rows).items()}
+
+
+def test_score_change_applies_only_the_delta(db):
+    async def go():
+        ms = [match("10", "1", "2", 80, 70), match("11", "2", "3", 60, 65)]
+        await run(db, ms)
+        assert (await table(db))["1"] == {"played": 1, "wins": 1, "losses": 0, "pf": 80, "pa": 70, "diff": 10}
+
+        st = await run(db, ms)
+        assert st.matches == 0 and not st.touched
+
+        ms[0] = match("10", "1", "2", 70, 75)
+        st = await run(db, ms)
+        assert st.matches == 1 and st.touched == {"1", "2"}
+        t = await table(db)
+        assert t["1"] == {"played": 1, "wins": 0, "losses": 1, "pf": 70, "pa": 75, "diff": -5}
+        assert t["2"] == {"played": 2, "wins": 1, "losses": 1, "pf": 135, "pa": 135, "diff": 0}
+        assert t == await recomputed(db)
+        assert (await db[LEDGER].find_one({"matchId": "10"}))["c"] == ["1", "2", 70, 75]
+    asyncio.run(go())
+
+
+def test_status_change_into_and_out_of_skip_set(db):
+    async def go():
+        ms = [match("10", "1", "2", 80, 70), match("11", "2", "3", 0, 0, status="Scheduled")]
+        await run(db, ms)
+        t = await table(db)
+        assert "3" not in t and t["2"]["played"] == 1          # programado 0-0: no cuenta
+
+        ms[1] = match("11", "2", "3", 55, 50)                   # se jugó
+        await run(db, ms)
+        t = await table(db)
+        assert t["3"] == {"played": 1, "wins": 0, "losses": 1, "pf": 50, "pa": 55, "diff": -5}
+        assert t["2"]["played"] == 2
+
+        ms[1] = match("11", "2", "3", 55, 50, status="Canceled")  # anulado: se descuenta
+        st = await run(db, ms)
+        t = await table(db)
+        assert "3" not in t and st.pruned == 1
+        assert t["2"] == {"played": 1, "wins": 0, "losses": 1, "pf": 70, "pa": 80, "diff": -10}
+        assert t == await recomputed(db)
+        assert (await db[LEDGER].find_one({"matchId": "11"}))["c"] is None
+    asyncio.run(go())
+
+
+def test_vanished_match_is_subtracted(db):
+    async def go():
+        ms = [match("10", "1", "2", 80, 70), match("11", "2", "3", 60, 65), match("12", "1", "2", 50, 40)]
+        await run(db, ms)
+
+        # Descarga incompleta: no se descuenta nada
+        st = await run(db, ms[:2], complete=False)
+        assert st.removed == 0 and (await table(db))["1"]["played"] == 2
+
+        st = await run(db, ms[:2])
+        assert st.removed == 1
+        t = await table(db)
+        assert t["1"] == {"played": 1, "wins": 1, "losses": 0, "pf": 80, "pa": 70, "diff": 10}
+        assert t == await recomputed(db)
+        assert await db[LEDGER].count_documents({}) == 2
+
+        st = await run(db, [ms[0], match("13", "1", "2", 1, 2)])   # 11 se va: el equipo 3 queda sin partidos
+        assert st.removed == 1 and "3" not in await table(db)
+        assert await table(db) == await recomputed(db)
+    asyncio.run(go())
+
+
+@pytest.mark.parametrize("trigger", ["periodic", "dirty"])
+def test_reconcile_fixes_drift(db, monkeypatch, trigger):
+    async def go():
+        monkeypatch.setattr(teamstats, "RECONCILE_RUNS", 2 if trigger == "periodic" else 0)
+        ms = [match("10", "1", "2", 80, 70), match("11", "2", "3", 60, 65)]
+        st = await run(db, ms)
+        assert st.corrected == 0                      # primera corrida del proceso: siempre reconcilia
+        expected = await table(db)
+
+        # $inc desviado (p. ej. una corrida cortada entre team_stats y el ledger)
+        await db.team_stats.update_one({"teamId": "2"}, {"$inc": {"wins": 5, "pf": 3, "diff": 3}})
+        await db[LEDGER].update_one({"matchId": "11"}, {"$set": {"c": ["2", "3", 0, 0]}})
+        st = await run(db, ms)
+        assert st.corrected is None                   # sin cambios ni reconciliación: la desviación sigue
+        assert (await table(db))["2"]["wins"] == expected["2"]["wins"] + 5
+
+        if trigger == "periodic":
+            st = await run(db, ms)                    # tercera corrida: _runs % RECONCILE_RUNS == 0
+        else:
+            mark_dirty()
+            st = await run(db, ms)
+        assert st.corrected == 2                      # un equipo + una entrada del ledger
+        assert await table(db) == expected
+        assert (await db[LEDGER].find_one({"matchId": "11"}))["c"] == ["2", "3", 60, 65]
+
+        # El ledger en memoria se relee: un cambio posterior resta el aporte correcto
+        ms[1] = match("11", "2", "3", 60, 70)
+        await run(db, ms)
+        assert await table(db) == await recomputed(db)
+    asyncio.run(go())
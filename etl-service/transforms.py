@@ -1,5 +1,8 @@
 from __future__ import annotations
-from typing import Any, Iterable
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator, Optional
+
+import leaguestats
 
 def normalize_team(t: dict[str, Any]) -> dict[str, Any]:
     return {
@@ -20,10 +23,33 @@ def normalize_player(p: dict[str, Any], team_name_by_id: dict[str, str]) -> dict
         "teamName": team_name_by_id.get(tid, tid),
     }
 
+def parse_date(raw: Any) -> Optional[datetime]:
+    """
+    Fecha del upstream -> datetime UTC naive (BSON date), o None si no se
+    entiende. Con datetime real Mongo puede indexar y filtrar rangos.
+    """
+    if isinstance(raw, datetime):
+        dt: Optional[datetime] = raw
+    elif not raw:
+        return None
+    else:
+        s = str(raw).strip()
+        try:
+            dt = datetime.fromisoformat(s)
+        except ValueError:
+            # Fracciones de más de 6 dígitos (.NET): se descartan
+            try:
+                dt = datetime.fromisoformat(s.split(".", 1)[0]) if "T" in s else None
+            except ValueError:
+                dt = None
+    if dt is not None and dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
 def normalize_match(m: dict[str, Any]) -> dict[str, Any]:
     return {
         "id": str(m.get("Id") or m.get("id") or ""),
-        "date": m.get("DateMatch") or m.get("dateMatch") or m.get("date") or "",
+        "date": parse_date(m.get("DateMatch") or m.get("dateMatch") or m.get("date")),
         "status": m.get("Status") or m.get("status") or "",
         "homeTeamId": str(m.get("HomeTeamId") or m.get("homeTeamId") or ""),
         "awayTeamId": str(m.get("AwayTeamId") or m.get("awayTeamId") or ""),
@@ -33,19 +59,45 @@ def normalize_match(m: dict[str, Any]) -> dict[str, Any]:
         "quarterDurationSeconds": int(m.get("QuarterDurationSeconds") or 0),
     }
 
+def _opt_id(v: Any) -> Optional[str]:
+    return str(v) if v not in (None, "", 0) else None
+
+def normalize_score_event(e: dict[str, Any], match_id: str) -> dict[str, Any]:
+    return {
+        "id": str(e.get("id") or e.get("Id") or ""),
+        "matchId": match_id,
+        "teamId": str(e.get("teamId") or e.get("TeamId") or ""),
+        "playerId": _opt_id(e.get("playerId") or e.get("PlayerId")),
+        "points": int(e.get("points") or e.get("Points") or 0),
+        "date": parse_date(e.get("dateRegister") or e.get("DateRegister")),
+    }
+
+def normalize_foul(f: dict[str, Any], match_id: str) -> dict[str, Any]:
+    return {
+        "id": str(f.get("id") or f.get("Id") or ""),
+        "matchId": match_id,
+        "teamId": str(f.get("teamId") or f.get("TeamId") or ""),
+        "playerId": _opt_id(f.get("playerId") or f.get("PlayerId")),
+        "type": f.get("type") or f.get("Type") or "",
+        "date": parse_date(f.get("dateRegister") or f.get("DateRegister")),
+    }
+
+def stats_contribution(m: dict[str, Any]) -> Optional[list[Any]]:
+    """
+    Lo que un partido normalizado aporta a team_stats: [local, visitante, pts
+    local, pts visitante], o None si no cuenta (leaguestats.counts_for_stats).
+    """
+    if not leaguestats.counts_for_stats(m):
+        return None
+    return [m["homeTeamId"], m["awayTeamId"], int(m.get("homeScore") or 0), int(m.get("awayScore") or 0)]
+
+def contribution_rows(c: list[Any]) -> Iterator[tuple[str, list[int]]]:
+    """(teamId, [played, wins, losses, pf, pa]) de los dos equipos de una contribución."""
+    home, away, hs, as_ = c
+    yield home, [1, int(hs > as_), int(as_ > hs), hs, as_]
+    yield away, [1, int(as_ > hs), int(hs > as_), as_, hs]
+
 def compute_team_stats(matches: Iterable[dict[str, Any]]) -> dict[str, dict[str, Any]]:
-    stats: dict[str, dict[str, Any]] = {}
-    def ensure(tid: str, name: str = ""):
-        if tid not in stats:
-            stats[tid] = {"teamId": tid, "teamName": name, "played": 0, "wins": 0, "losses": 0, "pf": 0, "pa": 0}
-        return stats[tid]
-    for m in matches:
-        home = str(m["homeTeamId"]); away = str(m["awayTeamId"])
-        hs = int(m["homeScore"]); as_ = int(m["awayScore"])
-        if not home or not away: continue
-        h = ensure(home); a = ensure(away)
-        h["played"] += 1; a["played"] += 1
-        h["pf"] += hs; h["pa"] += as_; a["pf"] += as_; a["pa"] += hs
-        if hs > as_: h["wins"] += 1; a["losses"] += 1
-        elif as_ > hs: a["wins"] += 1; h["losses"] += 1
-    return stats
+    """Tabla completa desde cero (reconciliación); solo partidos que cuentan."""
+    table = leaguestats.aggregate(leaguestats.load_matches(matches), {})
+    return {s["teamId"]: s for s in table.records(name_key="teamName")}
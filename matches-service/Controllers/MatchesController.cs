@@ -48,6 +48,15 @@ namespace MatchesService.Controllers
             return Ok(result);
         }
 
+        // anotaciones y faltas (lo consume etl-service)
+        [HttpGet("{id:int}/events")]
+        public async Task<IActionResult> Events(int id)
+        {
+            var result = await matchService.GetEventsAsync(id);
+            if (result is null) return NotFound(new { error = "Partido no encontrado" });
+            return Ok(result);
+        }
+
         //prograa
         [HttpPost("programar")]
         public async Task<IActionResult> Programar([FromBody] ProgramarPartidoDto dto)
@@ -13,6 +13,7 @@ namespace MatchesService.Repositories
         Task<int> CountAsync(string? status, int? teamId, DateTime? from, DateTime? to);
         Task<IEnumerable<Match>> GetUpcomingAsync();
         Task<IEnumerable<Match>> GetByRangeAsync(DateTime from, DateTime to);
+        Task<bool> ExistsAsync(int id);
 
         // ==== CRUD MATCH ====
         Task AddAsync(Match match);
@@ -22,10 +23,12 @@ namespace MatchesService.Repositories
 
         // ==== SCORE EVENTS ====
         Task AddScoreEventAsync(ScoreEvent ev);
+        Task<List<ScoreEvent>> GetScoreEventsAsync(int matchId);
 
         // ==== FOULS ====
         Task AddFoulAsync(Foul foul);
         Task<int> GetFoulCountAsync(int matchId, int teamId);
+        Task<List<Foul>> GetFoulsAsync(int matchId);
         /// <summary>Elimina las últimas 'count' faltas de un equipo en un partido. Retorna cuántas eliminó.</summary>
         Task<int> RemoveLastFoulsAsync(int matchId, int teamId, int count);
     }
@@ -85,6 +85,9 @@ namespace MatchesService.Repositories
                 .ToListAsync();
         }
 
+        public async Task<bool> ExistsAsync(int id)
+            => await _context.Matches.AsNoTracking().AnyAsync(m => m.Id == id);
+
         // ================= CRUD MATCH =================
         public async Task AddAsync(Match match) => await _context.Matches.AddAsync(match);
 
@@ -105,9 +108,25 @@ namespace MatchesService.Repositories
         // ================= SCORE EVENTS =================
         public async Task AddScoreEventAsync(ScoreEvent ev) => await _context.ScoreEvents.AddAsync(ev);
 
+        public async Task<List<ScoreEvent>> GetScoreEventsAsync(int matchId)
+        {
+            return await _context.ScoreEvents.AsNoTracking()
+                .Where(e => e.MatchId == matchId)
+                .OrderBy(e => e.Id)
+                .ToListAsync();
+        }
+
         // ================= FOULS =================
         public async Task AddFoulAsync(Foul foul) => await _context.Fouls.AddAsync(foul);
 
+        public async Task<List<Foul>> GetFoulsAsync(int matchId)
+        {
+            return await _context.Fouls.AsNoTracking()
+                .Where(f => f.MatchId == matchId)
+                .OrderBy(f => f.Id)
+                .ToListAsync();
+        }
+
         public async Task<int> GetFoulCountAsync(int matchId, int teamId)
         {
             return await _context.Fouls.AsNoTracking()
@@ -7,6 +7,7 @@ namespace MatchesService.Services
         // ==================== LISTADOS ====================
         Task<object> ListarAsync(int page, int pageSize, string? status, int? teamId, DateTime? from, DateTime? to);
         Task<object?> GetMatchAsync(int id);
+        Task<object?> GetEventsAsync(int id);
         Task<object> ProximosAsync();
         Task<(bool Success, string? Error, object? Data)> RangoAsync(DateTime from, DateTime to);
 
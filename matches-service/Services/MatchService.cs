@@ -117,6 +117,22 @@ namespace MatchesService.Services
             };
         }
 
+        /// <summary>Anotaciones y faltas del partido (para el ETL de reportes); null si no existe.</summary>
+        public async Task<object?> GetEventsAsync(int id)
+        {
+            if (!await _repo.ExistsAsync(id)) return null;
+
+            var scoreEvents = await _repo.GetScoreEventsAsync(id);
+            var fouls = await _repo.GetFoulsAsync(id);
+
+            return new
+            {
+                MatchId = id,
+                ScoreEvents = scoreEvents.Select(e => new { e.Id, e.TeamId, e.PlayerId, e.Points, e.Note, e.DateRegister }),
+                Fouls = fouls.Select(f => new { f.Id, f.TeamId, f.PlayerId, f.Type, f.DateRegister })
+            };
+        }
+
         public async Task<object> ProximosAsync()
         {
             var data = await _repo.GetUpcomingAsync();
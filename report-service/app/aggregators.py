@@ -1,17 +1,18 @@
 from __future__ import annotations
+import time
 from typing import Any, Optional
-from . import clients
+
+import leaguestats
+from leaguestats import LeagueTable, SortKey
+
+from . import clients, etag, metrics, planner, timing
+from .cache import cache_key, cached
+from .planner import Creds
 
 async def teams_map(x_api=None, x_teams=None) -> dict[str, str]:
     return await clients.fetch_teams_map(x_api, x_teams)
 
-async def match_roster(
-    match_id: str,
-    x_api: Optional[str] = None,
-    x_matches: Optional[str] = None,
-    x_players: Optional[str] = None,
-    x_teams: Optional[str] = None,
-) -> dict[str, Any]:
+async def match_roster(match_id: str, creds: Optional[Creds] = None) -> dict[str, Any]:
     """
     Estructura devuelta:
       {
@@ -19,52 +20,61 @@ async def match_roster(
         "homePlayers": [...],
         "awayPlayers": [...]
       }
+    El partido se pide primero (da los ids); jugadores y nombres de ambos
+    equipos se piden después en paralelo, con lookups puntuales de equipo.
     """
-    match = await clients.fetch_match_by_id(match_id, x_api, x_matches)
+    creds = creds or Creds()
+    match = (await planner.fetch(creds, match=planner.match(match_id)))["match"]
     if not match:
         return {"match": None, "homePlayers": [], "awayPlayers": []}
 
     home_id = str(match.get("HomeTeamId") or match.get("homeTeamId") or "")
     away_id = str(match.get("AwayTeamId") or match.get("awayTeamId") or "")
-    home_players = await clients.fetch_players(home_id or None, x_api, x_players)
-    away_players = await clients.fetch_players(away_id or None, x_api, x_players)
+    got = await planner.fetch(
+        creds,
+        home_players=planner.players(home_id or None),
+        away_players=planner.players(away_id or None),
+        home_name=planner.team_name(home_id),
+        away_name=planner.team_name(away_id),
+    )
 
-    tmap = await clients.fetch_teams_map(x_api, x_teams)
     match_resolved = dict(match)
-    match_resolved["HomeTeamName"] = tmap.get(home_id, home_id)
-    match_resolved["AwayTeamName"] = tmap.get(away_id, away_id)
-
-    return {"match": match_resolved, "homePlayers": home_players, "awayPlayers": away_players}
-
-def _i(v, default=0) -> int:
-    try: return int(v)
-    except Exception: return default
+    match_resolved["HomeTeamName"] = got["home_name"]
+    match_resolved["AwayTeamName"] = got["away_name"]
 
-def aggregate_stats_from_matches(matches: list[dict[str, Any]], tmap: dict[str, str]) -> dict[str, dict[str, Any]]:
-    stats: dict[str, dict[str, Any]] = {}
+    return {"match": match_resolved, "homePlayers": got["home_players"], "awayPlayers": got["away_players"]}
 
-    def ensure(team_id: str) -> dict[str, Any]:
-        if team_id not in stats:
-            stats[team_id] = {
-                "teamId": team_id,
-                "team": tmap.get(team_id, team_id),
-                "played": 0, "wins": 0, "losses": 0, "pf": 0, "pa": 0
-            }
-        return stats[team_id]
+def aggregate_stats_from_matches(matches: list[dict[str, Any]], tmap: dict[str, str]) -> LeagueTable:
+    t0 = time.perf_counter()
+    table = leaguestats.aggregate(leaguestats.load_matches(matches), tmap)
+    elapsed = time.perf_counter() - t0
+    timing.add("aggregate", elapsed)
+    metrics.AGGREGATE_SECONDS.observe(elapsed, "matches")
+    metrics.ROWS_AGGREGATED.inc("matches", amount=len(matches))
+    return table
 
-    for m in matches:
-        h_id = str(m.get("HomeTeamId") or m.get("homeTeamId") or "")
-        a_id = str(m.get("AwayTeamId") or m.get("awayTeamId") or "")
-        hs   = _i(m.get("HomeScore") or m.get("homeScore"))
-        as_  = _i(m.get("AwayScore") or m.get("awayScore"))
-        if not h_id or not a_id:
-            continue
+# Rankings del resumen estadístico: (clave JSON, título PDF, orden)
+SUMMARY_RANKINGS: tuple[tuple[str, str, tuple[SortKey, ...]], ...] = (
+    ("topWins",   "Top por Victorias",      (("wins", True),)),
+    ("topPF",     "Top por Puntos a Favor", (("pf", True),)),
+    ("minPF",     "Menos Puntos a Favor",   (("pf", False),)),
+    ("minLosses", "Menos Derrotas",         (("losses", False), ("wins", True))),
+)
+SUMMARY_TOP = 10
+STANDINGS_ORDER: tuple[SortKey, ...] = (("wins", True),)
 
-        H = ensure(h_id); A = ensure(a_id)
-        H["played"] += 1; A["played"] += 1
-        H["pf"] += hs; H["pa"] += as_
-        A["pf"] += as_; A["pa"] += hs
-        if hs > as_: H["wins"] += 1; A["losses"] += 1
-        elif as_ > hs: A["wins"] += 1; H["losses"] += 1
-
-    return stats
+async def league_stats(creds: Creds) -> tuple[LeagueTable, str]:
+    """
+    aggregate_stats_from_matches sobre todos los partidos, cacheado en
+    columnas (familia 'aggregate') por endpoint + credencial, junto con la
+    huella de las entradas (partidos + mapa de equipos). La huella es el ETag
+    de standings/summary: con el agregado en cache no se descargan partidos;
+    solo se piden al faltar la entrada o al refrescarla (stale-while-revalidate).
+    """
+    async def compute() -> dict[str, Any]:
+        got = await planner.fetch(creds, matches=planner.matches(), tmap=planner.teams_map())
+        table = aggregate_stats_from_matches(got["matches"], got["tmap"])
+        return {"digest": etag.matches_digest(got["matches"]) + etag.rows_digest(got["tmap"]),
+                "table": table.to_columns()}
+    entry = await cached("aggregate", cache_key("league_stats", None, creds.scope()), compute)
+    return LeagueTable.from_columns(entry["table"]), entry["digest"]
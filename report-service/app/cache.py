@@ -1,26 +1,196 @@
+import asyncio
+import contextvars
+import logging
 import os
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+from urllib.parse import urlencode
 
+import msgpack
 from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+log = logging.getLogger(__name__)
+
+# TTL "fresco" por familia de claves (s); se sobreescribe con CACHE_TTL_<FAMILIA>
+DEFAULT_FAMILY_TTLS: dict[str, int] = {
+    "teams_map": 60,
+    "aggregate": 30,
+    "standings": 30,
+    "summary": 30,
+}
+# Tras un error de Redis se deja de intentar durante estos segundos
+_BACKOFF_SECONDS = 10.0
+# True dentro de un refresco en segundo plano: las entradas vencidas que lea
+# (p. ej. el agregado bajo standings) se recalculan en vez de servirse
+_revalidating: contextvars.ContextVar[bool] = contextvars.ContextVar("cache_revalidating", default=False)
+
+
+def cache_key(endpoint: str, params: Optional[dict[str, Any]], scope: str) -> str:
+    """endpoint + query normalizada (ordenada, sin vacíos) + alcance de credencial."""
+    q = urlencode(sorted((k, str(v)) for k, v in (params or {}).items() if v not in (None, "")))
+    return f"{endpoint}?{q}#{scope}"
+
+def _pack(value: Any) -> bytes:
+    # [creado_en, payload] en msgpack: compacto y sin pasar por JSON
+    return msgpack.packb([time.time(), value], use_bin_type=True)
+
+def _unpack(raw: bytes) -> tuple[float, Any]:
+    created, value = msgpack.unpackb(raw, raw=False, strict_map_key=False)
+    return float(created), value
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0       # servido vencido mientras se refresca en segundo plano
+    refreshes: int = 0
+    errors: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return dict(self.__dict__)
 
 
 @dataclass
 class Cache:
     redis: aioredis.Redis
     prefix: str = "cache:"
-    ttl_seconds: int = 300  
+    ttl_seconds: int = 300
+    # Ventana extra en la que una entrada vencida aún se sirve (stale-while-revalidate)
+    stale_seconds: int = 300
+    family_ttls: dict[str, int] = field(default_factory=dict)
+    stats: CacheStats = field(default_factory=CacheStats)
+    _refreshing: set[str] = field(default_factory=set)
+    _tasks: set[asyncio.Task] = field(default_factory=set)
+    _down_until: float = 0.0
 
     @classmethod
     def from_env(cls) -> "Cache":
         url = os.getenv("REDIS_URL", "redis://redis:6379/0")
         ttl = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+        stale = int(os.getenv("CACHE_STALE_SECONDS", "300"))
+        families = {
+            fam: int(os.getenv(f"CACHE_TTL_{fam.upper()}", str(default)))
+            for fam, default in DEFAULT_FAMILY_TTLS.items()
+        }
         return cls(
-            redis=aioredis.from_url(url, decode_responses=False), ttl_seconds=ttl
+            redis=aioredis.from_url(url, decode_responses=False),
+            ttl_seconds=ttl, stale_seconds=stale, family_ttls=families,
         )
 
     async def get(self, key: str) -> bytes | None:
         v = await self.redis.get(self.prefix + key)
         return v
 
-    async def set(self, key: str, value: bytes) -> None:
-        await self.redis.set(self.prefix + key, value, ex=self.ttl_seconds)
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        await self.redis.set(self.prefix + key, value, ex=ttl or self.ttl_seconds)
+
+    def ttl_for(self, family: str) -> int:
+        return self.family_ttls.get(family, self.ttl_seconds)
+
+    def _failed(self, e: Exception) -> None:
+        self.stats.errors += 1
+        self._down_until = time.monotonic() + _BACKOFF_SECONDS
+        log.warning("Redis no disponible (%s); cache desactivado %ss", e, _BACKOFF_SECONDS)
+
+    async def _store(self, family: str, key: str, value: Any) -> None:
+        try:
+            await self.set(key, _pack(value), ttl=self.ttl_for(family) + self.stale_seconds)
+        except (RedisError, OSError) as e:
+            self._failed(e)
+
+    def _revalidate(self, family: str, key: str, compute: Callable[[], Awaitable[Any]]) -> None:
+        # Una sola tarea de refresco por clave en este proceso
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def run() -> None:
+            _revalidating.set(True)
+            try:
+                # Lock corto en Redis: solo una réplica recalcula
+                lock = self.prefix + "lock:" + key
+                if await self.redis.set(lock, b"1", nx=True, ex=30):
+                    try:
+                        await self._store(family, key, await compute())
+                        self.stats.refreshes += 1
+                    finally:
+                        await self.redis.delete(lock)
+            except (RedisError, OSError) as e:
+                self._failed(e)
+            except Exception as e:
+                log.warning("refresco de %s falló: %s", key, e)
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def cached(self, family: str, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Devuelve el valor de `family:key`:
+          - fresco  -> hit
+          - vencido (dentro de stale_seconds) -> se sirve y se refresca en segundo plano
+            (un refresco que lee otra entrada vencida la recalcula en vez de servirla)
+          - ausente -> se calcula y se guarda
+        Si Redis falla se calcula sin cache.
+        """
+        full = f"{family}:{key}"
+        if time.monotonic() < self._down_until:
+            return await compute()
+        try:
+            raw = await self.get(full)
+        except (RedisError, OSError) as e:
+            self._failed(e)
+            return await compute()
+
+        if raw is not None:
+            created, value = _unpack(raw)
+            if time.time() - created < self.ttl_for(family):
+                self.stats.hits += 1
+                return value
+            if not _revalidating.get():
+                self.stats.stale += 1
+                self._revalidate(family, full, compute)
+                return value
+
+        self.stats.misses += 1
+        value = await compute()
+        await self._store(family, full, value)
+        return value
+
+    async def close(self) -> None:
+        for t in list(self._tasks):
+            t.cancel()
+        await self.redis.aclose()
+
+
+# -------------------------
+# Instancia del proceso
+# -------------------------
+# Se activa solo si REDIS_URL está definido (compose sin Redis -> sin cache).
+_cache: Optional[Cache] = None
+
+def get_cache() -> Optional[Cache]:
+    global _cache
+    if _cache is None and os.getenv("REDIS_URL"):
+        _cache = Cache.from_env()
+    return _cache
+
+async def cached(family: str, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+    c = get_cache()
+    if c is None:
+        return await compute()
+    return await c.cached(family, key, compute)
+
+def cache_stats() -> dict[str, int]:
+    return _cache.stats.as_dict() if _cache else CacheStats().as_dict()
+
+async def close_cache() -> None:
+    global _cache
+    if _cache is not None:
+        await _cache.close()
+        _cache = None
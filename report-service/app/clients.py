@@ -1,15 +1,93 @@
 from __future__ import annotations
 
-from datetime import datetime
+import asyncio
+import logging
+from functools import lru_cache
 from typing import Any, Optional
 from datetime import datetime, timezone
 import httpx
+from fastapi import HTTPException
 
 from .config import (
     TEAMS_API_BASE, PLAYERS_API_BASE, MATCHES_API_BASE,
     TEAMS_API_TOKEN, PLAYERS_API_TOKEN, MATCHES_API_TOKEN,
+    TEAMS_API_TIMEOUT, PLAYERS_API_TIMEOUT, MATCHES_API_TIMEOUT,
+    HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, HTTP_KEEPALIVE_EXPIRY,
+    HTTP_CONNECT_TIMEOUT, HTTP2_ENABLED,
+    UPSTREAM_MEMO_TTL_SECONDS, UPSTREAM_MEMO_MAX_ENTRIES, DATE_PARSE_CACHE_SIZE,
     choose_header,
 )
+from . import metrics
+from .pagination import paginator
+from .singleflight import SingleFlight, credential_scope
+
+log = logging.getLogger(__name__)
+
+# -------------------------
+# Pool de clientes compartidos
+# -------------------------
+# Un AsyncClient de larga vida por upstream: conserva keep-alive entre reportes
+# en lugar de abrir una conexión TCP nueva por cada llamada.
+_UPSTREAM_TIMEOUTS: dict[str, float] = {
+    "teams": TEAMS_API_TIMEOUT,
+    "players": PLAYERS_API_TIMEOUT,
+    "matches": MATCHES_API_TIMEOUT,
+}
+_clients: dict[str, httpx.AsyncClient] = {}
+
+def _http2_enabled() -> bool:
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        log.warning("HTTP2_ENABLED=true pero falta el paquete h2; se usa HTTP/1.1")
+        return False
+    return True
+
+def _new_client(upstream: str) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(_UPSTREAM_TIMEOUTS[upstream], connect=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        http2=_http2_enabled(),
+        event_hooks=metrics.upstream_hooks(upstream),
+    )
+
+def _client(upstream: str) -> httpx.AsyncClient:
+    """
+    Devuelve el cliente compartido del upstream. Se crea de forma perezosa
+    si el lifespan no lo abrió (scripts, consola).
+    """
+    cx = _clients.get(upstream)
+    if cx is None or cx.is_closed:
+        cx = _clients[upstream] = _new_client(upstream)
+    return cx
+
+async def open_clients() -> None:
+    """Abre un cliente por upstream (lifespan de FastAPI)."""
+    for upstream in _UPSTREAM_TIMEOUTS:
+        _client(upstream)
+
+async def close_clients() -> None:
+    """Cierra los clientes compartidos y libera sus conexiones."""
+    pending = list(_clients.values())
+    _clients.clear()
+    await asyncio.gather(*(cx.aclose() for cx in pending), return_exceptions=True)
+
+def upstream_502(e: httpx.HTTPStatusError) -> HTTPException:
+    """Error de un upstream -> 502 con su URL, status y el comienzo del cuerpo."""
+    return HTTPException(
+        status_code=502,
+        detail={
+            "upstream_url": str(e.request.url),
+            "status_code": e.response.status_code,
+            "body": (e.response.text or "")[:200],
+        },
+    )
 
 def _as_list_items(data: Any) -> list[dict[str, Any]]:
     """
@@ -37,29 +115,52 @@ def _as_list_items(data: Any) -> list[dict[str, Any]]:
         return []
     return []
 
+def _parse_iso_slow(s: str) -> datetime | None:
+    # fromisoformat(s) ya falló en _parse_iso_str
+    candidates = [s.replace("Z", "+00:00")]
+    if "T" in s:
+        candidates.append(s.split(".", 1)[0])
+    for cand in candidates:
+        try:
+            return datetime.fromisoformat(cand)
+        except ValueError:
+            continue
+    return None
+
+@lru_cache(maxsize=DATE_PARSE_CACHE_SIZE)
+def _parse_iso_str(s: str) -> datetime | None:
+    # Camino rápido: fromisoformat (3.11+) ya acepta "Z" y offsets
+    try:
+        dt: datetime | None = datetime.fromisoformat(s)
+    except ValueError:
+        dt = _parse_iso_slow(s)
+    # Si trae tz, pasamos a UTC y quitamos tzinfo para dejarlo naive
+    if dt is not None and dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
 def _parse_iso(d: str | None) -> datetime | None:
     """
     Devuelve SIEMPRE un datetime naive en UTC (sin tzinfo),
-    para evitar TypeError al comparar aware vs naive.
+    para evitar TypeError al comparar aware vs naive. Cacheado por texto:
+    los mismos partidos se re-filtran en cada reporte.
     """
     if not d:
         return None
-    s = str(d).strip()
+    return _parse_iso_str(str(d).strip())
 
-    candidates = [s, s.replace("Z", "+00:00")]
-    if "T" in s:
-        candidates.append(s.split(".", 1)[0])
 
-    for cand in candidates:
-        try:
-            dt = datetime.fromisoformat(cand)
-            # Si trae tz, pasamos a UTC y quitamos tzinfo para dejarlo naive
-            if dt.tzinfo is not None:
-                dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
-            return dt
-        except Exception:
-            continue
-    return None
+# -------------------------
+# Single-flight
+# -------------------------
+# Reportes simultáneos (standings + stats/summary) comparten un único fetch
+# por (upstream, parámetros, alcance de credencial) y su resultado se
+# reutiliza unos segundos. Los valores son compartidos: no mutarlos.
+_flight = SingleFlight(UPSTREAM_MEMO_TTL_SECONDS, UPSTREAM_MEMO_MAX_ENTRIES)
+
+def flight_stats() -> dict[str, int]:
+    """Contadores de coalescencia: fetches reales vs. llamadas servidas sin fetch."""
+    return _flight.stats()
 
 
 # -------------------------
@@ -70,68 +171,60 @@ async def fetch_teams(
 ) -> list[dict[str, Any]]:
     """
     Paginación Spring (0-based): page/size
-    Itera hasta last=true o number>=totalPages-1
+    Con totalPages de la primera página, el resto se pide en paralelo.
     """
-    url = f"{TEAMS_API_BASE}/api/teams"
     headers = choose_header(x_teams_auth, x_api_auth, TEAMS_API_TOKEN)
-    page, size = 0, 100
-    acc: list[dict[str, Any]] = []
-
-    async with httpx.AsyncClient(timeout=30) as cx:
-        while True:
-            params = {"page": page, "size": size}
-            r = await cx.get(url, headers=headers, params=params)
-            if r.status_code >= 400:
-                break
-            data = r.json()
-            items = _as_list_items(data)
-            if not items:
-                break
-            acc.extend(items)
-
-            if isinstance(data, dict):
-                if data.get("last") is True:
-                    break
-                number = data.get("number")
-                total_pages = data.get("totalPages")
-                if isinstance(number, int) and isinstance(total_pages, int):
-                    if number >= (total_pages - 1):
-                        break
-            page += 1
+    key = ("teams", (), credential_scope(headers))
+    return await _flight.do(key, lambda: _load_teams(headers))
 
+async def _load_teams(headers: dict[str, str]) -> list[dict[str, Any]]:
+    url = f"{TEAMS_API_BASE}/api/teams"
+    cx = _client("teams")
+
+    acc = await paginator("teams").fetch_all(cx, url, headers, _as_list_items)
     if acc:
         return acc
 
     # Fallback sin paginación
-    async with httpx.AsyncClient(timeout=30) as cx:
-        r = await cx.get(url, headers=headers)
-        r.raise_for_status()
-        return _as_list_items(r.json())
+    r = await cx.get(url, headers=headers)
+    r.raise_for_status()
+    return _as_list_items(r.json())
 
 async def fetch_team_by_id(
     team_id: str, x_api_auth: str | None = None, x_teams_auth: str | None = None
 ) -> dict[str, Any] | None:
-    url = f"{TEAMS_API_BASE}/api/teams/{team_id}"
     headers = choose_header(x_teams_auth, x_api_auth, TEAMS_API_TOKEN)
-    async with httpx.AsyncClient(timeout=30) as cx:
-        r = await cx.get(url, headers=headers)
-        if r.status_code == 404:
-            return None
-        r.raise_for_status()
-        return r.json()
+    key = ("team", (str(team_id),), credential_scope(headers))
+    return await _flight.do(key, lambda: _load_team_by_id(team_id, headers))
+
+async def _load_team_by_id(team_id: str, headers: dict[str, str]) -> dict[str, Any] | None:
+    url = f"{TEAMS_API_BASE}/api/teams/{team_id}"
+    r = await _client("teams").get(url, headers=headers)
+    if r.status_code == 404:
+        return None
+    r.raise_for_status()
+    return r.json()
 
 async def fetch_teams_map(
     x_api_auth: str | None = None, x_teams_auth: str | None = None
 ) -> dict[str, str]:
+    headers = choose_header(x_teams_auth, x_api_auth, TEAMS_API_TOKEN)
+    key = ("teams_map", (), credential_scope(headers))
+    return await _flight.do(key, lambda: _load_teams_map(x_api_auth, x_teams_auth))
+
+async def _load_teams_map(x_api_auth: str | None, x_teams_auth: str | None) -> dict[str, str]:
     teams = await fetch_teams(x_api_auth, x_teams_auth)
     mapping: dict[str, str] = {}
     for t in teams:
         tid = str(t.get("id") or t.get("Id") or "")
-        name = t.get("name") or t.get("Name") or t.get("teamName") or t.get("TeamName") or tid
         if tid:
-            mapping[tid] = str(name)
+            mapping[tid] = team_name(t, tid)
     return mapping
 
+def team_name(t: dict[str, Any], default: str = "") -> str:
+    name = t.get("name") or t.get("Name") or t.get("teamName") or t.get("TeamName") or default
+    return str(name)
+
 # -------------------------
 # Players-service
 # -------------------------
@@ -143,77 +236,31 @@ async def fetch_players(
     """
     GET /api/players?teamId=...  (Node/Express)
     Respuesta esperada: { items: [...], totalCount: N }  (sin last/number/totalPages)
-    Cortes de paginación:
-      - Si hay totalCount: (page+1)*size >= totalCount
-      - Si len(items) < size
-      - Límite duro de páginas para evitar loops si el backend ignora 'page'
+    Con totalCount se calculan las páginas restantes y se piden en paralelo;
+    sin él se avanza mientras lleguen páginas llenas. Una página repetida
+    (backend que ignora 'page') corta la paginación.
     """
-    url = f"{PLAYERS_API_BASE}/api/players"
     headers = choose_header(x_players_auth, x_api_auth, PLAYERS_API_TOKEN)
+    key = ("players", (team_id or "",), credential_scope(headers))
+    return await _flight.do(key, lambda: _load_players(team_id, headers))
 
-    page, size = 0, 100
-    MAX_PAGES = 1000
-    acc: list[dict[str, Any]] = []
-
-    async with httpx.AsyncClient(timeout=30) as cx:
-        while True:
-            if page >= MAX_PAGES:
-                # Safety break: evita loop infinito si el backend ignora 'page'
-                break
-
-            params: dict[str, Any] = {"page": page, "size": size}
-            if team_id:
-                params["teamId"] = team_id
-
-            r = await cx.get(url, headers=headers, params=params)
-            if r.status_code >= 400:
-                break
-
-            data = r.json()
-            items = _as_list_items(data)
-
-            # Si no hay items -> se acabó
-            if not items:
-                break
-
-            acc.extend(items)
-
-            # 1) Si viene totalCount, usamos corte matemático
-            total_count = None
-            if isinstance(data, dict):
-                try:
-                    tc = data.get("totalCount")
-                    if tc is not None:
-                        total_count = int(tc)
-                except Exception:
-                    total_count = None
-
-            if total_count is not None:
-                # Si ya cubrimos todo el total -> break
-                if (page + 1) * size >= total_count:
-                    break
-                page += 1
-                continue
-
-            # 2) Si NO hay totalCount, usamos el patrón clásico:
-            #    si el backend devolvió menos que 'size', asumimos última página.
-            if len(items) < size:
-                break
-
-            # 3) Si devolvió exactamente 'size' y no tenemos más señales,
-            #    avanzamos. Si el backend ignora 'page', se detendrá por MAX_PAGES.
-            page += 1
+async def _load_players(team_id: Optional[str], headers: dict[str, str]) -> list[dict[str, Any]]:
+    url = f"{PLAYERS_API_BASE}/api/players"
+    cx = _client("players")
+    params = {"teamId": team_id} if team_id else {}
 
+    acc = await paginator("players").fetch_all(cx, url, headers, _as_list_items, params)
     if acc:
         return acc
 
     # Fallback sin paginación (por si el backend no soporta page/size realmente)
-    async with httpx.AsyncClient(timeout=30) as cx:
-        params = {"teamId": team_id} if team_id else {}
-        r = await cx.get(url, headers=headers, params=params)
-        r.raise_for_status()
-        return _as_list_items(r.json())
+    r = await cx.get(url, headers=headers, params=params)
+    r.raise_for_status()
+    return _as_list_items(r.json())
 
+# -------------------------
+# Matches-service
+# -------------------------
 async def fetch_matches(
     from_date: Optional[str] = None,
     to_date: Optional[str] = None,
@@ -225,75 +272,58 @@ async def fetch_matches(
     - Si hay from/to: llamada directa SIN page/size (tu API paginada con page/size te da 500).
     - Si no hay from/to: intentar autopaginación; si falla, fallback simple.
     """
-    url = f"{MATCHES_API_BASE}/api/matches"
     headers = choose_header(x_matches_auth, x_api_auth, MATCHES_API_TOKEN)
+    key = ("matches", (from_date or "", to_date or ""), credential_scope(headers))
+    return await _flight.do(key, lambda: _load_matches(from_date, to_date, headers))
 
-    async with httpx.AsyncClient(timeout=30) as cx:
-        # ---- Caso con rango: NO usar paginación ----
-        if from_date or to_date:
-            params: dict[str, Any] = {}
-            if from_date: params["from"] = from_date
-            if to_date:   params["to"]   = to_date
-
-            r = await cx.get(url, headers=headers, params=params)
-            r.raise_for_status()
-            items = _as_list_items(r.json())
-
-            # Filtro defensivo local por si el backend no filtra correctamente
-            f_dt = _parse_iso(from_date); t_dt = _parse_iso(to_date)
-            if f_dt or t_dt:
-                filtered: list[dict[str, Any]] = []
-                for m in items:
-                    d = _parse_iso(str(m.get("DateMatch") or m.get("dateMatch") or m.get("date")))
-                    if f_dt and (not d or d < f_dt): continue
-                    if t_dt and (not d or d > t_dt): continue
-                    filtered.append(m)
-                return filtered
-            return items
-
-        # ---- Sin rango: intentar autopaginación ----
-        page, size = 0, 100
-        acc: list[dict[str, Any]] = []
-
-        while True:
-            params = {"page": page, "size": size}
-            r = await cx.get(url, headers=headers, params=params)
-            if r.status_code >= 400:
-                break
-            data = r.json()
-            items = _as_list_items(data)
-            if not items:
-                break
-            acc.extend(items)
-
-            if isinstance(data, dict):
-                if data.get("last") is True:
-                    break
-                number = data.get("number")
-                total_pages = data.get("totalPages")
-                if isinstance(number, int) and isinstance(total_pages, int) and number >= (total_pages - 1):
-                    break
-            page += 1
-
-        if acc:
-            return acc
-
-        # Fallback sin paginación
-        r = await cx.get(url, headers=headers)
-        r.raise_for_status()
-        return _as_list_items(r.json())
-
+async def _load_matches(
+    from_date: Optional[str], to_date: Optional[str], headers: dict[str, str]
+) -> list[dict[str, Any]]:
+    url = f"{MATCHES_API_BASE}/api/matches"
+    cx = _client("matches")
+    # ---- Caso con rango: NO usar paginación ----
+    if from_date or to_date:
+        params: dict[str, Any] = {}
+        if from_date: params["from"] = from_date
+        if to_date:   params["to"]   = to_date
 
+        r = await cx.get(url, headers=headers, params=params)
+        r.raise_for_status()
+        items = _as_list_items(r.json())
+
+        # Filtro defensivo local por si el backend no filtra correctamente
+        f_dt = _parse_iso(from_date); t_dt = _parse_iso(to_date)
+        if f_dt or t_dt:
+            filtered: list[dict[str, Any]] = []
+            for m in items:
+                d = _parse_iso(str(m.get("DateMatch") or m.get("dateMatch") or m.get("date")))
+                if f_dt and (not d or d < f_dt): continue
+                if t_dt and (not d or d > t_dt): continue
+                filtered.append(m)
+            return filtered
+        return items
+
+    # ---- Sin rango: intentar autopaginación ----
+    acc = await paginator("matches").fetch_all(cx, url, headers, _as_list_items)
+    if acc:
+        return acc
 
+    # Fallback sin paginación
+    r = await cx.get(url, headers=headers)
+    r.raise_for_status()
+    return _as_list_items(r.json())
 
 async def fetch_match_by_id(
     match_id: str, x_api_auth: Optional[str] = None, x_matches_auth: Optional[str] = None
 ) -> dict[str, Any] | None:
-    url = f"{MATCHES_API_BASE}/api/matches/{match_id}"
     headers = choose_header(x_matches_auth, x_api_auth, MATCHES_API_TOKEN)
-    async with httpx.AsyncClient(timeout=30) as cx:
-        r = await cx.get(url, headers=headers)
-        if r.status_code == 404:
-            return None
-        r.raise_for_status()
-        return r.json()
+    key = ("match", (str(match_id),), credential_scope(headers))
+    return await _flight.do(key, lambda: _load_match_by_id(match_id, headers))
+
+async def _load_match_by_id(match_id: str, headers: dict[str, str]) -> dict[str, Any] | None:
+    url = f"{MATCHES_API_BASE}/api/matches/{match_id}"
+    r = await _client("matches").get(url, headers=headers)
+    if r.status_code == 404:
+        return None
+    r.raise_for_status()
+    return r.json()
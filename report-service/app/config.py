@@ -15,6 +15,45 @@ MATCHES_API_TOKEN = (os.getenv("MATCHES_API_TOKEN", "") or "").strip()
 
 UPSTREAM_TOKEN = (os.getenv("UPSTREAM_TOKEN", "") or "").strip()
 
+# Pool HTTP compartido (un AsyncClient por upstream, ver clients.open_clients)
+HTTP_MAX_CONNECTIONS  = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE    = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT  = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+# HTTP/2 requiere el extra httpx[http2] (paquete h2); si no está, se usa HTTP/1.1
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+
+# Timeout de lectura por upstream (segundos)
+TEAMS_API_TIMEOUT   = float(os.getenv("TEAMS_API_TIMEOUT",   "30"))
+PLAYERS_API_TIMEOUT = float(os.getenv("PLAYERS_API_TIMEOUT", "30"))
+MATCHES_API_TIMEOUT = float(os.getenv("MATCHES_API_TIMEOUT", "30"))
+
+# Autopaginación (ver pagination.Paginator)
+PAGE_SIZE              = int(os.getenv("PAGE_SIZE", "100"))       # tamaño inicial
+PAGE_SIZE_MIN          = int(os.getenv("PAGE_SIZE_MIN", "50"))
+PAGE_SIZE_MAX          = int(os.getenv("PAGE_SIZE_MAX", "1000"))
+PAGINATION_CONCURRENCY = int(os.getenv("PAGINATION_CONCURRENCY", "4"))  # páginas en vuelo
+PAGINATION_TARGET_MS   = float(os.getenv("PAGINATION_TARGET_MS", "250"))  # latencia objetivo/página
+PAGINATION_MAX_PAGES   = int(os.getenv("PAGINATION_MAX_PAGES", "1000"))   # límite duro
+
+# Single-flight + memo corto de datasets de upstream (0 = solo coalescencia)
+UPSTREAM_MEMO_TTL_SECONDS = float(os.getenv("UPSTREAM_MEMO_TTL_SECONDS", "5"))
+UPSTREAM_MEMO_MAX_ENTRIES = int(os.getenv("UPSTREAM_MEMO_MAX_ENTRIES", "256"))
+
+# Fechas ISO ya parseadas (texto -> datetime), para el filtro from/to del camino live
+DATE_PARSE_CACHE_SIZE = int(os.getenv("DATE_PARSE_CACHE_SIZE", "65536"))
+
+# Render de PDF fuera del event loop (ver render.Renderer)
+PDF_RENDER_EXECUTOR = os.getenv("PDF_RENDER_EXECUTOR", "process").lower()  # process | thread
+PDF_RENDER_WORKERS  = int(os.getenv("PDF_RENDER_WORKERS", str(os.cpu_count() or 2)))
+# En cola + en curso; por encima se responde 503 con Retry-After
+PDF_RENDER_MAX_PENDING     = int(os.getenv("PDF_RENDER_MAX_PENDING", str(PDF_RENDER_WORKERS * 4)))
+PDF_RENDER_TIMEOUT_SECONDS = float(os.getenv("PDF_RENDER_TIMEOUT_SECONDS", "60"))
+# Renders de jobs (POST /reports/jobs): esperan lugar en el pool en vez de 503; 0 = sin límite
+PDF_JOB_RENDER_TIMEOUT_SECONDS = float(os.getenv("PDF_JOB_RENDER_TIMEOUT_SECONDS", "1800"))
+# Reportes largos: el worker escribe aquí y se sirven en trozos desde disco
+PDF_SPOOL_DIR = os.getenv("PDF_SPOOL_DIR") or None   # None -> tempdir del sistema
+
 def _bearer_header(value: Optional[str]) -> dict[str, str]:
     if not value:
         return {}
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Any, Optional
+
+from pymongo.errors import PyMongoError
+
+from . import clients, paging, repo
+from .paging import Page, PageQuery
+from .singleflight import SingleFlight
+
+if TYPE_CHECKING:
+    from .planner import Creds
+
+log = logging.getLogger(__name__)
+
+
+class LiveSource:
+    """Lee directo de teams/players/matches-service."""
+    name = "live"
+
+    async def teams(self, c: Creds) -> list[dict[str, Any]]:
+        return await clients.fetch_teams(c.api, c.teams)
+
+    async def teams_map(self, c: Creds) -> dict[str, str]:
+        return await clients.fetch_teams_map(c.api, c.teams)
+
+    async def team(self, c: Creds, team_id: str) -> Optional[dict[str, Any]]:
+        return await clients.fetch_team_by_id(team_id, c.api, c.teams)
+
+    async def players(self, c: Creds, team_id: Optional[str] = None) -> list[dict[str, Any]]:
+        return await clients.fetch_players(team_id, c.api, c.players)
+
+    async def matches(
+        self, c: Creds, from_date: Optional[str] = None, to_date: Optional[str] = None
+    ) -> list[dict[str, Any]]:
+        return await clients.fetch_matches(from_date, to_date, c.api, c.matches)
+
+    async def match(self, c: Creds, match_id: str) -> Optional[dict[str, Any]]:
+        return await clients.fetch_match_by_id(match_id, c.api, c.matches)
+
+    async def player_stats(self, c: Creds, player_id: str) -> Optional[dict[str, Any]]:
+        # Los upstreams no exponen estadísticas por jugador: solo las arma el ETL
+        return None
+
+    # Los upstreams no paginan por cursor: se descarga y se ordena en memoria
+    async def players_page(self, c: Creds, q: PageQuery) -> Page:
+        rows = paging.filter_players(await self.players(c, q.team), q)
+        return paging.keyset(rows, paging.player_key, q.after, q.limit)
+
+    async def matches_page(self, c: Creds, q: PageQuery) -> Page:
+        rows = paging.filter_matches(await self.matches(c, q.from_date, q.to_date), q)
+        return paging.keyset(rows, paging.match_key, q.after, q.limit)
+
+
+class MongoSource:
+    """Lee del read-model `reports` que mantiene etl-service."""
+    name = "mongo"
+
+    async def teams(self, c: Creds) -> list[dict[str, Any]]:
+        return await repo.get_teams()
+
+    async def teams_map(self, c: Creds) -> dict[str, str]:
+        return await repo.get_teams_map()
+
+    async def team(self, c: Creds, team_id: str) -> Optional[dict[str, Any]]:
+        return await repo.get_team(team_id)
+
+    async def players(self, c: Creds, team_id: Optional[str] = None) -> list[dict[str, Any]]:
+        if team_id:
+            return await repo.get_players_by_team(team_id)
+        return await repo.get_players_all()
+
+    async def matches(
+        self, c: Creds, from_date: Optional[str] = None, to_date: Optional[str] = None
+    ) -> list[dict[str, Any]]:
+        if not (from_date or to_date):
+            return await repo.get_matches_all()
+        # Rango resuelto por Mongo sobre el índice de fecha (date es datetime UTC)
+        return await repo.get_matches_range(from_date, to_date)
+
+    async def match(self, c: Creds, match_id: str) -> Optional[dict[str, Any]]:
+        return await repo.get_match(match_id)
+
+    async def player_stats(self, c: Creds, player_id: str) -> Optional[dict[str, Any]]:
+        return await repo.get_player_stats(player_id)
+
+    async def players_page(self, c: Creds, q: PageQuery) -> Page:
+        rows, more = await repo.page_players(paging.PLAYER_SORT, q.after, q.limit, q.team, q.position)
+        return Page(rows, paging.player_key(rows[-1]) if more else None)
+
+    async def matches_page(self, c: Creds, q: PageQuery) -> Page:
+        rows, more = await repo.page_matches(paging.MATCH_SORT, q.after, q.limit, q.team, q.status,
+                                             q.from_date, q.to_date)
+        return Page(rows, paging.match_key(rows[-1]) if more else None)
+
+
+# Dataset del ETL (etl_meta._id) que respalda cada lectura
+_DATASET = {
+    "teams": "teams", "teams_map": "teams", "team": "teams",
+    "players": "players", "players_page": "players",
+    "matches": "matches", "match": "matches", "matches_page": "matches",
+}
+
+
+class ReadModelSource:
+    """
+    Sirve desde Mongo los datasets cuya última carga del ETL tiene menos de
+    `max_age` segundos; el resto (o si Mongo falla) va a los upstreams.
+    La decisión es por dataset: equipos frescos + partidos viejos mezcla fuentes.
+    """
+    name = "read-model"
+
+    def __init__(
+        self, primary: MongoSource, fallback: LiveSource, max_age: float, check_ttl: float
+    ):
+        self.primary = primary
+        self.fallback = fallback
+        self.max_age = max_age
+        # La frescura (y un Mongo caído) se consulta como mucho una vez cada check_ttl s
+        self._checks = SingleFlight(check_ttl, max_entries=16)
+
+    async def _probe(self, dataset: str) -> bool:
+        try:
+            age = await repo.dataset_age(dataset)
+        except PyMongoError as e:
+            log.warning("read-model no disponible (%s); se usa live", e)
+            return False
+        return age is not None and age <= self.max_age
+
+    async def _fresh(self, dataset: str) -> bool:
+        return await self._checks.do(dataset, lambda: self._probe(dataset))
+
+    async def _call(self, op: str, *args: Any) -> Any:
+        if await self._fresh(_DATASET[op]):
+            try:
+                return await getattr(self.primary, op)(*args)
+            except PyMongoError as e:
+                log.warning("read-model %s falló (%s); se usa live", op, e)
+        return await getattr(self.fallback, op)(*args)
+
+    async def teams(self, c: Creds) -> list[dict[str, Any]]:
+        return await self._call("teams", c)
+
+    async def teams_map(self, c: Creds) -> dict[str, str]:
+        return await self._call("teams_map", c)
+
+    async def team(self, c: Creds, team_id: str) -> Optional[dict[str, Any]]:
+        return await self._call("team", c, team_id)
+
+    async def players(self, c: Creds, team_id: Optional[str] = None) -> list[dict[str, Any]]:
+        return await self._call("players", c, team_id)
+
+    async def matches(
+        self, c: Creds, from_date: Optional[str] = None, to_date: Optional[str] = None
+    ) -> list[dict[str, Any]]:
+        return await self._call("matches", c, from_date, to_date)
+
+    async def match(self, c: Creds, match_id: str) -> Optional[dict[str, Any]]:
+        return await self._call("match", c, match_id)
+
+    async def player_stats(self, c: Creds, player_id: str) -> Optional[dict[str, Any]]:
+        # Live no tiene con qué reemplazarlo: se sirve aunque la última carga sea vieja
+        try:
+            return await self.primary.player_stats(c, player_id)
+        except PyMongoError as e:
+            log.warning("read-model player_stats falló (%s)", e)
+            return None
+
+    async def players_page(self, c: Creds, q: PageQuery) -> Page:
+        return await self._call("players_page", c, q)
+
+    async def matches_page(self, c: Creds, q: PageQuery) -> Page:
+        return await self._call("matches_page", c, q)
+
+
+DataSource = LiveSource | MongoSource | ReadModelSource
+
+_live = LiveSource()
+_source: DataSource = (
+    ReadModelSource(MongoSource(), _live, repo.READ_MODEL_MAX_AGE_SECONDS,
+                    repo.READ_MODEL_CHECK_SECONDS)
+    if repo.READ_FROM_CACHE else _live
+)
+
+def current() -> DataSource:
+    """Fuente de datos activa (READ_FROM_CACHE=true -> read-model con fallback)."""
+    return _source
+
+async def startup() -> None:
+    if repo.READ_FROM_CACHE:
+        await repo.connect()
+
+async def shutdown() -> None:
+    if repo.READ_FROM_CACHE:
+        repo.close()
@@ -1,22 +1,116 @@
-
 from __future__ import annotations
 
+import hashlib
+import logging
 import os
-from typing import Any, Iterable, Set
-from jose import jwt, JWTError
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional, Set
+from jose import jwk, jwt, JWTError
+from jose.backends.base import Key
 from fastapi import Header, HTTPException
 
 HS_SECRET = os.getenv("AUTH_HS256_SECRET")
 PUB_KEY   = os.getenv("AUTH_PUBLIC_KEY_PEM")
 AUD       = os.getenv("JWT_AUDIENCE", "py-microservices")
 ISS       = os.getenv("JWT_ISSUER", "auth-service")
+# Claims ya verificados (LRU por digest del token; cada entrada vence en el exp del token)
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "1024"))
+# Tokens sin exp: cuánto se confía en una verificación previa
+AUTH_CACHE_NO_EXP_TTL_SECONDS = float(os.getenv("AUTH_CACHE_NO_EXP_TTL_SECONDS", "300"))
 
-def _decode(token: str) -> dict[str, Any]:
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class AuthStats:
+    verifications: int = 0   # decodes reales (firma + claims)
+    cache_hits: int = 0
+    failures: int = 0
+    verify_ms_total: float = 0.0
+    verify_ms_max: float = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {k: round(v, 3) if isinstance(v, float) else v for k, v in self.__dict__.items()}
+
+
+class TokenVerifier:
+    """
+    Verifica JWT con una clave ya parseada (el PEM se lee una vez, no por decode)
+    y recuerda los claims válidos hasta el exp de cada token.
+    """
+
+    def __init__(self, key: Key, alg: str, max_entries: int = AUTH_CACHE_MAX_ENTRIES,
+                 no_exp_ttl: float = AUTH_CACHE_NO_EXP_TTL_SECONDS):
+        self.key = key
+        self.alg = alg
+        self.max_entries = max_entries
+        self.no_exp_ttl = no_exp_ttl
+        self.stats = AuthStats()
+        self._cache: OrderedDict[bytes, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    @classmethod
+    def from_secret(cls, secret: str, alg: str, **kw: Any) -> "TokenVerifier":
+        return cls(jwk.construct(secret, alg), alg, **kw)
+
+    def decode(self, token: str) -> dict[str, Any]:
+        """Decode sin cache (firma, exp, aud, iss)."""
+        return jwt.decode(token, self.key, algorithms=[self.alg], audience=AUD, issuer=ISS)
+
+    def verify(self, token: str) -> dict[str, Any]:
+        digest = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        hit = self._cache.get(digest)
+        if hit is not None:
+            if now < hit[0]:
+                self._cache.move_to_end(digest)
+                self.stats.cache_hits += 1
+                return hit[1]
+            del self._cache[digest]
+
+        t0 = time.perf_counter()
+        try:
+            claims = self.decode(token)
+        except JWTError:
+            self.stats.failures += 1
+            raise
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            self.stats.verifications += 1
+            self.stats.verify_ms_total += ms
+            self.stats.verify_ms_max = max(self.stats.verify_ms_max, ms)
+
+        exp = claims.get("exp")
+        expires = float(exp) if isinstance(exp, (int, float)) else now + self.no_exp_ttl
+        self._cache[digest] = (expires, claims)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return claims
+
+
+_verifier: Optional[TokenVerifier] = None
+
+def load_key() -> Optional[TokenVerifier]:
+    """Parsea la clave configurada (lifespan). RS256 tiene prioridad sobre HS256."""
+    global _verifier
     if PUB_KEY:
-        return jwt.decode(token, PUB_KEY, algorithms=["RS256"], audience=AUD, issuer=ISS)
-    if HS_SECRET:
-        return jwt.decode(token, HS_SECRET, algorithms=["HS256"], audience=AUD, issuer=ISS)
-    raise HTTPException(status_code=500, detail="No JWT key configured (AUTH_PUBLIC_KEY_PEM or AUTH_HS256_SECRET)")
+        _verifier = TokenVerifier.from_secret(PUB_KEY, "RS256")
+    elif HS_SECRET:
+        _verifier = TokenVerifier.from_secret(HS_SECRET, "HS256")
+    else:
+        log.warning("Sin clave JWT (AUTH_PUBLIC_KEY_PEM o AUTH_HS256_SECRET): rutas admin darán 500")
+    return _verifier
+
+def _decode(token: str) -> dict[str, Any]:
+    if _verifier is None and load_key() is None:
+        raise HTTPException(status_code=500, detail="No JWT key configured (AUTH_PUBLIC_KEY_PEM or AUTH_HS256_SECRET)")
+    return _verifier.verify(token)
+
+def auth_stats() -> dict[str, Any]:
+    if _verifier is None:
+        return AuthStats().as_dict()
+    return {"alg": _verifier.alg, "cached": len(_verifier._cache), **_verifier.stats.as_dict()}
 
 def _roles_from_claims(claims: dict[str, Any]) -> Set[str]:
     bag: Set[str] = set()
@@ -29,7 +123,7 @@ def _roles_from_claims(claims: dict[str, Any]) -> Set[str]:
         bag.update([str(x) for x in r2])
     return set(x.lower() for x in bag)
 
-async def require_admin(authorization: str | None = Header(default=None)):
+async def require_admin(authorization: str | None = Header(default=None)) -> dict[str, Any]:
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(status_code=401, detail="Missing Authorization")
     token = authorization.split(" ", 1)[1]
@@ -40,3 +134,4 @@ async def require_admin(authorization: str | None = Header(default=None)):
     roles = _roles_from_claims(claims)
     if "admin" not in roles:
         raise HTTPException(status_code=403, detail="Admin required")
+    return claims
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Iterable, Optional
+
+from fastapi import Request, Response
+
+# Sube si cambia el formato de algún reporte (invalida ETags emitidos)
+FORMAT_VERSION = "3"
+
+# Cache-Control de reportes: privados (requieren admin) y siempre revalidados
+CACHE_CONTROL = "private, no-cache"
+
+def _h() -> Any:
+    return hashlib.blake2b(digest_size=16)
+
+# -------------------------
+# Huellas de datasets
+# -------------------------
+def matches_digest(matches: list[dict[str, Any]]) -> str:
+    # Solo lo que afecta a los reportes: ids, equipos, marcador, estado y fecha
+    h = _h()
+    for m in matches:
+        h.update(repr((
+            m.get("id") or m.get("Id"),
+            m.get("homeTeamId") or m.get("HomeTeamId"),
+            m.get("awayTeamId") or m.get("AwayTeamId"),
+            m.get("homeScore") or m.get("HomeScore"),
+            m.get("awayScore") or m.get("AwayScore"),
+            m.get("status") or m.get("Status"),
+            m.get("dateMatch") or m.get("DateMatch") or m.get("date"),
+        )).encode())
+    return h.hexdigest()
+
+def rows_digest(rows: Any) -> str:
+    """Huella genérica (equipos, jugadores, mapa de equipos, roster)."""
+    if rows is None:
+        return "none"
+    h = _h()
+    h.update(json.dumps(rows, sort_keys=True, separators=(",", ":"), default=str).encode())
+    return h.hexdigest()
+
+# -------------------------
+# ETag / If-None-Match
+# -------------------------
+def strong(request: Request, digests: Iterable[str]) -> str:
+    """ETag fuerte: ruta + query normalizada + versión de formato + huellas de entrada."""
+    h = _h()
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    h.update(f"{FORMAT_VERSION}|{request.url.path}?{query}".encode())
+    for d in digests:
+        h.update(b"|" + d.encode())
+    return f'"{h.hexdigest()}"'
+
+def is_fresh(request: Request, etag: str) -> bool:
+    """If-None-Match usa comparación débil (RFC 9110): se ignora el prefijo W/."""
+    header: Optional[str] = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+def headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=headers(etag))
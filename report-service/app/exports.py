@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import zlib
+from collections.abc import Iterable, Iterator
+from typing import Any, Callable
+
+from .pdf_utils import _safe
+
+# Exportaciones tabulares (CSV / NDJSON) de los mismos datasets que los PDF.
+# Todo es generador: memoria constante sin importar la cantidad de filas.
+
+# Filas por trozo emitido (cada trozo es un write al socket)
+EXPORT_BATCH_ROWS = 500
+
+Record = dict[str, Any]
+
+
+# -------------------------
+# Normalización (mismos alias que los builders de pdf_utils)
+# -------------------------
+TEAM_COLUMNS = ("id", "name", "city", "coach")
+
+def team_records(teams: Iterable[dict[str, Any]]) -> Iterator[Record]:
+    for t in teams:
+        if not isinstance(t, dict):
+            continue
+        yield {
+            "id": _safe(t, "id", "Id", "teamId", "TeamId", default=None),
+            "name": _safe(t, "name", "Name", "teamName", "TeamName", default=None),
+            "city": _safe(t, "city", "City", "location", "Location", default=None),
+            "coach": _safe(t, "coach", "Coach", "manager", "Manager", default=None),
+        }
+
+PLAYER_COLUMNS = ("id", "name", "teamId", "team", "age", "position")
+
+def player_records(players: Iterable[dict[str, Any]], team_name_by_id: dict[str, str]) -> Iterator[Record]:
+    for p in players:
+        if not isinstance(p, dict):
+            continue
+        team_id = str(_safe(p, "team_id", "teamId", "TeamId", default=""))
+        yield {
+            "id": _safe(p, "id", "Id", "_id", default=None),
+            "name": _safe(p, "name", "Name", default=None),
+            "teamId": team_id or None,
+            "team": team_name_by_id.get(team_id, team_id or None),
+            "age": _safe(p, "age", "Age", default=None),
+            "position": _safe(p, "position", "Position", default=None),
+        }
+
+MATCH_COLUMNS = ("id", "date", "status", "homeTeamId", "homeTeam", "awayTeamId", "awayTeam",
+                 "homeScore", "awayScore")
+
+def match_records(matches: Iterable[dict[str, Any]], teams_map: dict[str, str]) -> Iterator[Record]:
+    for m in matches:
+        if not isinstance(m, dict):
+            continue
+        home_id = str(_safe(m, "homeTeamId", "HomeTeamId", default=""))
+        away_id = str(_safe(m, "awayTeamId", "AwayTeamId", default=""))
+        yield {
+            "id": _safe(m, "id", "Id", default=None),
+            "date": _safe(m, "dateMatch", "DateMatch", "date", default=None),
+            "status": _safe(m, "status", "Status", default=None),
+            "homeTeamId": home_id or None,
+            "homeTeam": teams_map.get(home_id, home_id or None),
+            "awayTeamId": away_id or None,
+            "awayTeam": teams_map.get(away_id, away_id or None),
+            "homeScore": _safe(m, "homeScore", "HomeScore", default=0),
+            "awayScore": _safe(m, "awayScore", "AwayScore", default=0),
+        }
+
+
+# -------------------------
+# Serialización por trozos
+# -------------------------
+def csv_chunks(records: Iterable[Record], columns: tuple[str, ...]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    w = csv.DictWriter(buf, fieldnames=columns, extrasaction="ignore", lineterminator="\n")
+    w.writeheader()
+    n = 0
+    for r in records:
+        w.writerow(r)
+        n += 1
+        if n % EXPORT_BATCH_ROWS == 0:
+            yield buf.getvalue().encode()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+def ndjson_chunks(records: Iterable[Record], columns: tuple[str, ...]) -> Iterator[bytes]:
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str).encode
+    lines: list[str] = []
+    for r in records:
+        lines.append(dumps(r))
+        if len(lines) == EXPORT_BATCH_ROWS:
+            yield ("\n".join(lines) + "\n").encode()
+            lines.clear()
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Comprime en streaming (formato gzip) sin juntar el cuerpo completo."""
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+FORMATS: dict[str, tuple[str, Callable[[Iterable[Record], tuple[str, ...]], Iterator[bytes]]]] = {
+    "csv": ("text/csv; charset=utf-8", csv_chunks),
+    "ndjson": ("application/x-ndjson", ndjson_chunks),
+}
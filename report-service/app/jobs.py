@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Optional, Protocol
+
+import httpx
+from fastapi import HTTPException
+
+from . import pdf_utils, render, reports
+from .planner import Creds
+
+log = logging.getLogger(__name__)
+
+REPORT_JOBS_CONCURRENCY = int(os.getenv("REPORT_JOBS_CONCURRENCY", "2"))
+REPORT_JOBS_MAX_QUEUED = int(os.getenv("REPORT_JOBS_MAX_QUEUED", "100"))
+REPORT_JOBS_TTL_SECONDS = float(os.getenv("REPORT_JOBS_TTL_SECONDS", "3600"))
+REPORT_JOBS_STORE = os.getenv("REPORT_JOBS_STORE", "local")
+REPORT_JOBS_DIR = os.getenv("REPORT_JOBS_DIR") or os.path.join(tempfile.gettempdir(), "report-jobs")
+# Cada cuánto se borran artefactos vencidos
+_SWEEP_SECONDS = 60.0
+
+
+# -------------------------
+# Almacén de artefactos
+# -------------------------
+class JobStore(Protocol):
+    def put(self, job_id: str, src_path: str) -> int: ...
+    def path(self, job_id: str) -> Optional[str]: ...
+    def delete(self, job_id: str) -> None: ...
+    def purge(self, older_than: float) -> int: ...
+
+
+class LocalDiskStore:
+    """Un PDF por job en `root`; se mueve desde el spool del render sin copiarlo a memoria."""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _file(self, job_id: str) -> str:
+        return os.path.join(self.root, f"{job_id}.pdf")
+
+    def put(self, job_id: str, src_path: str) -> int:
+        dst = self._file(job_id)
+        shutil.move(src_path, dst)
+        return os.path.getsize(dst)
+
+    def path(self, job_id: str) -> Optional[str]:
+        p = self._file(job_id)
+        return p if os.path.exists(p) else None
+
+    def delete(self, job_id: str) -> None:
+        try:
+            os.unlink(self._file(job_id))
+        except FileNotFoundError:
+            pass
+
+    def purge(self, older_than: float) -> int:
+        """Borra artefactos huérfanos (p. ej. de un proceso anterior) más viejos que `older_than` s."""
+        cutoff = time.time() - older_than
+        n = 0
+        for entry in os.scandir(self.root):
+            if entry.name.endswith(".pdf") and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                n += 1
+        return n
+
+
+def _make_store() -> JobStore:
+    if REPORT_JOBS_STORE == "local":
+        return LocalDiskStore(REPORT_JOBS_DIR)
+    raise ValueError(f"REPORT_JOBS_STORE desconocido: {REPORT_JOBS_STORE!r}")
+
+
+# -------------------------
+# Jobs
+# -------------------------
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+
+@dataclass
+class Job:
+    id: str
+    key: str             # spec + alcance de credencial (deduplicación)
+    scope: str           # solo quien lo pidió (mismas credenciales) lo ve
+    report: str
+    params: dict[str, Optional[str]]
+    status: str = "queued"   # queued | running | done | failed
+    stage: str = "queued"    # queued | fetching | aggregating | rendering | storing | done
+    progress: float = 0.0
+    filename: Optional[str] = None
+    size: Optional[int] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def _advance(self, stage: str, progress: float) -> None:
+        self.stage, self.progress = stage, progress
+
+    def public(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "report": self.report,
+            "params": self.params,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 2),
+            "filename": self.filename,
+            "size": self.size,
+            "error": self.error,
+            "createdAt": _iso(self.created_at),
+            "finishedAt": _iso(self.finished_at),
+            "expiresAt": _iso(self.finished_at + REPORT_JOBS_TTL_SECONDS) if self.finished_at else None,
+        }
+
+
+class JobManager:
+    """
+    Cola de reportes en segundo plano. Como mucho `concurrency` jobs generan a
+    la vez; specs idénticas (mismo reporte, parámetros y credenciales) en curso
+    devuelven el mismo job. Los artefactos vencen `ttl` s después de terminar.
+    """
+
+    def __init__(self, store: JobStore, concurrency: int, max_queued: int, ttl: float):
+        self.store = store
+        self.ttl = ttl
+        self.max_queued = max_queued
+        self._sem = asyncio.Semaphore(concurrency)
+        self._jobs: dict[str, Job] = {}
+        self._inflight: dict[str, str] = {}   # key -> job id (queued/running)
+        self._tasks: set[asyncio.Task] = set()
+        self._sweeper: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(report: str, params: dict[str, Optional[str]], scope: str) -> str:
+        raw = json.dumps([report, params, scope], sort_keys=True)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def submit(self, report: str, params: dict[str, Optional[str]], creds: Creds) -> Job:
+        scope = creds.scope()
+        key = self._key(report, params, scope)
+        running_id = self._inflight.get(key)
+        if running_id is not None:
+            return self._jobs[running_id]
+        if len(self._inflight) >= self.max_queued:
+            raise HTTPException(status_code=503, detail="Cola de reportes llena",
+                                headers={"Retry-After": "5"})
+
+        job = Job(id=uuid.uuid4().hex, key=key, scope=scope, report=report, params=params)
+        self._jobs[job.id] = job
+        self._inflight[key] = job.id
+        task = asyncio.create_task(self._run(job, creds))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: Job, creds: Creds) -> None:
+        prepare, required, optional = reports.REPORTS[job.report]
+        args = [job.params.get(n) for n in (*required, *optional)]
+        try:
+            async with self._sem:
+                job.status = "running"
+                job._advance("fetching", 0.1)
+                rep = await prepare(creds, *args)
+                job.filename = rep.filename
+                job._advance("aggregating", 0.4)
+                fn, fargs = await rep.build()
+                job._advance("rendering", 0.5)
+                # Sin el timeout de los endpoints: un job puede tardar y espera lugar en el pool
+                if rep.spool:
+                    path = await render.render_to_file(fn, *fargs, background=True)
+                else:
+                    path = await render.render_to_file(pdf_utils.write_pdf, fn, *fargs, background=True)
+                job._advance("storing", 0.95)
+                job.size = await asyncio.to_thread(self.store.put, job.id, path)
+            job.status = "done"
+            job._advance("done", 1.0)
+        except httpx.HTTPStatusError as e:
+            job.status, job.error = "failed", f"upstream {e.response.status_code}: {e.request.url}"
+        except HTTPException as e:
+            job.status, job.error = "failed", str(e.detail)
+        except Exception as e:
+            log.exception("job %s (%s) falló", job.id, job.report)
+            job.status, job.error = "failed", str(e) or type(e).__name__
+        finally:
+            job.finished_at = time.time()
+            self._inflight.pop(job.key, None)
+
+    def get(self, job_id: str, creds: Creds) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None or job.scope != creds.scope() or self._expired(job):
+            return None
+        return job
+
+    def artifact(self, job: Job) -> Optional[str]:
+        return self.store.path(job.id) if job.status == "done" else None
+
+    def _expired(self, job: Job) -> bool:
+        return job.finished_at is not None and time.time() - job.finished_at > self.ttl
+
+    def sweep(self) -> int:
+        """Borra jobs terminados y vencidos (metadatos y artefacto)."""
+        gone = [j for j in self._jobs.values() if self._expired(j)]
+        for j in gone:
+            self.store.delete(j.id)
+            del self._jobs[j.id]
+        return len(gone)
+
+    async def _sweep_loop(self) -> None:
+        # Los jobs viven en memoria: al arrancar, lo que quedó en el store es huérfano
+        try:
+            await asyncio.to_thread(self.store.purge, self.ttl)
+        except OSError as e:
+            log.warning("limpieza de jobs falló: %s", e)
+        while True:
+            await asyncio.sleep(_SWEEP_SECONDS)
+            try:
+                self.sweep()
+            except OSError as e:
+                log.warning("limpieza de jobs falló: %s", e)
+
+    def start(self) -> None:
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+
+    async def close(self) -> None:
+        for t in [*self._tasks, *([self._sweeper] if self._sweeper else [])]:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._sweeper = None
+
+
+# -------------------------
+# Instancia del proceso
+# -------------------------
+_manager: Optional[JobManager] = None
+
+def manager() -> JobManager:
+    global _manager
+    if _manager is None:
+        _manager = JobManager(_make_store(), REPORT_JOBS_CONCURRENCY,
+                              REPORT_JOBS_MAX_QUEUED, REPORT_JOBS_TTL_SECONDS)
+    return _manager
+
+def startup() -> None:
+    manager().start()
+
+async def shutdown() -> None:
+    global _manager
+    if _manager is not None:
+        await _manager.close()
+        _manager = None
@@ -3,21 +3,71 @@ from __future__ import annotations
 
 import io
 import os
-from typing import Any, Optional
+import pstats
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Optional
 
 import httpx
-from fastapi import Depends, FastAPI, Header, HTTPException, Request, Query
-from fastapi.responses import JSONResponse, StreamingResponse
-
-from . import clients, pdf_utils
-from .aggregators import teams_map, match_roster, aggregate_stats_from_matches
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Query, Response
+from fastapi.responses import FileResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+from . import clients, datasource, deps_auth, etag, jobs, metrics, render, reports, responses, timing
+from .cache import cache_stats, close_cache
+from .clients import upstream_502
+from .planner import Creds, upstream_creds
+from .security import is_internal
 from .deps_auth import require_admin  
 from app.routes_json import router as json_router
+from app.routes_jobs import router as jobs_router
+from app.routes_export import router as export_router
 from typing import Optional
 from fastapi import Header, HTTPException, Depends 
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Clave JWT parseada una vez (no en cada decode)
+    deps_auth.load_key()
+    # Clientes HTTP compartidos hacia teams/players/matches
+    await clients.open_clients()
+    # Read-model Mongo (índices al arrancar, no en la primera petición)
+    await datasource.startup()
+    # Pool de render de PDF (workers listos antes del primer reporte)
+    render.start()
+    # Jobs de reportes en segundo plano (limpieza periódica de artefactos)
+    jobs.startup()
+    # Muestreo del retraso del event loop (métricas)
+    metrics.start()
+    try:
+        yield
+    finally:
+        await metrics.shutdown()
+        await jobs.shutdown()
+        render.shutdown()
+        await close_cache()
+        await datasource.shutdown()
+        await clients.close_clients()
+
+
+# Respuestas JSON con orjson (ver responses.py para las cacheadas/comprimidas)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(timing.ServerTimingMiddleware)
+
+# Contadores que ya llevan otros módulos, leídos al exponer /metrics
+metrics.stats_collector("report_cache", "Caché Redis de agregados", cache_stats,
+                        ratio=("hits", ("hits", "misses", "stale")))
+metrics.stats_collector("upstream_flight", "Coalescencia de fetches a upstreams", clients.flight_stats,
+                        gauges=("entries",), ratio=("memo_hits", ("memo_hits", "coalesced", "fetches")))
+metrics.stats_collector("auth", "Verificación de JWT", deps_auth.auth_stats,
+                        gauges=("cached",), skip=("verify_ms_total", "verify_ms_max"),
+                        ratio=("cache_hits", ("cache_hits", "verifications")))
+metrics.stats_collector("pdf_render", "Pool de render de PDF", render.render_stats,
+                        gauges=("workers", "pending"),
+                        skip=("wait_ms_total", "wait_ms_max", "render_ms_total", "render_ms_max"))
+metrics.stats_collector("json_body_cache", "Cuerpos JSON serializados", responses.body_cache_stats,
+                        gauges=("entries", "bytes", "max_bytes"))
 
 INTERNAL_SECRET = os.getenv("INTERNAL_SECRET", "") 
 
@@ -33,7 +83,14 @@ async def admin_dep(
     token = authorization or x_api_authorization
     if not token:
         raise HTTPException(status_code=401, detail="Missing Authorization")
-    await require_admin(token)
+    with timing.phase("auth"):
+        await require_admin(token)
+
+async def internal_dep(
+    x_internal_secret: Optional[str] = Header(default=None, alias="X-Internal-Secret"),
+):
+    if not is_internal(x_internal_secret):
+        raise HTTPException(status_code=403, detail="Solo llamadores internos")
 
 
 # ---------- Health ----------
@@ -45,196 +102,109 @@ async def health():
         "port": os.getenv("SERVICE_PORT", "8080"),
     }
 
-# ---------- Helpers ----------
-def _upstream_502(e: httpx.HTTPStatusError) -> HTTPException:
-    req = e.request
-    resp = e.response
-    detail = {
-        "upstream_url": str(req.url),
-        "status_code": resp.status_code,
-        "body": (resp.text or "")[:200],
-    }
-    return HTTPException(status_code=502, detail=detail)
+# ---------- Métricas ----------
+# Sin auth, como /health: Nginx solo publica /api/reports/*, esto queda en la red interna
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# ---------- Perfiles (X-Profile) ----------
+@app.get("/reports/_profiles/{name}", dependencies=[Depends(internal_dep)], include_in_schema=False)
+async def get_profile(name: str, format: str = Query(default="pstats", pattern="^(pstats|text)$")):
+    path = timing.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    if format == "pstats":
+        # python -m pstats <archivo> / snakeviz <archivo>
+        return FileResponse(path, media_type="application/octet-stream", filename=name)
+    buf = io.StringIO()
+    pstats.Stats(path, stream=buf).sort_stats("cumulative").print_stats(60)
+    return PlainTextResponse(buf.getvalue())
 
-# ---------- Reports ----------
-@app.get("/reports/teams.pdf", dependencies=[Depends(admin_dep)])
-async def report_teams(
-    x_api_authorization: str | None = Header(default=None, alias="X-Api-Authorization"),
-    x_teams_authorization: str | None = Header(default=None, alias="X-Teams-Authorization"),
-):
-    try:
-        teams = await clients.fetch_teams(x_api_authorization, x_teams_authorization)
-    except httpx.HTTPStatusError as e:
-        raise _upstream_502(e)
-    pdf = pdf_utils.build_pdf_teams(teams)
+# ---------- Helpers ----------
+def _pdf_response(pdf: bytes, filename: str, tag: str) -> StreamingResponse:
     return StreamingResponse(
         io.BytesIO(pdf),
         media_type="application/pdf",
-        headers={"Content-Disposition": 'attachment; filename="equipos.pdf"'},
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', **etag.headers(tag)},
+    )
+
+def _pdf_file_response(path: str, filename: str, tag: str) -> FileResponse:
+    # Se envía desde disco en trozos (Content-Length incluido) y se borra al terminar
+    return FileResponse(
+        path,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', **etag.headers(tag)},
+        background=BackgroundTask(render.discard, path),
     )
 
+async def _serve(request: Request, prepare: Awaitable[reports.Prepared]) -> Response:
+    """Descarga -> ETag (304 sin agregar ni renderizar) -> render en el pool."""
+    try:
+        rep = await prepare
+    except httpx.HTTPStatusError as e:
+        raise upstream_502(e)
+    tag = etag.strong(request, rep.digests)
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+    fn, args = await rep.build()
+    if rep.spool:
+        path = await render.render_to_file(fn, *args)
+        return _pdf_file_response(path, rep.filename, tag)
+    pdf = await render.render(fn, *args)
+    return _pdf_response(pdf, rep.filename, tag)
+
+# ---------- Reports ----------
+@app.get("/reports/teams.pdf", dependencies=[Depends(admin_dep)])
+async def report_teams(request: Request, creds: Creds = Depends(upstream_creds)):
+    return await _serve(request, reports.teams(creds))
+
 @app.get("/reports/teams/{team_id}/players.pdf", dependencies=[Depends(admin_dep)])
 async def report_players_by_team(
-    team_id: str,
-    x_api_authorization: str | None = Header(default=None, alias="X-Api-Authorization"),
-    x_players_authorization: str | None = Header(default=None, alias="X-Players-Authorization"),
-    x_teams_authorization: str | None = Header(default=None, alias="X-Teams-Authorization"),
+    team_id: str, request: Request, creds: Creds = Depends(upstream_creds)
 ):
-    try:
-        players = await clients.fetch_players(team_id, x_api_authorization, x_players_authorization)
-        tmap = await clients.fetch_teams_map(x_api_authorization, x_teams_authorization)
-    except httpx.HTTPStatusError as e:
-        raise _upstream_502(e)
-    team_name = tmap.get(str(team_id))
-    pdf = pdf_utils.build_pdf_players_by_team(team_id, players, team_name)
-    return StreamingResponse(
-        io.BytesIO(pdf),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="players_{team_id}.pdf"'},
-    )
+    return await _serve(request, reports.players_by_team(creds, team_id))
 
 @app.get("/reports/players/all.pdf", dependencies=[Depends(admin_dep)])
-async def report_all_players(
-    x_api_authorization: str | None = Header(default=None, alias="X-Api-Authorization"),
-    x_players_authorization: str | None = Header(default=None, alias="X-Players-Authorization"),
-    x_teams_authorization: str | None = Header(default=None, alias="X-Teams-Authorization"),
+async def report_all_players(request: Request, creds: Creds = Depends(upstream_creds)):
+    return await _serve(request, reports.players_all(creds))
+
+@app.get("/reports/players/{player_id}/stats.pdf", dependencies=[Depends(admin_dep)])
+async def report_player_stats(
+    player_id: str, request: Request, creds: Creds = Depends(upstream_creds)
 ):
-    try:
-        players = await clients.fetch_players(None, x_api_authorization, x_players_authorization)
-        tmap = await clients.fetch_teams_map(x_api_authorization, x_teams_authorization)
-    except httpx.HTTPStatusError as e:
-        raise _upstream_502(e)
-    pdf = pdf_utils.build_pdf_all_players(players, tmap)
-    return StreamingResponse(
-        io.BytesIO(pdf),
-        media_type="application/pdf",
-        headers={"Content-Disposition": 'attachment; filename="players_all.pdf"'},
-    )
+    return await _serve(request, reports.player_stats(creds, player_id))
 
 @app.get("/reports/matches/history.pdf", dependencies=[Depends(admin_dep)])
 async def report_history(
+    request: Request,
     from_: str | None = Query(default=None, alias="from"),
     to: str | None = None,
-    x_api_authorization: str | None = Header(default=None, alias="X-Api-Authorization"),
-    x_matches_authorization: str | None = Header(default=None, alias="X-Matches-Authorization"),
-    x_teams_authorization: str | None = Header(default=None, alias="X-Teams-Authorization"),
+    creds: Creds = Depends(upstream_creds),
 ):
-    try:
-        matches = await clients.fetch_matches(from_, to, x_api_authorization, x_matches_authorization)
-        tmap = await clients.fetch_teams_map(x_api_authorization, x_teams_authorization)
-    except httpx.HTTPStatusError as e:
-        raise _upstream_502(e)
-    pdf = pdf_utils.build_pdf_matches_history(matches, from_, to, tmap)
-    return StreamingResponse(
-        io.BytesIO(pdf),
-        media_type="application/pdf",
-        headers={"Content-Disposition": 'attachment; filename="history.pdf"'},
-    )
+    return await _serve(request, reports.matches_history(creds, from_, to))
 
 @app.get("/reports/matches/{match_id}/roster.pdf", dependencies=[Depends(admin_dep)])
 async def report_match_roster_pdf(
-    match_id: str,
-    x_api_authorization: str | None = Header(default=None, alias="X-Api-Authorization"),
-    x_matches_authorization: str | None = Header(default=None, alias="X-Matches-Authorization"),
-    x_players_authorization: str | None = Header(default=None, alias="X-Players-Authorization"),
-    x_teams_authorization: str | None = Header(default=None, alias="X-Teams-Authorization"),
+    match_id: str, request: Request, creds: Creds = Depends(upstream_creds)
 ):
-    try:
-        roster = await match_roster(
-            match_id,
-            x_api_authorization,
-            x_matches_authorization,
-            x_players_authorization,
-            x_teams_authorization,
-        )
-    except httpx.HTTPStatusError as e:
-        raise _upstream_502(e)
-    pdf = pdf_utils.build_pdf_match_roster(match_id, roster)
-    return StreamingResponse(
-        io.BytesIO(pdf),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="roster_{match_id}.pdf"'},
-    )
+    return await _serve(request, reports.roster(creds, match_id))
 
 @app.get("/reports/stats/summary.pdf", dependencies=[Depends(admin_dep)])
-async def report_stats_summary(
-    x_api_authorization: str | None = Header(default=None, alias="X-Api-Authorization"),
-    x_matches_authorization: str | None = Header(default=None, alias="X-Matches-Authorization"),
-    x_teams_authorization: str | None = Header(default=None, alias="X-Teams-Authorization"),
-):
-    try:
-        matches = await clients.fetch_matches(None, None, x_api_authorization, x_matches_authorization)
-        tmap = await teams_map(x_api_authorization, x_teams_authorization)
-    except httpx.HTTPStatusError as e:
-        raise _upstream_502(e)
-
-    agg = aggregate_stats_from_matches(matches, tmap)
-
-    # Top por victorias
-    wins_sorted = sorted(agg.values(), key=lambda s: (-int(s["wins"]), s["team"]))
-    top_wins = [["#", "Equipo", "ID", "PJ", "PG", "PP", "PF", "PC"]]
-    for idx, s in enumerate(wins_sorted[:10], 1):
-        top_wins.append([idx, s["team"], s["teamId"], s["played"], s["wins"], s["losses"], s["pf"], s["pa"]])
-
-    # Top por puntos a favor
-    pf_sorted = sorted(agg.values(), key=lambda s: (-int(s["pf"]), s["team"]))
-    top_pf = [["#", "Equipo", "ID", "PJ", "PG", "PP", "PF", "PC"]]
-    for idx, s in enumerate(pf_sorted[:10], 1):
-        top_pf.append([idx, s["team"], s["teamId"], s["played"], s["wins"], s["losses"], s["pf"], s["pa"]])
-
-    # Menos puntos a favor
-    min_pf_sorted = sorted(agg.values(), key=lambda s: (int(s["pf"]), s["team"]))
-    min_pf = [["#", "Equipo", "ID", "PJ", "PG", "PP", "PF", "PC"]]
-    for idx, s in enumerate(min_pf_sorted[:10], 1):
-        min_pf.append([idx, s["team"], s["teamId"], s["played"], s["wins"], s["losses"], s["pf"], s["pa"]])
-
-    # Menos derrotas
-    min_losses_sorted = sorted(agg.values(), key=lambda s: (int(s["losses"]), -int(s["wins"]), s["team"]))
-    min_losses = [["#", "Equipo", "ID", "PJ", "PG", "PP", "PF", "PC"]]
-    for idx, s in enumerate(min_losses_sorted[:10], 1):
-        min_losses.append([idx, s["team"], s["teamId"], s["played"], s["wins"], s["losses"], s["pf"], s["pa"]])
-
-    sections = [
-        ("Top por Victorias", top_wins),
-        ("Top por Puntos a Favor", top_pf),
-        ("Menos Puntos a Favor", min_pf),
-        ("Menos Derrotas", min_losses),
-    ]
-    pdf = pdf_utils.build_pdf_stats_report(sections)
-    return StreamingResponse(
-        io.BytesIO(pdf),
-        media_type="application/pdf",
-        headers={"Content-Disposition": 'attachment; filename="stats_summary.pdf"'},
-    )
+async def report_stats_summary(request: Request, creds: Creds = Depends(upstream_creds)):
+    return await _serve(request, reports.stats_summary(creds))
 
 @app.get("/reports/standings.pdf", dependencies=[Depends(admin_dep)])
-async def report_standings(
-    x_api_authorization: str | None = Header(default=None, alias="X-Api-Authorization"),
-    x_matches_authorization: str | None = Header(default=None, alias="X-Matches-Authorization"),
-    x_teams_authorization: str | None = Header(default=None, alias="X-Teams-Authorization"),
-):
-    try:
-        matches = await clients.fetch_matches(None, None, x_api_authorization, x_matches_authorization)
-        tmap = await clients.fetch_teams_map(x_api_authorization, x_teams_authorization)
-    except httpx.HTTPStatusError as e:
-        raise _upstream_502(e)
-
-    agg = aggregate_stats_from_matches(matches, tmap)
-    ordered = sorted(agg.values(), key=lambda s: (-int(s["wins"]), s["team"]))
-    rows = [{"name": s["team"], "wins": int(s["wins"])} for s in ordered]
-
-    pdf = pdf_utils.build_pdf_standings(rows)
-    return StreamingResponse(
-        io.BytesIO(pdf),
-        media_type="application/pdf",
-        headers={"Content-Disposition": 'attachment; filename="standings.pdf"'},
-    )
+async def report_standings(request: Request, creds: Creds = Depends(upstream_creds)):
+    return await _serve(request, reports.standings(creds))
 
 # Manejo genérico httpx
 @app.exception_handler(httpx.RequestError)
 async def httpx_request_error_handler(_req: Request, exc: httpx.RequestError):
-    return JSONResponse(status_code=502, content={"detail": {"message": str(exc)}})
+    return ORJSONResponse(status_code=502, content={"detail": {"message": str(exc)}})
 
 # ⬇️ IMPORTANTE: No antepongas /api aquí. Nginx ya mapea /api/reports -> /reports en la app.
 from fastapi import Depends
 app.include_router(json_router, prefix="/reports", dependencies=[Depends(admin_dep)])
+app.include_router(jobs_router, prefix="/reports", dependencies=[Depends(admin_dep)])
+app.include_router(export_router, prefix="/reports", dependencies=[Depends(admin_dep)])
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import logging
+import os
+import time
+from typing import Any, Callable, Iterable, Optional
+
+import httpx
+
+from . import timing
+
+log = logging.getLogger(__name__)
+
+# Métricas en proceso con formato de texto de Prometheus (GET /metrics), sin
+# dependencias ni colector externo. Registrar una observación es un bisect y
+# una suma sobre un dict; el texto solo se arma cuando alguien lo pide.
+# Con varios workers de uvicorn cada proceso expone las suyas.
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Cada cuánto se mide el retraso del event loop (s)
+LOOP_LAG_INTERVAL_SECONDS = float(os.getenv("LOOP_LAG_INTERVAL_SECONDS", "0.5"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+Labels = tuple[str, ...]
+_INF = 'le="+Inf"'
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Labels, values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Labels = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labels
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def lines(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Labels = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def lines(self) -> list[str]:
+        return [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Labels = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+        # por etiquetas: [conteo por bucket (no acumulado) + desborde, suma]
+        self._series: dict[Labels, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        s = self._series.get(labels)
+        if s is None:
+            s = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        s[0][bisect.bisect_left(self.buckets, value)] += 1
+        s[1][0] += value
+
+    def lines(self) -> list[str]:
+        out: list[str] = []
+        for k, (counts, total) in self._series.items():
+            acc = 0
+            for le, c in zip(self.buckets, counts):
+                acc += c
+                bucket = 'le="' + _num(le) + '"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, k, bucket)} {acc}")
+            acc += counts[-1]
+            out.append(f"{self.name}_bucket{_labels(self.labelnames, k, _INF)} {acc}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, k)} {_num(total[0])}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, k)} {acc}")
+        return out
+
+
+# -------------------------
+# Registro
+# -------------------------
+_metrics: list[Metric] = []
+_collectors: list[Callable[[], Iterable[Metric]]] = []
+
+def _register(m: Any) -> Any:
+    _metrics.append(m)
+    return m
+
+def collector(fn: Callable[[], Iterable[Metric]]) -> None:
+    """Métricas calculadas al exponer (p. ej. contadores que ya lleva otro módulo)."""
+    _collectors.append(fn)
+
+def stats_collector(
+    prefix: str, help: str, stats: Callable[[], dict[str, Any]],
+    gauges: tuple[str, ...] = (), skip: tuple[str, ...] = (),
+    ratio: Optional[tuple[str, tuple[str, ...]]] = None,
+) -> None:
+    """
+    Expone un dict de contadores existente (cache_stats, flight_stats, ...):
+    cada clave numérica es `<prefix>_<clave>_total` (o gauge si está en
+    `gauges`); `ratio=(num, (denominadores...))` agrega `<prefix>_hit_ratio`.
+    """
+    def collect() -> list[Metric]:
+        values = stats()
+        out: list[Metric] = []
+        for k, v in values.items():
+            if k in skip or isinstance(v, bool) or not isinstance(v, (int, float)):
+                continue
+            if k in gauges:
+                m: Counter = Gauge(f"{prefix}_{k}", f"{help}: {k}")
+                m.set(v)
+            else:
+                m = Counter(f"{prefix}_{k}_total", f"{help}: {k}")
+                m.inc(amount=v)
+            out.append(m)
+        if ratio is not None:
+            num, dens = ratio
+            total = sum(values.get(d, 0) for d in dens)
+            g = Gauge(f"{prefix}_hit_ratio", f"{help}: {num} / ({' + '.join(dens)})")
+            g.set(values.get(num, 0) / total if total else 0.0)
+            out.append(g)
+        return out
+    collector(collect)
+
+def render() -> str:
+    lines: list[str] = []
+    for m in _metrics:
+        lines += m.header() + m.lines()
+    for fn in _collectors:
+        try:
+            for m in fn():
+                lines += m.header() + m.lines()
+        except Exception as e:
+            log.warning("collector de métricas falló: %s", e)
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------
+# Métricas del servicio
+# -------------------------
+REQUESTS = _register(Counter("http_requests_total", "Requests HTTP", ("route", "method", "status")))
+REQUEST_SECONDS = _register(Histogram("http_request_duration_seconds",
+                                      "Latencia por ruta (hasta el último byte)", ("route", "method")))
+
+UPSTREAM_REQUESTS = _register(Counter("upstream_requests_total", "Llamadas a upstreams", ("service", "status")))
+UPSTREAM_SECONDS = _register(Histogram("upstream_request_duration_seconds",
+                                       "Latencia de upstream (cuerpo incluido)", ("service",)))
+UPSTREAM_BYTES = _register(Counter("upstream_response_bytes_total", "Bytes recibidos de upstreams", ("service",)))
+UPSTREAM_PAGES = _register(Counter("upstream_pages_total", "Páginas pedidas por la autopaginación", ("service",)))
+UPSTREAM_FETCHES = _register(Counter("upstream_paginated_fetches_total",
+                                     "Descargas autopaginadas (páginas/descarga = pages/fetches)", ("service",)))
+
+ROWS_AGGREGATED = _register(Counter("rows_aggregated_total", "Filas agregadas", ("dataset",)))
+AGGREGATE_SECONDS = _register(Histogram("aggregate_duration_seconds", "Tiempo de agregación", ("dataset",)))
+
+PDF_RENDER_SECONDS = _register(Histogram("pdf_render_duration_seconds", "Render en el worker", ("report",)))
+PDF_QUEUE_SECONDS = _register(Histogram("pdf_queue_wait_seconds", "Espera en cola del pool de render", ("report",)))
+PDF_BYTES = _register(Histogram("pdf_output_bytes", "Tamaño del PDF generado", ("report",), SIZE_BUCKETS))
+
+LOOP_LAG = _register(Histogram("event_loop_lag_seconds", "Retraso del event loop", (), LAG_BUCKETS))
+
+
+# -------------------------
+# Instrumentación
+# -------------------------
+class MetricsMiddleware:
+    """ASGI: latencia y status por plantilla de ruta (no por path, para acotar etiquetas)."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        t0 = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            REQUESTS.inc(path, method, str(status))
+            REQUEST_SECONDS.observe(time.perf_counter() - t0, path, method)
+
+def upstream_hooks(service: str) -> dict[str, list[Callable[..., Any]]]:
+    """
+    event_hooks de httpx para el cliente compartido de un upstream. La
+    latencia también va al Server-Timing de la petición en curso.
+    """
+    async def on_request(request: httpx.Request) -> None:
+        request.extensions["metrics_t0"] = time.perf_counter()
+
+    async def on_response(response: httpx.Response) -> None:
+        # Todos los llamadores leen el cuerpo completo: leerlo aquí mide la descarga
+        await response.aread()
+        t0 = response.request.extensions.get("metrics_t0")
+        if t0 is not None:
+            elapsed = time.perf_counter() - t0
+            timing.add(f"upstream-{service}", elapsed)
+            if METRICS_ENABLED:
+                UPSTREAM_SECONDS.observe(elapsed, service)
+        if METRICS_ENABLED:
+            UPSTREAM_REQUESTS.inc(service, str(response.status_code))
+            UPSTREAM_BYTES.inc(service, amount=len(response.content))
+
+    if not METRICS_ENABLED and not timing.SERVER_TIMING_ENABLED:
+        return {}
+    return {"request": [on_request], "response": [on_response]}
+
+
+_lag_task: Optional[asyncio.Task] = None
+
+async def _watch_loop(interval: float) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        t0 = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - t0 - interval))
+
+def start() -> None:
+    global _lag_task
+    if METRICS_ENABLED and _lag_task is None:
+        _lag_task = asyncio.create_task(_watch_loop(LOOP_LAG_INTERVAL_SECONDS))
+
+async def shutdown() -> None:
+    global _lag_task
+    if _lag_task is not None:
+        _lag_task.cancel()
+        try:
+            await _lag_task
+        except asyncio.CancelledError:
+            pass
+        _lag_task = None
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Callable, Optional
+
+import httpx
+
+from . import metrics
+from .config import (
+    PAGE_SIZE, PAGE_SIZE_MIN, PAGE_SIZE_MAX,
+    PAGINATION_CONCURRENCY, PAGINATION_TARGET_MS, PAGINATION_MAX_PAGES,
+)
+
+log = logging.getLogger(__name__)
+
+Extract = Callable[[Any], list[dict[str, Any]]]
+
+
+def _fingerprint(items: list[dict[str, Any]]) -> tuple[int, int]:
+    """Huella barata de una página: ids (o el repr completo si no hay id)."""
+    keys = []
+    for it in items:
+        k = (it.get("id") or it.get("Id")) if isinstance(it, dict) else None
+        keys.append(str(k) if k is not None else repr(it))
+    return len(items), hash(tuple(keys))
+
+
+class Paginator:
+    """
+    Autopaginación genérica para un upstream.
+
+    - Primera página en serie; con sus metadatos (Spring: totalPages/last,
+      Express: totalCount) calcula cuántas faltan y las pide en paralelo
+      bajo un semáforo, reensamblando en orden.
+    - Sin metadatos: avanza página a página mientras vengan llenas.
+    - Si una página repite la huella de la primera, el backend ignora
+      'page' y se corta ahí (en lugar de iterar hasta el límite duro).
+    - El tamaño de página se ajusta con la latencia observada del upstream.
+    """
+
+    def __init__(
+        self,
+        upstream: str,
+        *,
+        size: int = PAGE_SIZE,
+        min_size: int = PAGE_SIZE_MIN,
+        max_size: int = PAGE_SIZE_MAX,
+        concurrency: int = PAGINATION_CONCURRENCY,
+        target_ms: float = PAGINATION_TARGET_MS,
+        max_pages: int = PAGINATION_MAX_PAGES,
+    ):
+        self.upstream = upstream
+        self.size = size
+        self.min_size = min_size
+        self.max_size = max_size
+        self.concurrency = max(1, concurrency)
+        self.target_ms = target_ms
+        self.max_pages = max_pages
+
+    # ---------- tamaño adaptativo ----------
+    def _adapt(self, elapsed_ms: float, requested: int, served: int, more: bool) -> None:
+        if more and served < requested:
+            # El upstream recorta 'size': ese es su máximo real
+            self.max_size = max(self.min_size, served)
+            self.size = min(self.size, self.max_size)
+            return
+        if elapsed_ms > self.target_ms:
+            self.size = max(self.min_size, self.size // 2)
+        elif more and elapsed_ms < self.target_ms / 2:
+            self.size = min(self.max_size, self.size * 2)
+
+    # ---------- HTTP ----------
+    async def _get(
+        self, cx: httpx.AsyncClient, url: str, headers: dict[str, str],
+        params: Optional[dict[str, Any]], page: int, size: int,
+    ) -> tuple[Any, float]:
+        q: dict[str, Any] = {"page": page, "size": size}
+        if params:
+            q.update(params)
+        metrics.UPSTREAM_PAGES.inc(self.upstream)
+        t0 = time.perf_counter()
+        r = await cx.get(url, headers=headers, params=q)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        if r.status_code >= 400:
+            return None, elapsed_ms
+        return r.json(), elapsed_ms
+
+    @staticmethod
+    def _page_count(data: Any, served: int, requested: int) -> tuple[Optional[int], int]:
+        """
+        (páginas totales | None si no hay metadatos, tamaño efectivo del upstream)
+        """
+        if not isinstance(data, dict):
+            return None, requested
+        if data.get("last") is True:
+            return 1, requested
+        total_pages = data.get("totalPages")
+        if isinstance(total_pages, int):
+            eff = data.get("size") if isinstance(data.get("size"), int) else requested
+            return max(1, total_pages), eff
+        try:
+            total_count = int(data["totalCount"]) if data.get("totalCount") is not None else None
+        except (TypeError, ValueError):
+            total_count = None
+        if total_count is not None:
+            eff = requested if served >= requested else max(1, served)
+            return max(1, math.ceil(total_count / eff)), eff
+        return None, requested
+
+    # ---------- API ----------
+    async def fetch_all(
+        self,
+        cx: httpx.AsyncClient,
+        url: str,
+        headers: dict[str, str],
+        extract: Extract,
+        params: Optional[dict[str, Any]] = None,
+    ) -> Optional[list[dict[str, Any]]]:
+        """
+        Devuelve todos los items, [] si la primera página viene vacía,
+        o None si el upstream rechaza la paginación (status >= 400).
+        """
+        metrics.UPSTREAM_FETCHES.inc(self.upstream)
+        size = self.size
+        data, elapsed_ms = await self._get(cx, url, headers, params, 0, size)
+        if data is None:
+            return None
+        first = extract(data)
+        if not first:
+            return []
+
+        pages, eff = self._page_count(data, len(first), size)
+        more = (pages or 0) > 1 or (pages is None and len(first) >= size)
+        self._adapt(elapsed_ms, size, len(first), more)
+
+        if pages is None:
+            if len(first) < size:
+                return list(first)
+            return await self._walk(cx, url, headers, extract, params, first, size)
+        if pages <= 1:
+            return list(first)
+        if pages > self.max_pages:
+            log.warning("%s: %d páginas, se truncan a %d", self.upstream, pages, self.max_pages)
+            pages = self.max_pages
+        return await self._fan_out(cx, url, headers, extract, params, first, pages, eff)
+
+    async def _fan_out(
+        self, cx: httpx.AsyncClient, url: str, headers: dict[str, str], extract: Extract,
+        params: Optional[dict[str, Any]], first: list[dict[str, Any]], pages: int, size: int,
+    ) -> list[dict[str, Any]]:
+        results: list[Optional[list[dict[str, Any]]]] = [None] * pages
+        results[0] = first
+        fp0 = _fingerprint(first)
+        sem = asyncio.Semaphore(self.concurrency)
+        repeated = False
+
+        async def one(page: int) -> None:
+            nonlocal repeated
+            async with sem:
+                if repeated:
+                    return
+                data, _ = await self._get(cx, url, headers, params, page, size)
+            if data is None:
+                return
+            chunk = extract(data)
+            if chunk and _fingerprint(chunk) == fp0:
+                repeated = True
+                return
+            results[page] = chunk
+
+        tasks = [asyncio.create_task(one(p)) for p in range(1, pages)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for t in tasks:
+                t.cancel()
+            raise
+
+        if repeated:
+            log.warning("%s ignora 'page': se usa solo la primera página", self.upstream)
+            return list(first)
+
+        acc: list[dict[str, Any]] = []
+        for chunk in results:
+            # Igual que la paginación secuencial: una página fallida/vacía corta
+            if not chunk:
+                break
+            acc.extend(chunk)
+        return acc
+
+    async def _walk(
+        self, cx: httpx.AsyncClient, url: str, headers: dict[str, str], extract: Extract,
+        params: Optional[dict[str, Any]], first: list[dict[str, Any]], size: int,
+    ) -> list[dict[str, Any]]:
+        acc = list(first)
+        seen = {_fingerprint(first)}
+        for page in range(1, self.max_pages):
+            data, _ = await self._get(cx, url, headers, params, page, size)
+            if data is None:
+                break
+            chunk = extract(data)
+            if not chunk:
+                break
+            fp = _fingerprint(chunk)
+            if fp in seen:
+                log.warning("%s repite la página %d: se detiene la paginación", self.upstream, page)
+                break
+            seen.add(fp)
+            acc.extend(chunk)
+            if len(chunk) < size:
+                break
+        return acc
+
+
+_paginators: dict[str, Paginator] = {}
+
+def paginator(upstream: str) -> Paginator:
+    """Paginador por upstream; conserva el tamaño de página aprendido."""
+    p = _paginators.get(upstream)
+    if p is None:
+        p = _paginators[upstream] = Paginator(upstream)
+    return p
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import bisect
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+from fastapi import HTTPException
+
+from .pdf_utils import _safe
+
+# Paginación por cursor (keyset) de la API JSON: cada página continúa después
+# de la clave de orden de la última fila, no por offset. En Mongo la consulta
+# usa un índice compuesto (filtros + orden), así que una página cuesta lo mismo
+# en la primera o en la milésima; en live se ordena en memoria lo descargado.
+
+PAGE_DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "100"))
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "1000"))
+
+# Orden (ascendente) de cada listado; el último campo es único y desempata
+PLAYER_SORT = ("name", "id")
+MATCH_SORT = ("date", "id")
+
+Key = tuple[Any, ...]
+
+
+@dataclass(frozen=True)
+class PageQuery:
+    limit: int = PAGE_DEFAULT_LIMIT
+    after: Optional[Key] = None
+    team: Optional[str] = None
+    position: Optional[str] = None
+    status: Optional[str] = None
+    from_date: Optional[str] = None
+    to_date: Optional[str] = None
+
+    def scope(self) -> str:
+        """Filtros de la consulta: un cursor solo vale para la misma consulta."""
+        raw = "|".join(v or "" for v in (self.team, self.position, self.status, self.from_date, self.to_date))
+        return hashlib.sha256(raw.encode()).hexdigest()[:8]
+
+
+@dataclass
+class Page:
+    items: list[dict[str, Any]]
+    next: Optional[Key] = None     # clave de la última fila si hay más
+
+
+# -------------------------
+# Cursor opaco
+# -------------------------
+def encode_cursor(key: Key, scope: str) -> str:
+    raw = json.dumps({"k": list(key), "q": scope}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def decode_cursor(cursor: Optional[str], scope: str) -> Optional[Key]:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        key, q = tuple(data["k"]), data["q"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if q != scope:
+        raise HTTPException(status_code=400, detail="El cursor pertenece a otra consulta (filtros distintos)")
+    return key
+
+
+# -------------------------
+# Proyección (fields=)
+# -------------------------
+def parse_fields(fields: Optional[str], columns: Sequence[str]) -> Optional[tuple[str, ...]]:
+    if not fields:
+        return None
+    wanted = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in wanted if f not in columns]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Campos no disponibles: {unknown}; válidos: {list(columns)}")
+    return wanted or None
+
+def project(rows: Iterable[dict[str, Any]], fields: Optional[tuple[str, ...]]) -> list[dict[str, Any]]:
+    if fields is None:
+        return list(rows)
+    return [{f: r.get(f) for f in fields} for r in rows]
+
+
+# -------------------------
+# Keyset en memoria (fuente live y standings)
+# -------------------------
+def keyset(rows: list[dict[str, Any]], key: Callable[[dict[str, Any]], Key],
+           after: Optional[Key], limit: int, presorted: bool = False) -> Page:
+    keys = [key(r) for r in rows]
+    if not presorted:
+        order = sorted(range(len(rows)), key=keys.__getitem__)
+        rows = [rows[i] for i in order]
+        keys = [keys[i] for i in order]
+    start = bisect.bisect_right(keys, after) if after is not None else 0
+    items = rows[start:start + limit]
+    more = start + limit < len(rows)
+    return Page(items, keys[start + limit - 1] if more else None)
+
+def player_key(p: dict[str, Any]) -> Key:
+    return (str(_safe(p, "name", "Name", default="")), str(_safe(p, "id", "Id", "_id", default="")))
+
+def match_key(m: dict[str, Any]) -> Key:
+    return (str(_safe(m, "date", "dateMatch", "DateMatch", default="")), str(_safe(m, "id", "Id", default="")))
+
+def filter_players(rows: Iterable[dict[str, Any]], q: PageQuery) -> list[dict[str, Any]]:
+    out = []
+    for p in rows:
+        if not isinstance(p, dict):
+            continue
+        if q.team and str(_safe(p, "team_id", "teamId", "TeamId", default="")) != q.team:
+            continue
+        if q.position and _safe(p, "position", "Position", default=None) != q.position:
+            continue
+        out.append(p)
+    return out
+
+def filter_matches(rows: Iterable[dict[str, Any]], q: PageQuery) -> list[dict[str, Any]]:
+    out = []
+    for m in rows:
+        if not isinstance(m, dict):
+            continue
+        if q.status and _safe(m, "status", "Status", default=None) != q.status:
+            continue
+        if q.team and q.team not in (str(_safe(m, "homeTeamId", "HomeTeamId", default="")),
+                                     str(_safe(m, "awayTeamId", "AwayTeamId", default=""))):
+            continue
+        out.append(m)
+    return out
@@ -4,8 +4,9 @@ from io import BytesIO
 
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from reportlab.platypus import Flowable, Paragraph, SimpleDocTemplate, Spacer
+
+from .pdf_utils import TableTemplate, _sample_styles
 
 try:
     from zoneinfo import ZoneInfo
@@ -49,30 +50,57 @@ def _to_local(dt_str: str, tz: str = "UTC") -> str:
         return dt_str
 
 
-def generate_teams_pdf(
-    teams: list[dict], *, tz: str = "UTC", title="Equipos Registrados"
-):
+def _team_table_commands(bands):
+    return [
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.black),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
+        ("FONTSIZE", (0, 0), (-1, -1), 10),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), bands),
+        ("ALIGN", (1, 1), (1, -1), "CENTER"),  # centrar columna Color
+    ]
+
+_MARGIN = 40
+_COLOR_COL = 90
+_TEAMS_TABLE = TableTemplate(
+    ["Nombre", "Color", "Creado"],
+    [A4[0] - 2 * _MARGIN - _COLOR_COL - 140, _COLOR_COL, 140],
+    commands=_team_table_commands,
+    bands=[colors.whitesmoke, colors.lightgrey],
+)
+
+
+class _Swatch(Flowable):
     """
-    teams: lista de dicts con claves:
-      Name/name/teamName, Color/color/hexColor, Created/created/createdAt
+    Celda "Color": recuadro con el color del equipo y el texto en contraste.
+    Reemplaza los dos comandos de estilo por fila (BACKGROUND/TEXTCOLOR), así
+    el estilo de la tabla es el mismo para cualquier cantidad de equipos.
     """
-    buf = BytesIO()
-    doc = SimpleDocTemplate(
-        buf, pagesize=A4, topMargin=36, bottomMargin=36, leftMargin=40, rightMargin=40
-    )
-    styles = getSampleStyleSheet()
-    elems = []
 
-    elems.append(Paragraph(title, styles["Title"]))
-    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
-    elems.append(Paragraph(now, styles["Normal"]))
-    elems.append(Spacer(1, 12))
+    def __init__(self, value: str, width: float = _COLOR_COL - 12, height: float = 12):
+        super().__init__()
+        self.value = value
+        self.width = width
+        self.height = height
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        bg = _parse_color(self.value)
+        c = self.canv
+        c.setFillColor(bg)
+        c.rect(0, 0, self.width, self.height, stroke=0, fill=1)
+        c.setFillColor(_text_color_for(bg))
+        c.setFont("Helvetica", 10)
+        c.drawCentredString(self.width / 2, 3, self.value or "-")
 
-    data = [["Nombre", "Color", "Creado"]]
-    row_styles = []
 
-    # construir filas
-    for idx, t in enumerate(teams, start=1):
+def _team_rows(teams: list[dict], tz: str):
+    for t in teams:
         name = (
             t.get("name")
             or t.get("Name")
@@ -88,38 +116,29 @@ def generate_teams_pdf(
             or t.get("CreatedAt")
             or ""
         )
+        yield [name, _Swatch(color_val), _to_local(created, tz)]
 
-        color_obj = _parse_color(color_val)
-        txt_color = _text_color_for(color_obj)
-
-        data.append([name, color_val or "-", _to_local(created, tz)])
-
-        # aplicar fondo y color de texto a la celda "Color" (columna 1 -> índice 1)
-        row = idx  # por el header
-        row_styles += [
-            ("BACKGROUND", (1, row), (1, row), color_obj),
-            ("TEXTCOLOR", (1, row), (1, row), txt_color),
-        ]
-
-    # tabla
-    table = Table(data, colWidths=[None, 90, 140], hAlign="LEFT")
-    base_style = TableStyle(
-        [
-            ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
-            ("BACKGROUND", (0, 0), (-1, 0), colors.black),
-            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-            ("ALIGN", (0, 0), (-1, 0), "CENTER"),
-            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
-            ("FONTSIZE", (0, 0), (-1, -1), 10),
-            ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.whitesmoke, colors.lightgrey]),
-        ]
+
+def generate_teams_pdf(
+    teams: list[dict], *, tz: str = "UTC", title="Equipos Registrados"
+):
+    """
+    teams: lista de dicts con claves:
+      Name/name/teamName, Color/color/hexColor, Created/created/createdAt
+    """
+    buf = BytesIO()
+    doc = SimpleDocTemplate(
+        buf, pagesize=A4, topMargin=36, bottomMargin=36, leftMargin=_MARGIN, rightMargin=_MARGIN
     )
-    base_style.add(*("ALIGN", (1, 1), (1, -1), "CENTER"))  # centrar columna Color
-    for s in row_styles:
-        base_style.add(*s)
-    table.setStyle(base_style)
+    styles = _sample_styles()
+    elems = []
+
+    elems.append(Paragraph(title, styles["Title"]))
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
+    elems.append(Paragraph(now, styles["Normal"]))
+    elems.append(Spacer(1, 12))
 
-    elems.append(table)
+    # tabla paginada por plantilla (filas generadas a medida que se maquetan)
+    elems.append(_TEAMS_TABLE.stream(_team_rows(teams, tz)))
     doc.build(elems)
     return buf.getvalue()
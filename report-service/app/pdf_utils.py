@@ -1,16 +1,28 @@
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
 from io import BytesIO
-from typing import Any, Optional
+from functools import lru_cache
+from itertools import islice
+from typing import Any, BinaryIO, Callable, Optional
 from datetime import datetime
 
 from reportlab.lib import colors, pagesizes
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from reportlab.lib.units import mm
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from reportlab.platypus import Flowable, LongTable, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
 
 
-def _doc(buf: BytesIO) -> SimpleDocTemplate:
+# Claves que leen los builders (render.compact recorta el resto antes de enviar al worker)
+TEAM_KEYS   = ("id", "Id", "teamId", "TeamId", "name", "Name", "teamName", "TeamName",
+               "city", "City", "location", "Location", "coach", "Coach", "manager", "Manager")
+PLAYER_KEYS = ("name", "Name", "age", "Age", "position", "Position",
+               "team_id", "teamId", "TeamId", "number", "Number", "jersey", "Jersey")
+MATCH_KEYS  = ("id", "Id", "dateMatch", "DateMatch", "date", "status", "Status",
+               "homeTeamId", "HomeTeamId", "awayTeamId", "AwayTeamId",
+               "homeScore", "HomeScore", "awayScore", "AwayScore")
+
+
+def _doc(buf: BinaryIO) -> SimpleDocTemplate:
     return SimpleDocTemplate(
         buf,
         pagesize=pagesizes.A4,
@@ -20,18 +32,28 @@ def _doc(buf: BytesIO) -> SimpleDocTemplate:
         bottomMargin=18 * mm,
         title="Reportes",
         author="report-service",
+        # Salida determinista (sin fecha/ID aleatorio): mismo input -> mismos bytes,
+        # requisito del ETag fuerte
+        invariant=1,
     )
 
-def _styles():
-    s = getSampleStyleSheet()
+@lru_cache(maxsize=None)
+def _sample_styles():
+    return getSampleStyleSheet()
+
+@lru_cache(maxsize=None)
+def _styles() -> tuple[ParagraphStyle, ParagraphStyle, ParagraphStyle]:
+    # Compilados una vez por proceso (worker del pool), no por reporte
+    s = _sample_styles()
     title = ParagraphStyle("TitleBig", parent=s["Title"], fontSize=18, leading=22, alignment=TA_CENTER, spaceAfter=10)
     h2 = ParagraphStyle("H2", parent=s["Heading2"], spaceBefore=10, spaceAfter=6)
     normal = ParagraphStyle("Normal", parent=s["Normal"], alignment=TA_LEFT, fontSize=10, leading=13)
     return title, h2, normal
 
-def _table(data: list[list[Any]], col_widths: list[float] | None = None) -> Table:
-    t = Table(data, colWidths=col_widths or "100%")
-    t.setStyle(TableStyle([
+BAND_COLORS = [colors.white, colors.HexColor("#FAFAFA")]
+
+def _table_commands(bands: list[Any]) -> list[tuple]:
+    return [
         ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
         ("FONTSIZE", (0, 0), (-1, 0), 10),
         ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#F2F2F2")),
@@ -40,14 +62,119 @@ def _table(data: list[list[Any]], col_widths: list[float] | None = None) -> Tabl
         ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#CCCCCC")),
         ("FONTSIZE", (0, 1), (-1, -1), 9),
         ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#FAFAFA")]),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), bands),
         ("LEFTPADDING", (0, 0), (-1, -1), 4),
         ("RIGHTPADDING", (0, 0), (-1, -1), 4),
         ("TOPPADDING", (0, 0), (-1, -1), 3),
         ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
-    ]))
+    ]
+
+_TABLE_STYLE = TableStyle(_table_commands(BAND_COLORS))
+
+def _table(data: list[list[Any]], col_widths: list[float] | None = None) -> Table:
+    # Tablas chicas y de forma libre (roster, secciones de resumen); el estilo es compartido
+    t = Table(data, colWidths=col_widths or "100%")
+    t.setStyle(_TABLE_STYLE)
     return t
 
+
+class TableTemplate:
+    """
+    Cabecera, anchos de columna, estilos y alto de fila de una tabla, compilados
+    una vez por proceso. Las filas son de una línea, así que el alto es fijo:
+    cada página se arma con exactamente las filas que entran, sin tanteos.
+    """
+
+    def __init__(self, header: list[str], col_widths: list[float],
+                 commands: Optional[Callable[[list[Any]], list[tuple]]] = None,
+                 bands: Optional[list[Any]] = None):
+        self.header = list(header)
+        self.col_widths = list(col_widths)
+        make = commands or _table_commands
+        bands = bands or BAND_COLORS
+        # Banda par/impar: un trozo que empieza en fila impar sigue la alternancia
+        self._styles = (TableStyle(make(bands)), TableStyle(make(bands[::-1])))
+        self.header_height, self.row_height = self._measure()
+
+    def _measure(self) -> tuple[float, float]:
+        t = Table([self.header, ["Ág"] * len(self.header)], colWidths=self.col_widths)
+        t.setStyle(self._styles[0])
+        t.wrap(sum(self.col_widths), 1e6)
+        return t._rowHeights[0], t._rowHeights[1]
+
+    def rows_fitting(self, height: float) -> int:
+        return int((height - self.header_height) // self.row_height)
+
+    def table(self, rows: list[list[Any]], offset: int = 0) -> LongTable:
+        t = LongTable([self.header, *rows], colWidths=self.col_widths, repeatRows=1,
+                      rowHeights=[self.header_height] + [self.row_height] * len(rows))
+        t.setStyle(self._styles[offset % 2])
+        return t
+
+    def stream(self, rows: Iterable[list[Any]]) -> Flowable:
+        return _StreamTable(self, rows)
+
+
+class _StreamTable(Flowable):
+    """
+    Tabla cuyas filas salen de un iterador. En cada split se arma una LongTable
+    con la cabecera y exactamente las filas que entran en el alto disponible;
+    el resto queda en el iterador para la página siguiente. Memoria acotada a
+    una página de filas, sin importar el total.
+    """
+
+    def __init__(self, tpl: TableTemplate, rows: Iterable[list[Any]]):
+        super().__init__()
+        self._tpl = tpl
+        self._rows = iter(rows)
+        self._peeked: list[list[Any]] = []
+        self._done = 0
+
+    def _pending(self) -> bool:
+        if not self._peeked:
+            self._peeked = list(islice(self._rows, 1))
+        # Sin filas en absoluto: igual se emite la cabecera una vez
+        return bool(self._peeked) or self._done == 0
+
+    def wrap(self, availWidth: float, availHeight: float) -> tuple[float, float]:
+        if not self._pending():
+            return 0, 0
+        # Nunca "entra" entera: reportlab llama a split con el alto disponible
+        return availWidth, availHeight + 1
+
+    def split(self, availWidth: float, availHeight: float) -> list[Any]:
+        if not self._pending():
+            return []
+        n = self._tpl.rows_fitting(availHeight)
+        if n < 1:
+            return []  # ni una fila entra: siguiente página
+        rows = self._peeked + list(islice(self._rows, n - len(self._peeked)))
+        self._peeked = []
+        page = self._tpl.table(rows, self._done)
+        self._done += max(len(rows), 1)
+        # reportlab marca _postponed al pasar a página nueva y solo lo limpia al
+        # dibujar; este flowable nunca se dibuja, así que se limpia al avanzar
+        self.__dict__.pop("_postponed", None)
+        return [page, self] if self._pending() else [page]
+
+    def draw(self) -> None:
+        pass
+
+def _build_bytes(story: list[Any]) -> bytes:
+    buf = BytesIO()
+    _doc(buf).build(story)
+    return buf.getvalue()
+
+def _build_file(path: str, story: list[Any]) -> None:
+    # Directo al archivo: sin BytesIO intermedio ni copia con getvalue()
+    with open(path, "wb") as f:
+        _doc(f).build(story)
+
+def write_pdf(path: str, builder: Callable[..., bytes], *args: Any) -> None:
+    """Adapta un builder build_pdf_* (bytes) a la firma write_*(path, ...) del spool."""
+    with open(path, "wb") as f:
+        f.write(builder(*args))
+
 def _safe(d: dict[str, Any], *keys: str, default: str = "-") -> Any:
     for k in keys:
         if k in d and d[k] not in (None, ""):
@@ -68,84 +195,77 @@ def _fmt_short_dt(raw: Any) -> str:
 
 # ------------------- BUILDERS -------------------
 
-def build_pdf_teams(teams: Iterable[dict[str, Any]]) -> bytes:
-    buf = BytesIO(); doc = _doc(buf); title, _, normal = _styles()
-    rows: list[list[Any]] = [["ID", "Name", "City", "Coach"]]
+# Plantillas compiladas al importar (una vez por worker)
+TEAMS_TABLE        = TableTemplate(["ID", "Name", "City", "Coach"], [50, 220, 150, 130])
+TEAM_PLAYERS_TABLE = TableTemplate(["#", "Player", "Age", "Position"], [28, 260, 70, 140])
+ALL_PLAYERS_TABLE  = TableTemplate(["#", "Player", "Team", "Age", "Position"], [28, 180, 170, 60, 130])
+HISTORY_TABLE      = TableTemplate(["ID", "Fecha", "Estado", "Local", "Visitante", "Marcador"],
+                                   [40, 120, 100, 120, 120, 60])
+STANDINGS_TABLE    = TableTemplate(["#", "Equipo", "Victorias"], [28, 340, 90])
+
+def _teams_rows(teams: Iterable[dict[str, Any]]) -> Iterator[list[Any]]:
     for t in teams:
         if not isinstance(t, dict):
             continue
-        rows.append([
+        yield [
             _safe(t, "id", "Id", "teamId", "TeamId", default="-"),
             _safe(t, "name", "Name", "teamName", "TeamName", default="-"),
             _safe(t, "city", "City", "location", "Location", default="-"),
             _safe(t, "coach", "Coach", "manager", "Manager", default="-"),
-        ])
+        ]
+
+def build_pdf_teams(teams: list[dict[str, Any]]) -> bytes:
+    title, _, normal = _styles()
+    total = sum(1 for t in teams if isinstance(t, dict))
     story: list[Any] = [
         Paragraph("Listado de Equipos", title),
         Spacer(1, 6),
-        Paragraph(f"Total: {len(rows)-1}", normal),
+        Paragraph(f"Total: {total}", normal),
         Spacer(1, 8),
-        _table(rows, col_widths=[50, 220, 150, 130]),
+        TEAMS_TABLE.stream(_teams_rows(teams)),
     ]
-    doc.build(story)
-    return buf.getvalue()
+    return _build_bytes(story)
 
-def build_pdf_players_by_team(team_id: str, players: Iterable[dict[str, Any]], team_name: str | None=None) -> bytes:
-    buf = BytesIO(); doc = _doc(buf); title, _, normal = _styles()
-    rows: list[list[Any]] = [["#", "Player", "Age", "Position"]]
-    for i, p in enumerate(players, 1):
-        if not isinstance(p, dict): continue
-        rows.append([i, _safe(p, "name", "Name", default=""),
-                        _safe(p, "age", "Age", default="-"),
-                        _safe(p, "position", "Position", default="")])
+def _team_players_rows(players: Iterable[dict[str, Any]]) -> Iterator[list[Any]]:
+    for i, p in enumerate((p for p in players if isinstance(p, dict)), 1):
+        yield [i, _safe(p, "name", "Name", default=""),
+                  _safe(p, "age", "Age", default="-"),
+                  _safe(p, "position", "Position", default="")]
+
+def build_pdf_players_by_team(team_id: str, players: list[dict[str, Any]], team_name: str | None=None) -> bytes:
+    title, _, normal = _styles()
+    total = sum(1 for p in players if isinstance(p, dict))
     titulo = f"Jugadores del Equipo {team_name}  (#{team_id})" if team_name else f"Jugadores del Equipo #{team_id}"
     story: list[Any] = [Paragraph(titulo, title), Spacer(1, 6),
-                        Paragraph(f"Total: {len(rows)-1}", normal),
-                        Spacer(1, 8), _table(rows, col_widths=[28, 260, 70, 140])]
-    doc.build(story); return buf.getvalue()
+                        Paragraph(f"Total: {total}", normal),
+                        Spacer(1, 8), TEAM_PLAYERS_TABLE.stream(_team_players_rows(players))]
+    return _build_bytes(story)
 
-def build_pdf_all_players(players: Iterable[dict[str, Any]], team_name_by_id: dict[str, str]) -> bytes:
-    buf = BytesIO(); doc = _doc(buf); title, _, normal = _styles()
-    rows: list[list[Any]] = [["#", "Player", "Team", "Age", "Position"]]
-    for i, p in enumerate(players, 1):
+def _all_players_rows(players: Iterable[dict[str, Any]], team_name_by_id: dict[str, str]) -> Iterator[list[Any]]:
+    i = 0
+    for p in players:
         if not isinstance(p, dict): continue
+        i += 1
         team_id = str(_safe(p, "team_id", "teamId", "TeamId", default=""))
         team_name = team_name_by_id.get(team_id, team_id or "-")
-        rows.append([i, _safe(p, "name", "Name", default=""), team_name,
-                        _safe(p, "age", "Age", default="-"),
-                        _safe(p, "position", "Position", default="")])
-    story: list[Any] = [Paragraph("Jugadores Registrados", title), Spacer(1, 6),
-                        Paragraph(f"Total: {len(rows)-1}", normal), Spacer(1, 8),
-                        _table(rows, col_widths=[28, 180, 170, 60, 130])]
-    doc.build(story); return buf.getvalue()
+        yield [i, _safe(p, "name", "Name", default=""), team_name,
+               _safe(p, "age", "Age", default="-"),
+               _safe(p, "position", "Position", default="")]
 
-def build_pdf_matches_history(matches, from_, to, teams_map):
-    # Usa los helpers locales existentes (_doc, _styles, _table)
-    buf = BytesIO()
-    doc = _doc(buf)
+def _all_players_story(players: list[dict[str, Any]], team_name_by_id: dict[str, str]) -> list[Any]:
     title, _, normal = _styles()
+    total = sum(1 for p in players if isinstance(p, dict))
+    return [Paragraph("Jugadores Registrados", title), Spacer(1, 6),
+            Paragraph(f"Total: {total}", normal), Spacer(1, 8),
+            ALL_PLAYERS_TABLE.stream(_all_players_rows(players, team_name_by_id))]
 
-    story: list[Any] = [
-        Paragraph("Historial de Partidos", title),
-        Spacer(1, 6),
-    ]
-
-    # Subtítulo (rango)
-    if from_ or to:
-        story += [Paragraph(f"Rango: {from_ or '—'} a {to or '—'}", normal), Spacer(1, 8)]
-    else:
-        story += [Spacer(1, 8)]
-
-    # Cabecera de tabla
-    rows = [["ID", "Fecha", "Estado", "Local", "Visitante", "Marcador"]]
+def build_pdf_all_players(players: list[dict[str, Any]], team_name_by_id: dict[str, str]) -> bytes:
+    return _build_bytes(_all_players_story(players, team_name_by_id))
 
-    if not matches:
-        rows.append(["—", "—", "No hay partidos en el rango", "—", "—", "—"])
-        story.append(_table(rows, col_widths=[40, 120, 100, 120, 120, 60]))
-        doc.build(story)
-        return buf.getvalue()
+def write_pdf_all_players(path: str, players: list[dict[str, Any]], team_name_by_id: dict[str, str]) -> None:
+    _build_file(path, _all_players_story(players, team_name_by_id))
 
-    # Renglones
+def _history_rows(matches: Iterable[dict[str, Any]], teams_map: dict[str, str]) -> Iterator[list[Any]]:
     for m in matches:
         mid   = m.get("id") or m.get("Id") or "—"
         date  = m.get("dateMatch") or m.get("DateMatch") or m.get("date") or "—"
@@ -160,11 +280,35 @@ def build_pdf_matches_history(matches, from_, to, teams_map):
         hs = m.get("homeScore") or m.get("HomeScore") or 0
         as_ = m.get("awayScore") or m.get("AwayScore") or 0
 
-        rows.append([mid, str(date), str(stat), str(home), str(away), f"{hs} - {as_}"])
+        yield [mid, str(date), str(stat), str(home), str(away), f"{hs} - {as_}"]
 
-    story.append(_table(rows, col_widths=[40, 120, 100, 120, 120, 60]))
-    doc.build(story)
-    return buf.getvalue()
+def _history_story(matches, from_, to, teams_map) -> list[Any]:
+    title, _, normal = _styles()
+
+    story: list[Any] = [
+        Paragraph("Historial de Partidos", title),
+        Spacer(1, 6),
+    ]
+
+    # Subtítulo (rango)
+    if from_ or to:
+        story += [Paragraph(f"Rango: {from_ or '—'} a {to or '—'}", normal), Spacer(1, 8)]
+    else:
+        story += [Spacer(1, 8)]
+
+    if not matches:
+        story.append(HISTORY_TABLE.table([["—", "—", "No hay partidos en el rango", "—", "—", "—"]]))
+        return story
+
+    # Renglones: se generan a medida que se maquetan las páginas
+    story.append(HISTORY_TABLE.stream(_history_rows(matches, teams_map)))
+    return story
+
+def build_pdf_matches_history(matches, from_, to, teams_map) -> bytes:
+    return _build_bytes(_history_story(matches, from_, to, teams_map))
+
+def write_pdf_matches_history(path: str, matches, from_, to, teams_map) -> None:
+    _build_file(path, _history_story(matches, from_, to, teams_map))
 
 
 
@@ -234,7 +378,7 @@ def build_pdf_stats_summary(
     _, h2, _ = _styles()
     elems: list[Any] = [Paragraph(title_text, h2)]
     if subtitle:
-        elems.append(Paragraph(subtitle, getSampleStyleSheet()["Normal"]))
+        elems.append(Paragraph(subtitle, _sample_styles()["Normal"]))
         elems.append(Spacer(1, 4))
     elems.append(_table(rows, col_widths=col_widths))
     elems.append(Spacer(1, 10))
@@ -254,15 +398,15 @@ def build_pdf_stats_report(sections: list[tuple[str, list[list[Any]]]]) -> bytes
     return buf.getvalue()
 
 
-def build_pdf_standings(rows: list[dict[str, Any]]) -> bytes:
-    buf = BytesIO(); doc = _doc(buf); title, _, normal = _styles()
-    data: list[list[Any]] = [["#", "Equipo", "Victorias"]]
+def _standings_rows(rows: Iterable[dict[str, Any]]) -> Iterator[list[Any]]:
     for i, r in enumerate(rows, 1):
-        nombre = str(r.get("name", "")); wins = int(r.get("wins", 0) or 0)
-        data.append([i, nombre, wins])
+        yield [i, str(r.get("name", "")), int(r.get("wins", 0) or 0)]
+
+def build_pdf_standings(rows: list[dict[str, Any]]) -> bytes:
+    title, _, normal = _styles()
     story: list[Any] = [
         Paragraph("Tabla de Posiciones", title), Spacer(1, 6),
         Paragraph(f"Total: {len(rows)}", normal), Spacer(1, 8),
-        _table(data, col_widths=[28, 340, 90]),
+        STANDINGS_TABLE.stream(_standings_rows(rows)),
     ]
-    doc.build(story); return buf.getvalue()
+    return _build_bytes(story)
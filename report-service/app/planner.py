@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import Header
+
+from . import clients, datasource, timing
+from .cache import cache_key, cached
+from .paging import PageQuery
+
+
+@dataclass(frozen=True)
+class Creds:
+    """Cabeceras de autorización hacia los upstreams (X-*-Authorization)."""
+    api: Optional[str] = None
+    teams: Optional[str] = None
+    players: Optional[str] = None
+    matches: Optional[str] = None
+
+    def scope(self) -> str:
+        """Digest de las credenciales (para claves de cache); sin ninguna -> "anon"."""
+        raw = "|".join(v or "" for v in (self.api, self.teams, self.players, self.matches))
+        if not raw.strip("|"):
+            return "anon"
+        return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+async def upstream_creds(
+    x_api_authorization: str | None = Header(default=None, alias="X-Api-Authorization"),
+    x_teams_authorization: str | None = Header(default=None, alias="X-Teams-Authorization"),
+    x_players_authorization: str | None = Header(default=None, alias="X-Players-Authorization"),
+    x_matches_authorization: str | None = Header(default=None, alias="X-Matches-Authorization"),
+) -> Creds:
+    """Dependencia FastAPI: agrupa las cabeceras de upstream de la petición."""
+    return Creds(x_api_authorization, x_teams_authorization,
+                 x_players_authorization, x_matches_authorization)
+
+
+# -------------------------
+# Datasets declarables (resueltos por la fuente activa, ver datasource.py)
+# -------------------------
+Dataset = Callable[[Creds], Awaitable[Any]]
+
+def teams() -> Dataset:
+    return lambda c: datasource.current().teams(c)
+
+def teams_map() -> Dataset:
+    return lambda c: cached(
+        "teams_map", cache_key("teams_map", None, c.scope()),
+        lambda: datasource.current().teams_map(c),
+    )
+
+def team(team_id: str) -> Dataset:
+    """Lookup puntual: evita descargar todos los equipos por un solo nombre."""
+    return lambda c: datasource.current().team(c, team_id)
+
+def team_name(team_id: str) -> Dataset:
+    async def run(c: Creds) -> str:
+        if not team_id:
+            return ""
+        t = await datasource.current().team(c, team_id)
+        return clients.team_name(t, team_id) if t else team_id
+    return run
+
+def players(team_id: Optional[str] = None) -> Dataset:
+    return lambda c: datasource.current().players(c, team_id)
+
+def matches(from_date: Optional[str] = None, to_date: Optional[str] = None) -> Dataset:
+    return lambda c: datasource.current().matches(c, from_date, to_date)
+
+def match(match_id: str) -> Dataset:
+    return lambda c: datasource.current().match(c, match_id)
+
+def player_stats(player_id: str) -> Dataset:
+    """Puntos, faltas y partidos de un jugador (pre-agregados por el ETL)."""
+    return lambda c: datasource.current().player_stats(c, player_id)
+
+def players_page(q: PageQuery) -> Dataset:
+    return lambda c: datasource.current().players_page(c, q)
+
+def matches_page(q: PageQuery) -> Dataset:
+    return lambda c: datasource.current().matches_page(c, q)
+
+
+async def fetch(creds: Creds, **needs: Dataset) -> dict[str, Any]:
+    """
+    Resuelve en paralelo los datasets declarados y devuelve {nombre: valor}.
+    Los datasets que dependen de otro se piden en una segunda llamada.
+
+        got = await planner.fetch(creds, matches=planner.matches(), tmap=planner.teams_map())
+    """
+    names = list(needs)
+    with timing.phase("fetch"):
+        values = await asyncio.gather(*(needs[n](creds) for n in names))
+    return dict(zip(names, values))
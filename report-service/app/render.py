@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from collections import deque
+from typing import Any, Callable, Iterable, Optional
+
+from fastapi import HTTPException
+
+from . import config, metrics, timing
+
+log = logging.getLogger(__name__)
+
+# El render de reportlab es CPU puro: se hace fuera del event loop para que
+# /health y los endpoints JSON no se congelen mientras se arma un PDF grande.
+
+
+def _timed(fn: Callable[..., Any], args: tuple[Any, ...]) -> tuple[Any, float, float]:
+    """Corre en el worker: devuelve (resultado, inicio_wall, segundos_de_render)."""
+    started = time.time()
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, started, time.perf_counter() - t0
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+def compact(rows: Iterable[Any], keys: Iterable[str]) -> list[dict[str, Any]]:
+    """Recorta cada fila a las claves que lee el builder (menos bytes a picklear)."""
+    wanted = tuple(keys)
+    return [{k: r[k] for k in wanted if k in r} for r in rows if isinstance(r, dict)]
+
+
+class _SpoolFile:
+    """
+    PDF de spool que se borra solo si el render termina y nadie lo espera ya.
+    Tras un timeout el worker sigue escribiendo: el archivo se borra cuando
+    termina, no cuando el que esperaba se va. Ambos avisos llegan en el loop.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._done = False
+        self._abandoned = False
+
+    def finished(self) -> None:
+        self._done = True
+        if self._abandoned:
+            _unlink(self.path)
+
+    def abandon(self) -> None:
+        self._abandoned = True
+        if self._done:
+            _unlink(self.path)
+
+
+@dataclass
+class RenderStats:
+    renders: int = 0
+    rejected: int = 0     # cola llena -> 503
+    timeouts: int = 0     # cola + render más largo que RENDER_TIMEOUT_SECONDS -> 504
+    failures: int = 0
+    wait_ms_total: float = 0.0
+    wait_ms_max: float = 0.0
+    render_ms_total: float = 0.0
+    render_ms_max: float = 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        return {k: round(v, 2) if isinstance(v, float) else v for k, v in self.__dict__.items()}
+
+
+class Renderer:
+    """
+    Pool de render acotado. Como mucho `max_pending` PDFs (en cola + en curso,
+    incluidos los que ya nadie espera); el siguiente se rechaza con 503 en vez de acumular memoria y latencia.
+    Los renders de jobs (`background=True`) esperan un lugar en vez de
+    rechazarse y usan `job_timeout` (None: sin límite) en vez de `timeout`.
+    Mide por separado la espera en cola y el tiempo de render en el worker.
+    """
+
+    def __init__(self, kind: str, workers: int, max_pending: int, timeout: float,
+                 job_timeout: Optional[float] = None):
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.job_timeout = job_timeout
+        self.stats = RenderStats()
+        self._pending = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()   # jobs esperando lugar
+        self._executor: Optional[Executor] = None
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        if self.kind == "thread":
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="pdf")
+        else:
+            self._executor = ProcessPoolExecutor(self.workers)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _release(self, loop: asyncio.AbstractEventLoop, on_done: Optional[Callable[[], None]]) -> None:
+        # Callback del futuro del pool: corre en un hilo del executor
+        def dec() -> None:
+            self._pending -= 1
+            self._wake()
+            if on_done is not None:
+                on_done()
+        try:
+            loop.call_soon_threadsafe(dec)
+        except RuntimeError:   # loop ya cerrado (apagado)
+            if on_done is not None:
+                on_done()
+
+    def _wake(self) -> None:
+        while self._waiters:
+            w = self._waiters.popleft()
+            if not w.done():
+                w.set_result(None)
+                return
+
+    async def _slot(self) -> None:
+        """Espera (en orden de llegada) a que el pool baje de `max_pending`."""
+        while self._pending >= self.max_pending:
+            w = asyncio.get_running_loop().create_future()
+            self._waiters.append(w)
+            try:
+                await w
+            except asyncio.CancelledError:
+                # Si ya lo habían despertado, el lugar pasa al siguiente
+                if w.done() and not w.cancelled():
+                    self._wake()
+                raise
+
+    async def render(
+        self, fn: Callable[..., Any], *args: Any, report: Optional[str] = None,
+        on_done: Optional[Callable[[], None]] = None, background: bool = False,
+    ) -> Any:
+        """
+        `fn` debe ser una función de módulo y `args` picklables (modo process).
+        `report` etiqueta las métricas (por defecto, el nombre de `fn`).
+        `on_done` se llama en el loop cuando el worker termina (o la tarea se
+        cancela en cola), aunque ya nadie espere el resultado.
+        El timeout cuenta desde el envío: espera en cola + render.
+        """
+        if background:
+            await self._slot()
+        elif self._pending >= self.max_pending:
+            self.stats.rejected += 1
+            raise HTTPException(
+                status_code=503, detail="Render de PDF saturado", headers={"Retry-After": "1"},
+            )
+        timeout = self.job_timeout if background else self.timeout
+        self.start()
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        cf = self._executor.submit(_timed, fn, args)
+        # Se libera cuando el worker termina (o la tarea se cancela en cola), no
+        # cuando deja de esperarse: un render abandonado por timeout sigue ocupando
+        self._pending += 1
+        cf.add_done_callback(lambda _f: self._release(loop, on_done))
+        try:
+            # Al vencer se cancela el futuro: si aún estaba en cola, no llega a correr
+            out, started, seconds = await asyncio.wait_for(asyncio.wrap_future(cf), timeout)
+        except asyncio.TimeoutError:
+            # Un render ya iniciado no se puede interrumpir: termina su PDF y se descarta
+            self.stats.timeouts += 1
+            log.warning("render de %s superó %ss", fn.__name__, timeout)
+            raise HTTPException(status_code=504, detail="Render de PDF excedió el tiempo")
+        except Exception:
+            self.stats.failures += 1
+            raise
+
+        wait_ms = max(0.0, started - submitted) * 1000
+        render_ms = seconds * 1000
+        s = self.stats
+        s.renders += 1
+        s.wait_ms_total += wait_ms
+        s.wait_ms_max = max(s.wait_ms_max, wait_ms)
+        s.render_ms_total += render_ms
+        s.render_ms_max = max(s.render_ms_max, render_ms)
+        report = report or fn.__name__
+        timing.add("render-queue", wait_ms / 1000)
+        timing.add("render", seconds)
+        metrics.PDF_QUEUE_SECONDS.observe(wait_ms / 1000, report)
+        metrics.PDF_RENDER_SECONDS.observe(seconds, report)
+        if isinstance(out, bytes):
+            metrics.PDF_BYTES.observe(len(out), report)
+        return out
+
+    async def render_to_file(self, fn: Callable[..., None], *args: Any, background: bool = False) -> str:
+        """
+        El worker escribe el PDF en un archivo de PDF_SPOOL_DIR (fn(path, *args))
+        y se devuelve la ruta: los bytes no vuelven por el pipe del pool ni se
+        copian en memoria. Quien lo sirve debe borrar el archivo.
+        """
+        fd, path = tempfile.mkstemp(prefix="report-", suffix=".pdf", dir=config.PDF_SPOOL_DIR)
+        os.close(fd)
+        spool = _SpoolFile(path)
+        # write_pdf(path, builder, ...) se etiqueta con el builder, no con el envoltorio
+        report = args[0].__name__ if args and callable(args[0]) else fn.__name__
+        try:
+            await self.render(fn, path, *args, report=report, on_done=spool.finished,
+                              background=background)
+        except BaseException:
+            spool.abandon()
+            raise
+        metrics.PDF_BYTES.observe(os.path.getsize(path), report)
+        return path
+
+
+_renderer = Renderer(
+    config.PDF_RENDER_EXECUTOR,
+    config.PDF_RENDER_WORKERS,
+    config.PDF_RENDER_MAX_PENDING,
+    config.PDF_RENDER_TIMEOUT_SECONDS,
+    config.PDF_JOB_RENDER_TIMEOUT_SECONDS or None,
+)
+
+def start() -> None:
+    _renderer.start()
+
+def shutdown() -> None:
+    _renderer.shutdown()
+
+async def render(fn: Callable[..., bytes], *args: Any) -> bytes:
+    return await _renderer.render(fn, *args)
+
+async def render_to_file(fn: Callable[..., None], *args: Any, background: bool = False) -> str:
+    return await _renderer.render_to_file(fn, *args, background=background)
+
+def discard(path: str) -> None:
+    """Borra un PDF de spool ya enviado (BackgroundTask de la respuesta)."""
+    _unlink(path)
+
+def render_stats() -> dict[str, Any]:
+    return {"executor": _renderer.kind, "workers": _renderer.workers,
+            "pending": _renderer._pending, "waiting": len(_renderer._waiters),
+            **_renderer.stats.as_dict()}
@@ -1,38 +1,208 @@
 from __future__ import annotations
+import asyncio
+import logging
 import os
-from pymongo import MongoClient, ASCENDING
+from datetime import datetime, timezone
+from typing import Any, Optional, Sequence
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
+
+from .clients import _parse_iso
 
 MONGO_URL  = os.getenv("MONGO_URL", "mongodb://mongo:27017")
 REPORTS_DB = os.getenv("REPORTS_DB", "reports")
 READ_FROM_CACHE = os.getenv("READ_FROM_CACHE", "false").lower() == "true"
+# Antigüedad máxima (s) de un dataset del ETL para servirlo desde Mongo
+READ_MODEL_MAX_AGE_SECONDS = float(os.getenv("READ_MODEL_MAX_AGE_SECONDS", "600"))
+# Cada cuánto (s) se vuelve a consultar esa frescura
+READ_MODEL_CHECK_SECONDS = float(os.getenv("READ_MODEL_CHECK_SECONDS", "5"))
+READ_MODEL_BATCH_SIZE = int(os.getenv("READ_MODEL_BATCH_SIZE", "1000"))
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "2000"))
+
+log = logging.getLogger(__name__)
 
-_client = None
-_db = None
+# Proyecciones: solo lo que consumen los reportes
+TEAM_FIELDS   = {"_id": 0, "id": 1, "name": 1, "city": 1, "coach": 1}
+PLAYER_FIELDS = {"_id": 0, "id": 1, "name": 1, "age": 1, "position": 1, "teamId": 1, "teamName": 1}
+MATCH_FIELDS  = {"_id": 0, "id": 1, "date": 1, "status": 1, "homeTeamId": 1, "awayTeamId": 1,
+                 "homeScore": 1, "awayScore": 1}
+PLAYER_STATS_FIELDS = {"_id": 0, "playerId": 1, "games": 1, "points": 1, "scores": 1, "pointsPerGame": 1,
+                       "fouls": 1, "foulsByType": 1}
 
-def _get_db():
+# Índices de las páginas de la API JSON: igualdad (filtro) + clave de orden (paging.*_SORT)
+PAGE_INDEXES: dict[str, list[tuple[str, ...]]] = {
+    "players": [("name", "id"), ("teamId", "name", "id"), ("position", "name", "id")],
+    # (date, status) sirve los rangos de history; el resto, las páginas por equipo/estado
+    "matches": [("date", "id"), ("date", "status"), ("status", "date", "id"),
+                ("homeTeamId", "date", "id"), ("awayTeamId", "date", "id")],
+}
+
+_client: Optional[AsyncIOMotorClient] = None
+_db: Optional[AsyncIOMotorDatabase] = None
+
+def _get_db() -> AsyncIOMotorDatabase:
     global _client, _db
     if _db is None:
-        _client = MongoClient(MONGO_URL)
+        _client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=MONGO_TIMEOUT_MS)
         _db = _client[REPORTS_DB]
-        _db.teams.create_index([("id", ASCENDING)], unique=True)
-        _db.players.create_index([("id", ASCENDING)], unique=True)
-        _db.players.create_index([("teamId", ASCENDING)])
-        _db.team_stats.create_index([("teamId", ASCENDING)], unique=True)
     return _db
 
-def get_teams():
-    return list(_get_db().teams.find({}, {"_id": 0}))
+async def connect() -> None:
+    """Abre el cliente y crea índices (lifespan). Mongo caído no impide arrancar."""
+    db = _get_db()
+    try:
+        await db.teams.create_index([("id", ASCENDING)], unique=True)
+        await db.players.create_index([("id", ASCENDING)], unique=True)
+        await db.players.create_index([("teamId", ASCENDING)])
+        await db.matches.create_index([("id", ASCENDING)], unique=True)
+        await db.team_stats.create_index([("teamId", ASCENDING)], unique=True)
+        await db.player_stats.create_index([("playerId", ASCENDING)], unique=True)
+        # Paginación por cursor (paging.py): filtros + orden de la página, en ese orden
+        for keys in PAGE_INDEXES["players"]:
+            await db.players.create_index([(k, ASCENDING) for k in keys])
+        for keys in PAGE_INDEXES["matches"]:
+            await db.matches.create_index([(k, ASCENDING) for k in keys])
+    except PyMongoError as e:
+        log.warning("No se pudieron crear índices en %s: %s", REPORTS_DB, e)
+
+def close() -> None:
+    global _client, _db
+    if _client is not None:
+        _client.close()
+    _client = _db = None
+
+async def _find(col: str, query: dict[str, Any], fields: dict[str, int]) -> list[dict[str, Any]]:
+    cursor = _get_db()[col].find(query, fields, batch_size=READ_MODEL_BATCH_SIZE)
+    return await cursor.to_list(length=None)
+
+# -------------------------
+# Frescura (escrita por el ETL en etl_meta)
+# -------------------------
+async def dataset_age(dataset: str) -> Optional[float]:
+    """Segundos desde la última carga del ETL para el dataset, o None si no hay."""
+    meta = await _get_db().etl_meta.find_one({"_id": dataset}, {"updatedAt": 1})
+    ts = (meta or {}).get("updatedAt")
+    if not isinstance(ts, datetime):
+        return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - ts).total_seconds()
+
+# -------------------------
+# Lecturas
+# -------------------------
+async def get_teams() -> list[dict[str, Any]]:
+    return await _find("teams", {}, TEAM_FIELDS)
+
+async def get_team(team_id: str) -> Optional[dict[str, Any]]:
+    return await _get_db().teams.find_one({"id": str(team_id)}, TEAM_FIELDS)
 
-def get_players_all():
-    return list(_get_db().players.find({}, {"_id": 0}))
+async def get_teams_map() -> dict[str, str]:
+    rows = await _find("teams", {}, {"_id": 0, "id": 1, "name": 1})
+    return {str(t["id"]): str(t.get("name") or t["id"]) for t in rows if t.get("id")}
 
-def get_players_by_team(team_id: str):
-    return list(_get_db().players.find({"teamId": str(team_id)}, {"_id": 0}))
+async def get_players_all() -> list[dict[str, Any]]:
+    return await _find("players", {}, PLAYER_FIELDS)
 
-def get_matches_all():
-    return list(_get_db().matches.find({}, {"_id": 0}))
+async def get_players_by_team(team_id: str) -> list[dict[str, Any]]:
+    return await _find("players", {"teamId": str(team_id)}, PLAYER_FIELDS)
 
-def get_standings_rows():
-    stats = list(_get_db().team_stats.find({}, {"_id": 0}))
+# El ETL guarda `date` como datetime UTC (BSON) para poder indexar rangos; hacia
+# el resto del servicio se sigue entregando texto ISO, como los upstreams.
+def _iso(v: Any) -> Any:
+    return v.isoformat() + "Z" if isinstance(v, datetime) else v
+
+def _matches_out(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    for m in rows:
+        m["date"] = _iso(m.get("date"))
+    return rows
+
+def _date_range(from_date: Optional[str], to_date: Optional[str]) -> dict[str, Any]:
+    """Filtro from/to (inclusive) sobre el índice de fecha; sin fecha no entra."""
+    rng: dict[str, Any] = {}
+    f_dt = _parse_iso(from_date); t_dt = _parse_iso(to_date)
+    if f_dt: rng["$gte"] = f_dt
+    if t_dt: rng["$lte"] = t_dt
+    return {"date": rng} if rng else {}
+
+async def get_matches_all() -> list[dict[str, Any]]:
+    return _matches_out(await _find("matches", {}, MATCH_FIELDS))
+
+async def get_matches_range(from_date: Optional[str], to_date: Optional[str]) -> list[dict[str, Any]]:
+    return _matches_out(await _find("matches", _date_range(from_date, to_date), MATCH_FIELDS))
+
+async def get_match(match_id: str) -> Optional[dict[str, Any]]:
+    m = await _get_db().matches.find_one({"id": str(match_id)}, MATCH_FIELDS)
+    return _matches_out([m])[0] if m else None
+
+async def get_standings_rows() -> list[dict[str, Any]]:
+    stats = await _find("team_stats", {}, {"_id": 0})
     stats.sort(key=lambda s: (-int(s.get("wins", 0)), s.get("teamName","")))
     return [{"id": s["teamId"], "name": s.get("teamName",""), "wins": int(s.get("wins", 0))} for s in stats]
+
+async def get_player_stats(player_id: str) -> Optional[dict[str, Any]]:
+    """Documento de player_stats (pre-agregado por el ETL) con nombre y equipo del jugador."""
+    db = _get_db()
+    stats, player = await asyncio.gather(
+        db.player_stats.find_one({"playerId": str(player_id)}, PLAYER_STATS_FIELDS),
+        db.players.find_one({"id": str(player_id)}, {"_id": 0, "name": 1, "teamId": 1, "teamName": 1}),
+    )
+    if stats is None:
+        return None
+    return {**stats, **(player or {})}
+
+# -------------------------
+# Páginas por cursor (ver paging.py)
+# -------------------------
+def _after(sort: Sequence[str], after: Optional[Sequence[Any]]) -> dict[str, Any]:
+    """Filas estrictamente posteriores a `after` en el orden ascendente `sort`."""
+    if after is None:
+        return {}
+    branches = []
+    for i, k in enumerate(sort):
+        branch = {sort[j]: after[j] for j in range(i)}
+        # null ordena primero: "después de null" es cualquier valor no nulo
+        branch[k] = {"$gt": after[i]} if after[i] is not None else {"$ne": None}
+        branches.append(branch)
+    return {"$or": branches}
+
+async def _page(
+    col: str, branches: list[dict[str, Any]], sort: Sequence[str],
+    after: Optional[Sequence[Any]], limit: int, fields: dict[str, int],
+) -> tuple[list[dict[str, Any]], bool]:
+    """
+    `branches` son alternativas de igualdad (un $or raíz: cada rama usa su
+    índice y Mongo mezcla los resultados ya ordenados). Pide limit+1 para
+    saber si hay más.
+    """
+    cont = _after(sort, after)
+    conds = [{"$and": [b, cont]} if cont and b else (b or cont) for b in branches]
+    query = conds[0] if len(conds) == 1 else {"$or": conds}
+    cursor = _get_db()[col].find(query, fields).sort([(k, ASCENDING) for k in sort]).limit(limit + 1)
+    rows = await cursor.to_list(length=limit + 1)
+    return rows[:limit], len(rows) > limit
+
+async def page_players(
+    sort: Sequence[str], after: Optional[Sequence[Any]], limit: int,
+    team_id: Optional[str] = None, position: Optional[str] = None,
+) -> tuple[list[dict[str, Any]], bool]:
+    eq: dict[str, Any] = {}
+    if team_id: eq["teamId"] = str(team_id)
+    if position: eq["position"] = position
+    return await _page("players", [eq], sort, after, limit, PLAYER_FIELDS)
+
+async def page_matches(
+    sort: Sequence[str], after: Optional[Sequence[Any]], limit: int,
+    team_id: Optional[str] = None, status: Optional[str] = None,
+    from_date: Optional[str] = None, to_date: Optional[str] = None,
+) -> tuple[list[dict[str, Any]], bool]:
+    eq: dict[str, Any] = _date_range(from_date, to_date)
+    if status: eq["status"] = status
+    branches = [{**eq, "homeTeamId": str(team_id)}, {**eq, "awayTeamId": str(team_id)}] if team_id else [eq]
+    # El cursor trae la fecha como texto ISO (la de la última fila entregada)
+    if after is not None:
+        after = (_parse_iso(after[0]), *after[1:])
+    rows, more = await _page("matches", branches, sort, after, limit, MATCH_FIELDS)
+    return _matches_out(rows), more
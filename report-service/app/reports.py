@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+
+from . import clients, etag, pdf_utils, planner
+from .aggregators import (
+    SUMMARY_RANKINGS, SUMMARY_TOP, STANDINGS_ORDER, league_stats, match_roster,
+)
+from .pdf_utils import MATCH_KEYS, PLAYER_KEYS, TEAM_KEYS
+from .planner import Creds
+from .render import compact
+
+# Catálogo de reportes PDF. Lo usan los endpoints síncronos (main.py) y los
+# jobs (jobs.py): mismo fetch, misma huella para el ETag y mismo builder.
+
+Build = Callable[[], Awaitable[tuple[Callable[..., Any], tuple[Any, ...]]]]
+
+
+@dataclass
+class Prepared:
+    """Reporte con sus datos ya descargados, listo para renderizar."""
+    filename: str
+    digests: list[str]   # huellas de entrada (ETag)
+    build: Build         # -> (builder de pdf_utils, args picklables); puede agregar
+    spool: bool = False  # True: builder write_* que escribe en archivo (reportes largos)
+
+
+def _ready(fn: Callable[..., Any], *args: Any) -> Build:
+    async def build() -> tuple[Callable[..., Any], tuple[Any, ...]]:
+        return fn, args
+    return build
+
+
+# -------------------------
+# Reportes
+# -------------------------
+async def teams(creds: Creds) -> Prepared:
+    teams = (await planner.fetch(creds, teams=planner.teams()))["teams"]
+    return Prepared("equipos.pdf", [etag.rows_digest(teams)],
+                    _ready(pdf_utils.build_pdf_teams, compact(teams, TEAM_KEYS)))
+
+async def players_by_team(creds: Creds, team_id: str) -> Prepared:
+    got = await planner.fetch(creds, players=planner.players(team_id), team=planner.team(team_id))
+    team_name = clients.team_name(got["team"]) if got["team"] else None
+    return Prepared(
+        f"players_{team_id}.pdf",
+        [etag.rows_digest(got["players"]), etag.rows_digest(got["team"])],
+        _ready(pdf_utils.build_pdf_players_by_team, team_id,
+               compact(got["players"], PLAYER_KEYS), team_name),
+    )
+
+async def players_all(creds: Creds) -> Prepared:
+    got = await planner.fetch(creds, players=planner.players(), tmap=planner.teams_map())
+    return Prepared(
+        "players_all.pdf",
+        [etag.rows_digest(got["players"]), etag.rows_digest(got["tmap"])],
+        _ready(pdf_utils.write_pdf_all_players, compact(got["players"], PLAYER_KEYS), got["tmap"]),
+        spool=True,
+    )
+
+async def matches_history(
+    creds: Creds, from_: Optional[str] = None, to: Optional[str] = None
+) -> Prepared:
+    got = await planner.fetch(creds, matches=planner.matches(from_, to), tmap=planner.teams_map())
+    return Prepared(
+        "history.pdf",
+        [etag.matches_digest(got["matches"]), etag.rows_digest(got["tmap"])],
+        _ready(pdf_utils.write_pdf_matches_history,
+               compact(got["matches"], MATCH_KEYS), from_, to, got["tmap"]),
+        spool=True,
+    )
+
+async def roster(creds: Creds, match_id: str) -> Prepared:
+    data = await match_roster(match_id, creds)
+    return Prepared(f"roster_{match_id}.pdf", [etag.rows_digest(data)],
+                    _ready(pdf_utils.build_pdf_match_roster, match_id, data))
+
+def _player_stats_fields(stats: dict[str, Any]) -> dict[str, Any]:
+    out = {
+        "Jugador": stats.get("name") or stats.get("playerId", ""),
+        "Equipo": stats.get("teamName") or stats.get("teamId") or "-",
+        "Partidos": stats.get("games", 0),
+        "Puntos": stats.get("points", 0),
+        "Promedio de puntos": stats.get("pointsPerGame", 0),
+        "Anotaciones": stats.get("scores", 0),
+        "Faltas": stats.get("fouls", 0),
+    }
+    for kind, n in sorted((stats.get("foulsByType") or {}).items()):
+        out[f"Faltas ({kind})"] = n
+    return out
+
+async def fetch_player_stats(creds: Creds, player_id: str) -> dict[str, Any]:
+    """Estadísticas del read-model; 404 si el ETL aún no las cargó (PDF, JSON y jobs)."""
+    stats = (await planner.fetch(creds, stats=planner.player_stats(player_id)))["stats"]
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Sin estadísticas para el jugador (las carga el ETL en el read-model)")
+    return stats
+
+async def player_stats(creds: Creds, player_id: str) -> Prepared:
+    stats = await fetch_player_stats(creds, player_id)
+    return Prepared(f"player_{player_id}_stats.pdf", [etag.rows_digest(stats)],
+                    _ready(pdf_utils.build_pdf_player_stats, player_id, _player_stats_fields(stats)))
+
+STATS_HEADER = ["#", "Equipo", "ID", "PJ", "PG", "PP", "PF", "PC"]
+
+def _stats_rows(ordered: list[dict[str, Any]]) -> list[list[Any]]:
+    rows: list[list[Any]] = [STATS_HEADER]
+    for idx, s in enumerate(ordered, 1):
+        rows.append([idx, s["team"], s["teamId"], s["played"], s["wins"], s["losses"], s["pf"], s["pa"]])
+    return rows
+
+async def stats_summary(creds: Creds) -> Prepared:
+    table, digest = await league_stats(creds)
+
+    async def build() -> tuple[Callable[..., Any], tuple[Any, ...]]:
+        sections = [
+            (title, _stats_rows(table.records(table.top(SUMMARY_TOP, *order))))
+            for _, title, order in SUMMARY_RANKINGS
+        ]
+        return pdf_utils.build_pdf_stats_report, (sections,)
+
+    return Prepared("stats_summary.pdf", [digest], build)
+
+async def standings(creds: Creds) -> Prepared:
+    table, digest = await league_stats(creds)
+
+    async def build() -> tuple[Callable[..., Any], tuple[Any, ...]]:
+        rows = [{"name": s["team"], "wins": s["wins"]} for s in table.records(table.top(None, *STANDINGS_ORDER))]
+        return pdf_utils.build_pdf_standings, (rows,)
+
+    return Prepared("standings.pdf", [digest], build)
+
+
+# Nombre de spec (jobs) -> (preparador, parámetros obligatorios, opcionales).
+# Los parámetros se pasan en ese orden, después de las credenciales.
+REPORTS: dict[str, tuple[Callable[..., Awaitable[Prepared]], tuple[str, ...], tuple[str, ...]]] = {
+    "teams":           (teams, (), ()),
+    "players_by_team": (players_by_team, ("team_id",), ()),
+    "players_all":     (players_all, (), ()),
+    "matches_history": (matches_history, (), ("from", "to")),
+    "match_roster":    (roster, ("match_id",), ()),
+    "player_stats":    (player_stats, ("player_id",), ()),
+    "stats_summary":   (stats_summary, (), ()),
+    "standings":       (standings, (), ()),
+}
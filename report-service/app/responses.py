@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import gzip
+import os
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Optional
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+from . import timing
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se ofrece gzip
+    brotli = None
+
+# Respuestas JSON de reportes: orjson en vez de jsonable_encoder + json, bytes
+# serializados reutilizados entre requests y compresión negociada (br/gzip).
+
+# Por debajo de este tamaño no vale la pena comprimir
+JSON_COMPRESS_MIN_BYTES = int(os.getenv("JSON_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+# Presupuesto de memoria para cuerpos ya serializados (todas las codificaciones)
+JSON_BODY_CACHE_MAX_BYTES = int(os.getenv("JSON_BODY_CACHE_MAX_BYTES", str(64 * 2**20)))
+
+ENCODINGS: tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def dumps(value: Any) -> bytes:
+    with timing.phase("serialize"):
+        return orjson.dumps(value, option=_OPTIONS)
+
+
+# -------------------------
+# Negociación (Accept-Encoding)
+# -------------------------
+@lru_cache(maxsize=256)
+def _negotiate(header: str, offered: tuple[str, ...]) -> str:
+    weights: dict[str, float] = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    best, best_q = "identity", 0.0
+    for enc in offered:   # a igual q gana el primero ofrecido (br antes que gzip)
+        q = weights.get(enc, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+def negotiate(request: Request, offered: tuple[str, ...] = ENCODINGS) -> str:
+    """Codificación a usar para esta petición: "br", "gzip" o "identity"."""
+    return _negotiate(request.headers.get("accept-encoding", ""), offered)
+
+def compress(body: bytes, encoding: str) -> bytes:
+    with timing.phase("compress"):
+        if encoding == "gzip":
+            return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        if encoding == "br":
+            return brotli.compress(body, quality=BROTLI_QUALITY)
+        return body
+
+
+# -------------------------
+# Cuerpos serializados (LRU por bytes)
+# -------------------------
+class BodyCache:
+    """
+    clave -> {codificación: bytes}. La identidad se guarda al serializar y
+    cada variante comprimida se calcula la primera vez que alguien la pide.
+    Las claves incluyen la huella de los datos: no hay invalidación.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: OrderedDict[str, dict[str, bytes]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[dict[str, bytes]]:
+        item = self._items.get(key)
+        if item is not None:
+            self._items.move_to_end(key)
+        return item
+
+    def put(self, key: str, body: bytes) -> dict[str, bytes]:
+        # Dos requests concurrentes pueden serializar la misma clave: el reemplazo descuenta al anterior
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.size -= sum(len(b) for b in old.values())
+        item = {"identity": body}
+        self._items[key] = item
+        self.size += len(body)
+        self._trim()
+        return item
+
+    def variant(self, key: str, item: dict[str, bytes], encoding: str) -> bytes:
+        out = item.get(encoding)
+        if out is None:
+            out = item[encoding] = compress(item["identity"], encoding)
+            if self._items.get(key) is item:   # solo si sigue guardado (no reemplazado ni expulsado)
+                self.size += len(out)
+                self._trim()
+        return out
+
+    def _trim(self) -> None:
+        while self.size > self.max_bytes and self._items:
+            _, old = self._items.popitem(last=False)
+            self.size -= sum(len(b) for b in old.values())
+
+_bodies = BodyCache(JSON_BODY_CACHE_MAX_BYTES)
+
+
+# -------------------------
+# Respuestas
+# -------------------------
+def _encoded(body: bytes, encoding: str, headers: dict[str, str],
+             variant: Callable[[str], bytes]) -> Response:
+    headers = {**headers, "Vary": "Accept-Encoding"}
+    if encoding != "identity" and len(body) >= JSON_COMPRESS_MIN_BYTES:
+        body = variant(encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type="application/json", headers=headers)
+
+def json_response(value: Any, encoding: str, headers: dict[str, str]) -> Response:
+    """Serializa y comprime (si corresponde) sin guardar nada."""
+    body = dumps(value)
+    return _encoded(body, encoding, headers, lambda enc: compress(body, enc))
+
+async def cached_json(
+    key: str, encoding: str, headers: dict[str, str], produce: Callable[[], Awaitable[Any]]
+) -> Response:
+    """
+    Como json_response, pero reutiliza los bytes (y sus variantes comprimidas)
+    de `key`; `produce` solo se llama si no están.
+    """
+    item = _bodies.get(key)
+    if item is None:
+        item = _bodies.put(key, dumps(await produce()))
+    return _encoded(item["identity"], encoding, headers, lambda enc: _bodies.variant(key, item, enc))
+
+def body_cache_stats() -> dict[str, int]:
+    return {"entries": len(_bodies._items), "bytes": _bodies.size, "max_bytes": _bodies.max_bytes}
+
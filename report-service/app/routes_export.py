@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from enum import Enum
+from typing import Any, Iterator
+
+import httpx
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+
+from . import etag, exports, planner, responses
+from .clients import upstream_502
+from .planner import Creds, upstream_creds
+
+# Exportaciones CSV / NDJSON para consumidores masivos: mismos datasets (planner)
+# que los PDF, sin layout de reportlab. GET /reports/<reporte>.<csv|ndjson>
+router = APIRouter(tags=["reports-export"])
+
+
+class ExportFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+
+
+def _export(
+    request: Request, fmt: ExportFormat, name: str, digests: list[str],
+    records: Iterator[dict[str, Any]], columns: tuple[str, ...],
+):
+    gz = responses.negotiate(request, ("gzip",)) == "gzip"
+    # La codificación entra en el ETag: gzip e identidad son representaciones distintas
+    tag = etag.strong(request, [*digests, fmt.value, "gzip" if gz else "identity"])
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+    media_type, serialize = exports.FORMATS[fmt.value]
+    body = serialize(records, columns)
+    headers = {
+        "Content-Disposition": f'attachment; filename="{name}.{fmt.value}"',
+        "Vary": "Accept-Encoding",
+        **etag.headers(tag),
+    }
+    if gz:
+        body = exports.gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
+@router.get("/teams.{fmt}")
+async def export_teams(fmt: ExportFormat, request: Request, creds: Creds = Depends(upstream_creds)):
+    try:
+        teams = (await planner.fetch(creds, teams=planner.teams()))["teams"]
+    except httpx.HTTPStatusError as e:
+        raise upstream_502(e)
+    return _export(request, fmt, "equipos", [etag.rows_digest(teams)],
+                   exports.team_records(teams), exports.TEAM_COLUMNS)
+
+@router.get("/players/all.{fmt}")
+async def export_players(fmt: ExportFormat, request: Request, creds: Creds = Depends(upstream_creds)):
+    try:
+        got = await planner.fetch(creds, players=planner.players(), tmap=planner.teams_map())
+    except httpx.HTTPStatusError as e:
+        raise upstream_502(e)
+    return _export(request, fmt, "players_all",
+                   [etag.rows_digest(got["players"]), etag.rows_digest(got["tmap"])],
+                   exports.player_records(got["players"], got["tmap"]), exports.PLAYER_COLUMNS)
+
+@router.get("/matches/history.{fmt}")
+async def export_history(
+    fmt: ExportFormat,
+    request: Request,
+    from_: str | None = Query(default=None, alias="from"),
+    to: str | None = None,
+    creds: Creds = Depends(upstream_creds),
+):
+    try:
+        got = await planner.fetch(creds, matches=planner.matches(from_, to), tmap=planner.teams_map())
+    except httpx.HTTPStatusError as e:
+        raise upstream_502(e)
+    return _export(request, fmt, "history",
+                   [etag.matches_digest(got["matches"]), etag.rows_digest(got["tmap"])],
+                   exports.match_records(got["matches"], got["tmap"]), exports.MATCH_COLUMNS)
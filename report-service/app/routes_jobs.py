@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse, ORJSONResponse
+from pydantic import BaseModel, Field
+
+from . import jobs, reports
+from .planner import Creds, upstream_creds
+
+# Reportes en segundo plano: POST spec -> id, GET estado, GET descarga.
+# Evita tener la conexión (y el proxy_read_timeout del gateway) abierta mientras se renderiza.
+router = APIRouter(tags=["reports-jobs"])
+
+
+class JobSpec(BaseModel):
+    report: str = Field(description="Uno de: " + ", ".join(reports.REPORTS))
+    params: dict[str, Optional[str]] = Field(default_factory=dict)
+
+
+def _validated(spec: JobSpec) -> dict[str, Optional[str]]:
+    entry = reports.REPORTS.get(spec.report)
+    if entry is None:
+        raise HTTPException(status_code=422, detail=f"Reporte desconocido: {spec.report}")
+    _, required, optional = entry
+    unknown = set(spec.params) - {*required, *optional}
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Parámetros no admitidos: {sorted(unknown)}")
+    missing = [n for n in required if not spec.params.get(n)]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Faltan parámetros: {missing}")
+    # Normalizado: mismo spec -> misma clave de deduplicación
+    return {n: spec.params.get(n) or None for n in (*required, *optional)}
+
+
+def _job_or_404(job_id: str, creds: Creds) -> jobs.Job:
+    job = jobs.manager().get(job_id, creds)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job no encontrado o vencido")
+    return job
+
+
+@router.post("/jobs", status_code=202)
+async def create_job(spec: JobSpec, creds: Creds = Depends(upstream_creds)):
+    """Encola un reporte (o devuelve el job idéntico que ya está en curso)."""
+    job = jobs.manager().submit(spec.report, _validated(spec), creds)
+    return ORJSONResponse(job.public(), status_code=202,
+                        headers={"Location": f"/reports/jobs/{job.id}"})
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, creds: Creds = Depends(upstream_creds)):
+    return _job_or_404(job_id, creds).public()
+
+@router.get("/jobs/{job_id}/download")
+async def download_job(job_id: str, creds: Creds = Depends(upstream_creds)):
+    job = _job_or_404(job_id, creds)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job en estado {job.status}")
+    path = jobs.manager().artifact(job)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Artefacto no disponible")
+    return FileResponse(path, media_type="application/pdf", filename=job.filename)
@@ -1,43 +1,46 @@
 
 from __future__ import annotations
 
+from dataclasses import replace
+from typing import Any, Optional
+
 import httpx
-from fastapi import APIRouter, Header, HTTPException, Depends
+from fastapi import APIRouter, Depends, Query, Request
 
-from . import clients
-from .aggregators import aggregate_stats_from_matches
-from .deps_auth import require_admin
+from . import etag, exports, paging, planner, responses
+from .aggregators import SUMMARY_RANKINGS, SUMMARY_TOP, STANDINGS_ORDER, league_stats
+from .cache import cache_key, cached
+from .clients import upstream_502
+from .paging import PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT, PageQuery
+from .planner import Creds, upstream_creds
+from .reports import fetch_player_stats
 
 
-async def _admin_dep(
-    authorization: str | None = Header(default=None, alias="Authorization"),
-):
-    # valida JWT del auth-service y rol Admin
-    await require_admin(authorization)
-
-
-router = APIRouter(
-    tags=["reports-json"],
-    dependencies=[Depends(_admin_dep)],
-)
-
-def _upstream_502(e: httpx.HTTPStatusError) -> HTTPException:
-    req = e.request
-    resp = e.response
-    return HTTPException(
-        status_code=502,
-        detail={
-            "upstream_url": str(req.url),
-            "status_code": resp.status_code,
-            "body": (resp.text or "")[:200],
-        },
-    )
+# La autenticación (admin_dep) se aplica una sola vez al montar el router en main.py
+router = APIRouter(tags=["reports-json"])
+
+def _row(s: dict) -> dict:
+    return {**s, "teamId": int(s["teamId"])}
+
+async def _cached_body(key: str, entry: dict, enc: str, tag: str):
+    """Bytes ya serializados del cuerpo cacheado; la huella va en la clave (una versión por dato)."""
+    async def body() -> Any:
+        return entry["body"]
+    return await responses.cached_json(f"{key}@{entry['digest']}", enc, etag.headers(tag), body)
+
+STANDINGS_COLUMNS = ("teamId", "team", "played", "wins", "losses", "pf", "pa", "diff")
+
+def _standings_key(s: dict) -> paging.Key:
+    return (-s["wins"], s["team"], s["teamId"])
 
 @router.get("/standings")
 async def standings_json(
-    x_api_authorization: str | None = Header(default=None, alias="X-Api-Authorization"),
-    x_matches_authorization: str | None = Header(default=None, alias="X-Matches-Authorization"),
-    x_teams_authorization: str | None = Header(default=None, alias="X-Teams-Authorization"),
+    request: Request,
+    team: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1, le=PAGE_MAX_LIMIT),
+    creds: Creds = Depends(upstream_creds),
 ):
     """
     Devuelve posiciones agregadas:
@@ -45,38 +48,42 @@ async def standings_json(
       "total": N,
       "data": [{ teamId, team, played, wins, losses, pf, pa, diff }, ...]
     }
+    Opcional: team (teamId), fields=team,wins,... y limit/cursor; con
+    cualquiera de ellos se agrega "next" (cursor de la página siguiente o null).
     """
+    wanted = paging.parse_fields(fields, STANDINGS_COLUMNS)
+    scope = PageQuery(team=team).scope()
+    after = paging.decode_cursor(cursor, scope)
+
+    async def build() -> dict:
+        table, digest = await league_stats(creds)
+        data = [_row(s) for s in table.records(table.top(None, *STANDINGS_ORDER))]
+        return {"digest": digest, "body": {"total": len(data), "data": data}}
+
+    key = cache_key("/reports/standings", None, creds.scope())
     try:
-        matches = await clients.fetch_matches(None, None, x_api_authorization, x_matches_authorization)
-        tmap = await clients.fetch_teams_map(x_api_authorization, x_teams_authorization)
+        entry = await cached("standings", key, build)
     except httpx.HTTPStatusError as e:
-        raise _upstream_502(e)
-
-    agg = aggregate_stats_from_matches(matches, tmap)
-
-    ordered = sorted(agg.values(), key=lambda s: (-int(s["wins"]), s["team"]))
-    data = [
-        {
-            "teamId": int(s["teamId"]),
-            "team": s["team"],
-            "played": int(s["played"]),
-            "wins": int(s["wins"]),
-            "losses": int(s["losses"]),
-            "pf": int(s["pf"]),
-            "pa": int(s["pa"]),
-            "diff": int(s["pf"]) - int(s["pa"]),
-        }
-        for s in ordered
-    ]
-
-    return {"total": len(data), "data": data}
+        raise upstream_502(e)
+    enc = responses.negotiate(request)
+    tag = etag.strong(request, [entry["digest"], enc])
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+
+    body = entry["body"]
+    if team is None and wanted is None and cursor is None and limit is None:
+        return await _cached_body(key, entry, enc, tag)
+
+    rows = body["data"] if team is None else [s for s in body["data"] if str(s["teamId"]) == team]
+    page = paging.keyset(rows, _standings_key, after, limit or len(rows))
+    return responses.json_response({
+        "total": len(rows),
+        "data": paging.project(page.items, wanted),
+        "next": paging.encode_cursor(page.next, scope) if page.next else None,
+    }, enc, etag.headers(tag))
 
 @router.get("/stats/summary")
-async def stats_summary_json(
-    x_api_authorization: str | None = Header(default=None, alias="X-Api-Authorization"),
-    x_matches_authorization: str | None = Header(default=None, alias="X-Matches-Authorization"),
-    x_teams_authorization: str | None = Header(default=None, alias="X-Teams-Authorization"),
-):
+async def stats_summary_json(request: Request, creds: Creds = Depends(upstream_creds)):
     """
     Devuelve rankings útiles para la tarjeta 'Resumen Estadístico'.
     {
@@ -86,35 +93,103 @@ async def stats_summary_json(
       "minLosses": [...]
     }
     """
+    async def build() -> dict:
+        table, digest = await league_stats(creds)
+        return {"digest": digest, "body": {
+            name: [_row(s) for s in table.records(table.top(SUMMARY_TOP, *order))]
+            for name, _, order in SUMMARY_RANKINGS
+        }}
+
+    key = cache_key("/reports/stats/summary", None, creds.scope())
     try:
-        matches = await clients.fetch_matches(None, None, x_api_authorization, x_matches_authorization)
-        tmap = await clients.fetch_teams_map(x_api_authorization, x_teams_authorization)
+        entry = await cached("summary", key, build)
     except httpx.HTTPStatusError as e:
-        raise _upstream_502(e)
-
-    agg = aggregate_stats_from_matches(matches, tmap)
-    values = list(agg.values())
-
-    def row(s: dict) -> dict:
-        return {
-            "teamId": int(s["teamId"]),
-            "team": s["team"],
-            "played": int(s["played"]),
-            "wins": int(s["wins"]),
-            "losses": int(s["losses"]),
-            "pf": int(s["pf"]),
-            "pa": int(s["pa"]),
-            "diff": int(s["pf"]) - int(s["pa"]),
-        }
-
-    top_wins     = [row(s) for s in sorted(values, key=lambda s: (-int(s["wins"]), s["team"]))[:10]]
-    top_pf       = [row(s) for s in sorted(values, key=lambda s: (-int(s["pf"]), s["team"]))[:10]]
-    min_pf       = [row(s) for s in sorted(values, key=lambda s: ( int(s["pf"]), s["team"]))[:10]]
-    min_losses   = [row(s) for s in sorted(values, key=lambda s: ( int(s["losses"]), -int(s["wins"]), s["team"]))[:10]]
-
-    return {
-        "topWins": top_wins,
-        "topPF": top_pf,
-        "minPF": min_pf,
-        "minLosses": min_losses,
+        raise upstream_502(e)
+    enc = responses.negotiate(request)
+    tag = etag.strong(request, [entry["digest"], enc])
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+    return await _cached_body(key, entry, enc, tag)
+
+@router.get("/players/{player_id}/stats")
+async def player_stats_json(player_id: str, request: Request, creds: Creds = Depends(upstream_creds)):
+    """
+    Estadísticas de un jugador, pre-agregadas por el ETL desde anotaciones y faltas:
+    { playerId, name, teamId, teamName, games, points, scores, pointsPerGame, fouls, foulsByType }
+    (games = partidos con al menos una anotación o falta del jugador).
+    """
+    stats = await fetch_player_stats(creds, player_id)
+    enc = responses.negotiate(request)
+    tag = etag.strong(request, [etag.rows_digest(stats), enc])
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+    return responses.json_response(stats, enc, etag.headers(tag))
+
+
+# -------------------------
+# Listados paginados por cursor (jugadores / partidos)
+# -------------------------
+async def _listing(
+    request: Request, creds: Creds, q: PageQuery, cursor: Optional[str],
+    dataset: Any, records: Any, wanted: Optional[tuple[str, ...]], name_fields: tuple[str, ...],
+) -> Any:
+    q = replace(q, after=paging.decode_cursor(cursor, q.scope()))
+    needs = {"page": dataset(q)}
+    # El mapa de equipos solo hace falta si se piden los nombres
+    if wanted is None or any(f in wanted for f in name_fields):
+        needs["tmap"] = planner.teams_map()
+    try:
+        got = await planner.fetch(creds, **needs)
+    except httpx.HTTPStatusError as e:
+        raise upstream_502(e)
+    page: paging.Page = got["page"]
+    body = {
+        "data": paging.project(records(page.items, got.get("tmap") or {}), wanted),
+        "next": paging.encode_cursor(page.next, q.scope()) if page.next else None,
     }
+    enc = responses.negotiate(request)
+    tag = etag.strong(request, [etag.rows_digest(body), enc])
+    if etag.is_fresh(request, tag):
+        return etag.not_modified(tag)
+    return responses.json_response(body, enc, etag.headers(tag))
+
+@router.get("/players")
+async def players_json(
+    request: Request,
+    team: Optional[str] = None,
+    position: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+    creds: Creds = Depends(upstream_creds),
+):
+    """
+    Jugadores ordenados por (nombre, id):
+    { "data": [{ id, name, teamId, team, age, position }, ...], "next": cursor|null }
+    """
+    wanted = paging.parse_fields(fields, exports.PLAYER_COLUMNS)
+    q = PageQuery(limit=limit, team=team, position=position)
+    return await _listing(request, creds, q, cursor, planner.players_page,
+                          exports.player_records, wanted, ("team",))
+
+@router.get("/matches")
+async def matches_json(
+    request: Request,
+    team: Optional[str] = None,
+    status: Optional[str] = None,
+    from_: Optional[str] = Query(default=None, alias="from"),
+    to: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+    creds: Creds = Depends(upstream_creds),
+):
+    """
+    Partidos ordenados por (fecha, id); team = local o visitante:
+    { "data": [{ id, date, status, homeTeamId, homeTeam, awayTeamId, awayTeam, homeScore, awayScore }, ...],
+      "next": cursor|null }
+    """
+    wanted = paging.parse_fields(fields, exports.MATCH_COLUMNS)
+    q = PageQuery(limit=limit, team=team, status=status, from_date=from_, to_date=to)
+    return await _listing(request, creds, q, cursor, planner.matches_page,
+                          exports.match_records, wanted, ("homeTeam", "awayTeam"))
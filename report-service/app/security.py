@@ -9,13 +9,17 @@ AUTH_SECRET = os.getenv("AUTH_SECRET", "")
 INTERNAL_SECRET = os.getenv("INTERNAL_SECRET", "")
 
 
-def verify_admin(authorization: str | None, x_internal_secret: str | None):
-
-    if (
+def is_internal(x_internal_secret: str | None) -> bool:
+    return bool(
         INTERNAL_SECRET
         and x_internal_secret
         and hmac.compare_digest(x_internal_secret, INTERNAL_SECRET)
-    ):
+    )
+
+
+def verify_admin(authorization: str | None, x_internal_secret: str | None):
+
+    if is_internal(x_internal_secret):
         return
 
 
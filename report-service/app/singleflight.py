@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+def credential_scope(headers: dict[str, str]) -> str:
+    """
+    Alcance de credencial para la clave: digest del Authorization usado
+    contra el upstream (nunca el token en claro). Sin token -> "anon".
+    """
+    tok = headers.get("Authorization")
+    if not tok:
+        return "anon"
+    return hashlib.sha256(tok.encode()).hexdigest()[:16]
+
+
+class SingleFlight:
+    """
+    Coalescencia de llamadas idénticas + memo de vida corta.
+
+    - Llamadas concurrentes con la misma clave esperan un único fetch.
+    - El resultado se guarda `ttl_seconds` (LRU acotado a `max_entries`).
+    - Los errores se propagan a todos los que esperaban y no se memorizan.
+
+    Los valores devueltos se comparten entre llamadores: no deben mutarse.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._inflight: dict[Hashable, asyncio.Future[Any]] = {}
+        self._memo: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        # Contadores
+        self.fetches = 0     # fetch real al upstream
+        self.coalesced = 0   # se unió a un fetch en vuelo
+        self.memo_hits = 0   # servido desde el memo
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "fetches": self.fetches,
+            "coalesced": self.coalesced,
+            "memo_hits": self.memo_hits,
+            "entries": len(self._memo),
+        }
+
+    def clear(self) -> None:
+        self._memo.clear()
+
+    def _memo_get(self, key: Hashable) -> tuple[bool, Any]:
+        hit = self._memo.get(key)
+        if hit is None:
+            return False, None
+        expires, value = hit
+        if expires < time.monotonic():
+            del self._memo[key]
+            return False, None
+        self._memo.move_to_end(key)
+        return True, value
+
+    def _memo_put(self, key: Hashable, value: Any) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        self._memo[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._memo.move_to_end(key)
+        while len(self._memo) > self.max_entries:
+            self._memo.popitem(last=False)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        found, value = self._memo_get(key)
+        if found:
+            self.memo_hits += 1
+            return value
+
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            return await asyncio.shield(fut)
+
+        self.fetches += 1
+        # Tarea propia: si el primer llamador se cancela, los demás siguen esperando
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+
+        def _done(t: asyncio.Future[Any]) -> None:
+            self._inflight.pop(key, None)
+            if not t.cancelled() and t.exception() is None:
+                self._memo_put(key, t.result())
+
+        task.add_done_callback(_done)
+        return await asyncio.shield(task)
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import logging
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+from .security import is_internal
+
+log = logging.getLogger(__name__)
+
+# Desglose por fases de cada respuesta de /reports/* en la cabecera
+# Server-Timing (visible en la pestaña Network del navegador) y, a pedido de
+# un llamador interno, perfil cProfile de una petición concreta.
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+# Dónde se guardan los perfiles (.pstats) y cuántos se conservan
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "report-profiles"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "20"))
+
+_PREFIX = "/reports/"
+
+
+class Timing:
+    """Fases de una petición: nombre -> [segundos acumulados, veces]."""
+
+    def __init__(self) -> None:
+        self.t0 = time.perf_counter()
+        self.phases: dict[str, list[float]] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        p = self.phases.get(name)
+        if p is None:
+            self.phases[name] = [seconds, 1]
+        else:
+            p[0] += seconds
+            p[1] += 1
+
+    def header(self) -> str:
+        parts = []
+        for name, (seconds, count) in self.phases.items():
+            item = f"{name};dur={seconds * 1000:.1f}"
+            if count > 1:
+                item += f';desc="{int(count)}x"'
+            parts.append(item)
+        parts.append(f"total;dur={(time.perf_counter() - self.t0) * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[Timing]] = ContextVar("server_timing", default=None)
+
+def add(name: str, seconds: float) -> None:
+    """Suma `seconds` a la fase `name` de la petición en curso (no-op fuera de una)."""
+    t = _current.get()
+    if t is not None:
+        t.add(name, seconds)
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, time.perf_counter() - t0)
+
+
+# -------------------------
+# Perfiles a pedido (X-Profile + X-Internal-Secret)
+# -------------------------
+_profiling = False   # cProfile es por proceso: uno a la vez
+
+def profile_path(name: str) -> Optional[str]:
+    """Ruta de un perfil guardado; None si el nombre no es de un perfil existente."""
+    if os.path.basename(name) != name or not name.endswith(".pstats"):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+def _save(prof: cProfile.Profile, path: str) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    prof.dump_stats(path)
+    files = sorted((e for e in os.scandir(PROFILE_DIR) if e.name.endswith(".pstats")),
+                   key=lambda e: e.stat().st_mtime)
+    for e in files[:max(0, len(files) - PROFILE_MAX_FILES)]:
+        try:
+            os.unlink(e.path)
+        except FileNotFoundError:
+            pass
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI: abre un Timing por petición de /reports/* y lo escribe como
+    Server-Timing al enviar las cabeceras (fases medidas hasta el primer byte).
+    Con `X-Profile: 1` y el X-Internal-Secret correcto corre la petición bajo
+    cProfile y devuelve en `X-Profile` el nombre del perfil guardado
+    (descargable en /reports/_profiles/{nombre}).
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(_PREFIX):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        prof: Optional[cProfile.Profile] = None
+        profile_header: Optional[str] = None
+        if headers.get(b"x-profile") and is_internal(headers.get(b"x-internal-secret", b"").decode("latin-1")):
+            profile_header, prof = self._start_profile()
+        if not SERVER_TIMING_ENABLED and prof is None:
+            await self.app(scope, receive, send)
+            return
+
+        timing = Timing()
+        token = _current.set(timing)
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                extra = []
+                if SERVER_TIMING_ENABLED:
+                    extra.append((b"server-timing", timing.header().encode("latin-1")))
+                if profile_header is not None:
+                    extra.append((b"x-profile", profile_header.encode("latin-1")))
+                message = {**message, "headers": list(message.get("headers") or []) + extra}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            if prof is not None:
+                await self._finish_profile(prof, profile_header or "")
+
+    @staticmethod
+    def _start_profile() -> tuple[str, Optional[cProfile.Profile]]:
+        global _profiling
+        if _profiling:
+            return "busy", None
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:   # otro profiler activo en el proceso
+            return "busy", None
+        _profiling = True
+        return f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.pstats", prof
+
+    @staticmethod
+    async def _finish_profile(prof: cProfile.Profile, name: str) -> None:
+        global _profiling
+        # Incluye todo lo que corrió en el loop mientras tanto (otras peticiones también)
+        prof.disable()
+        _profiling = False
+        try:
+            await asyncio.to_thread(_save, prof, os.path.join(PROFILE_DIR, name))
+        except OSError as e:
+            log.warning("no se pudo guardar el perfil %s: %s", name, e)
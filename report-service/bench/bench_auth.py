@@ -0,0 +1,68 @@
+"""
+Benchmark: costo de verificar un JWT por request (HS256 y RS256).
+
+Compara, por algoritmo:
+  pem/call   jwt.decode con el secreto/PEM como string (se parsea en cada decode)
+  parsed     jwt.decode con la clave ya construida (TokenVerifier.decode)
+  cached     TokenVerifier.verify con el token ya verificado (LRU por digest)
+
+Uso (desde report-service/):
+    python -m bench.bench_auth
+    python -m bench.bench_auth --iterations 2000 --algs RS256
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable
+
+import rsa
+from jose import jwt
+
+from app.deps_auth import AUD, ISS, TokenVerifier
+
+
+def _keys(alg: str) -> tuple[str, str]:
+    """(clave de firma, clave de verificación)."""
+    if alg == "HS256":
+        return "bench-secret", "bench-secret"
+    pub, priv = rsa.newkeys(2048)
+    return priv.save_pkcs1().decode(), pub.save_pkcs1().decode()
+
+def _token(alg: str, signing_key: str) -> str:
+    now = int(time.time())
+    claims = {"sub": "bench", "role": "admin", "aud": AUD, "iss": ISS, "iat": now, "exp": now + 3600}
+    return jwt.encode(claims, signing_key, algorithm=alg)
+
+def _per_op_us(fn: Callable[[], object], n: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) * 1e6 / n
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--iterations", type=int, default=500)
+    ap.add_argument("--algs", nargs="+", choices=["HS256", "RS256"], default=["HS256", "RS256"])
+    args = ap.parse_args()
+
+    print(f"{'alg':<6} {'path':<10} {'µs/op':>10} {'ops/s':>11}")
+    for alg in args.algs:
+        signing, verifying = _keys(alg)
+        token = _token(alg, signing)
+        verifier = TokenVerifier.from_secret(verifying, alg)
+        cases = {
+            "pem/call": lambda: jwt.decode(token, verifying, algorithms=[alg], audience=AUD, issuer=ISS),
+            "parsed": lambda: verifier.decode(token),
+            "cached": lambda: verifier.verify(token),
+        }
+        for name, fn in cases.items():
+            us = _per_op_us(fn, args.iterations)
+            print(f"{alg:<6} {name:<10} {us:>10.1f} {1e6 / us:>11,.0f}")
+        print(f"{alg:<6} stats      {verifier.stats.as_dict()}")
+
+
+if __name__ == "__main__":
+    main()
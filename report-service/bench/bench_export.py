@@ -0,0 +1,71 @@
+"""
+Benchmark: throughput de exportación por formato (PDF vs CSV vs NDJSON).
+
+Mismo dataset sintético de jugadores/partidos por cada formato, en proceso
+(sin API): filas por segundo y tamaño de salida. gzip opcional.
+
+Uso (desde report-service/):
+    python -m bench.bench_export --rows 10000
+    python -m bench.bench_export --rows 100000 --skip-pdf
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable, Iterator
+
+from app import exports, pdf_utils
+
+from .bench_pdf import _TMAP, _matches, _players
+
+
+def _drain(chunks: Iterator[bytes]) -> int:
+    return sum(len(c) for c in chunks)
+
+def _pdf(write: Callable[[str], None]) -> int:
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        write(path)
+        return os.path.getsize(path)
+    finally:
+        os.unlink(path)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10_000)
+    ap.add_argument("--skip-pdf", action="store_true")
+    args = ap.parse_args()
+
+    players, matches = _players(args.rows), _matches(args.rows)
+    cases: list[tuple[str, str, Callable[[], int]]] = []
+    for fmt, (_, serialize) in exports.FORMATS.items():
+        cases += [
+            ("players", fmt, lambda s=serialize: _drain(
+                s(exports.player_records(players, _TMAP), exports.PLAYER_COLUMNS))),
+            ("players", f"{fmt}+gzip", lambda s=serialize: _drain(exports.gzip_chunks(
+                s(exports.player_records(players, _TMAP), exports.PLAYER_COLUMNS)))),
+            ("history", fmt, lambda s=serialize: _drain(
+                s(exports.match_records(matches, _TMAP), exports.MATCH_COLUMNS))),
+        ]
+    if not args.skip_pdf:
+        cases += [
+            ("players", "pdf", lambda: _pdf(lambda p: pdf_utils.write_pdf_all_players(p, players, _TMAP))),
+            ("history", "pdf", lambda: _pdf(
+                lambda p: pdf_utils.write_pdf_matches_history(p, matches, None, None, _TMAP))),
+        ]
+
+    print(f"rows: {args.rows}")
+    print(f"{'dataset':<8} {'format':<12} {'ms':>9} {'rows/s':>11} {'KiB':>9}")
+    for dataset, fmt, run in sorted(cases, key=lambda c: (c[0], c[1])):
+        t0 = time.perf_counter()
+        size = run()
+        s = time.perf_counter() - t0
+        print(f"{dataset:<8} {fmt:<12} {s * 1000:>9.0f} {args.rows / s:>11,.0f} {size / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: serialización y compresión del JSON de standings.
+
+Por tamaño de liga mide:
+  encode   jsonable_encoder + json (lo que hacía JSONResponse) vs orjson
+  compress tiempo y tamaño de gzip y brotli sobre los bytes de orjson
+  reuse    respuesta desde responses.cached_json con los bytes ya guardados
+
+Uso (desde report-service/, con ../shared en PYTHONPATH):
+    python -m bench.bench_json
+    python -m bench.bench_json --teams 1000 100000 --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Callable
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+import leaguestats
+
+from app import responses
+from app.aggregators import STANDINGS_ORDER
+
+
+def _standings(n: int) -> dict[str, Any]:
+    rng = np.random.default_rng(n)
+    stats = {c: rng.integers(0, 1000, n) for c in leaguestats.STAT_COLUMNS}
+    table = leaguestats.LeagueTable([str(i + 1) for i in range(n)], [f"Equipo {i + 1}" for i in range(n)], stats)
+    data = [{**s, "teamId": int(s["teamId"])} for s in table.records(table.top(None, *STANDINGS_ORDER))]
+    return {"total": len(data), "data": data}
+
+def _stdlib(value: Any) -> bytes:
+    # Igual que starlette.responses.JSONResponse.render tras jsonable_encoder
+    return json.dumps(jsonable_encoder(value), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+def _ms(fn: Callable[[], Any], repeat: int) -> tuple[float, Any]:
+    out = fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return (time.perf_counter() - t0) * 1000 / repeat, out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--teams", type=int, nargs="+", default=[1000, 100_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"{'teams':>8} {'step':<16} {'ms':>9} {'KiB':>9}")
+    for n in args.teams:
+        payload = _standings(n)
+        rows: list[tuple[str, float, int]] = []
+        ms, raw = _ms(lambda: _stdlib(payload), args.repeat)
+        rows.append(("encode stdlib", ms, len(raw)))
+        ms, body = _ms(lambda: responses.dumps(payload), args.repeat)
+        rows.append(("encode orjson", ms, len(body)))
+        assert json.loads(raw) == json.loads(body)
+        for enc in responses.ENCODINGS:
+            ms, out = _ms(lambda: responses.compress(body, enc), args.repeat)
+            rows.append((f"compress {enc}", ms, len(out)))
+
+        async def produce() -> dict[str, Any]:
+            return payload
+        key = f"bench:{n}"
+        asyncio.run(responses.cached_json(key, "gzip", {}, produce))
+        ms, resp = _ms(lambda: asyncio.run(responses.cached_json(key, "gzip", {}, produce)), args.repeat)
+        rows.append(("reuse gzip", ms, len(resp.body)))
+        for step, ms, size in rows:
+            print(f"{n:>8} {step:<16} {ms:>9.2f} {size / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Benchmark de carga: todos los endpoints de /reports/* contra upstreams falsos.
+
+Levanta los upstreams falsos en el mismo proceso (tamaño de datos, latencia y
+forma de respuesta configurables) y, por endpoint, dispara --requests
+peticiones con --concurrency en vuelo. Reporta throughput, p50/p95/p99 y el
+pico de RSS (proceso + workers del pool de render). Al final corre la mezcla
+de todos los endpoints a la vez.
+
+Con --out se guardan los resultados en JSON; con --compare se imprime la
+diferencia contra una corrida anterior (regresiones > 10% marcadas con !).
+
+Uso (desde report-service/, con ../shared en PYTHONPATH):
+    python -m bench.bench_load
+    python -m bench.bench_load --concurrency 32 --requests 200 --latency-ms 20 --jitter-ms 10
+    python -m bench.bench_load --plain players matches --memo-ttl 0 --out base.json
+    python -m bench.bench_load --compare base.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import time
+from collections import Counter
+from typing import Any, Optional
+
+import httpx
+
+from .bench_pool import _admin_token, _configure_env
+from .bench_render import _pct
+from .fake_upstreams import running
+
+ENDPOINTS = [
+    "/reports/teams.pdf",
+    "/reports/teams/1/players.pdf",
+    "/reports/players/all.pdf",
+    "/reports/matches/history.pdf",
+    "/reports/matches/1/roster.pdf",
+    "/reports/stats/summary.pdf",
+    "/reports/standings.pdf",
+    "/reports/standings",
+    "/reports/stats/summary",
+    "/reports/players?limit=100",
+    "/reports/matches?limit=100",
+    "/reports/teams.csv",
+    "/reports/players/all.ndjson",
+    "/reports/matches/history.csv",
+]
+
+
+# -------------------------
+# RSS
+# -------------------------
+def _rss_kib(pid: int | str = "self") -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+class RssSampler:
+    """Pico de RSS del proceso y de la suma de sus hijos (workers de render)."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_self = 0
+        self.peak_children = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def sample(self) -> None:
+        self.peak_self = max(self.peak_self, _rss_kib())
+        children = sum(_rss_kib(p.pid) for p in multiprocessing.active_children())
+        self.peak_children = max(self.peak_children, children)
+
+    async def _run(self) -> None:
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.sample()
+        if self._task is not None:
+            self._task.cancel()
+
+    def peak_mib(self) -> float:
+        # Sin /proc (macOS): ru_maxrss del proceso (bytes en macOS, KiB en Linux)
+        if self.peak_self == 0:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return (self.peak_self + self.peak_children) / 1024
+
+
+# -------------------------
+# Carga
+# -------------------------
+async def _drive(
+    cx: httpx.AsyncClient, paths: list[str], concurrency: int, headers: dict[str, str]
+) -> dict[str, Any]:
+    queue = list(reversed(paths))
+    latencies: list[float] = []
+    statuses: Counter[str] = Counter()
+
+    async def worker() -> None:
+        while queue:
+            path = queue.pop()
+            t0 = time.perf_counter()
+            try:
+                r = await cx.get(path, headers=headers)
+                status = str(r.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - t0) * 1000)
+            statuses[status] += 1
+
+    sampler = RssSampler()
+    t0 = time.perf_counter()
+    with sampler:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    return {
+        "requests": len(latencies),
+        "errors": len(latencies) - statuses["200"],
+        "statuses": dict(statuses),
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": _pct(latencies, 0.50),
+        "p95": _pct(latencies, 0.95),
+        "p99": _pct(latencies, 0.99),
+        "rss_mib": sampler.peak_mib(),
+    }
+
+def _row(name: str, r: dict[str, Any], base: Optional[dict[str, Any]]) -> str:
+    line = (f"{name:<32} {r['requests']:>6} {r['errors']:>5} {r['rps']:>8.1f} "
+            f"{r['p50']:>8.1f} {r['p95']:>8.1f} {r['p99']:>8.1f} {r['rss_mib']:>8.1f}")
+    if base:
+        def delta(k: str, higher_is_worse: bool) -> str:
+            if not base.get(k):
+                return "     -"
+            d = (r[k] - base[k]) / base[k] * 100
+            worse = d > 10 if higher_is_worse else d < -10
+            return f"{d:+5.0f}%{'!' if worse else ' '}"
+        line += f"   rps {delta('rps', False)} p95 {delta('p95', True)} rss {delta('rss_mib', True)}"
+    if r["errors"]:
+        line += f"   {r['statuses']}"
+    return line
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--requests", type=int, default=100, help="peticiones por endpoint")
+    ap.add_argument("--teams", type=int, default=50)
+    ap.add_argument("--players", type=int, default=2000)
+    ap.add_argument("--matches", type=int, default=5000)
+    ap.add_argument("--latency-ms", type=float, default=5.0, help="latencia agregada por respuesta upstream")
+    ap.add_argument("--jitter-ms", type=float, default=0.0)
+    ap.add_argument("--plain", nargs="*", default=[], choices=["teams", "players", "matches"],
+                    help="servicios que responden una lista sin paginar")
+    ap.add_argument("--memo-ttl", type=float, default=None,
+                    help="UPSTREAM_MEMO_TTL_SECONDS (0 = cada petición va al upstream)")
+    ap.add_argument("--executor", choices=["process", "thread"], default=None)
+    ap.add_argument("--endpoints", nargs="*", default=None, help="subconjunto de rutas")
+    ap.add_argument("--no-mix", action="store_true")
+    ap.add_argument("--out", help="guardar resultados en JSON")
+    ap.add_argument("--compare", help="JSON de una corrida anterior")
+    args = ap.parse_args()
+
+    if args.memo_ttl is not None:
+        os.environ["UPSTREAM_MEMO_TTL_SECONDS"] = str(args.memo_ttl)
+    if args.executor:
+        os.environ["PDF_RENDER_EXECUTOR"] = args.executor
+    os.environ.setdefault("PDF_RENDER_MAX_PENDING", str(max(64, args.concurrency * 2)))
+    endpoints = args.endpoints or ENDPOINTS
+    base: dict[str, Any] = {}
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)["results"]
+
+    results: dict[str, dict[str, Any]] = {}
+    async with running(teams=args.teams, players=args.players, matches=args.matches,
+                       latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                       plain=tuple(args.plain)) as fake:
+        _configure_env(fake.base_url)
+        from app.main import app  # import tardío: config lee el entorno al importar
+
+        headers = {"Authorization": f"Bearer {_admin_token()}", "Accept-Encoding": "gzip"}
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app), \
+                httpx.AsyncClient(transport=transport, base_url="http://report", timeout=300) as cx:
+            # Calienta workers (import de reportlab) y el aprendizaje de tamaño de página
+            await _drive(cx, endpoints, min(args.concurrency, len(endpoints)), headers)
+            print(f"upstreams: teams={args.teams} players={args.players} matches={args.matches} "
+                  f"latency={args.latency_ms}+{args.jitter_ms}ms plain={args.plain or '-'}")
+            print(f"concurrency={args.concurrency} requests/endpoint={args.requests}\n")
+            print(f"{'endpoint':<32} {'reqs':>6} {'errs':>5} {'req/s':>8} "
+                  f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'RSS MiB':>8}")
+            for path in endpoints:
+                r = results[path] = await _drive(cx, [path] * args.requests, args.concurrency, headers)
+                print(_row(path, r, base.get(path)))
+            if not args.no_mix:
+                mix = [p for _ in range(args.requests) for p in endpoints]
+                r = results["mix"] = await _drive(cx, mix, args.concurrency, headers)
+                print(_row("mix", r, base.get("mix")))
+        print(f"\nupstream requests: {fake.requests}, connections: {len(fake.connections)}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""
+Benchmark: tiempo de render de reportlab según cantidad de filas.
+
+Renderiza en proceso (sin API ni upstreams) los reportes tabulares con
+datasets sintéticos y muestra ms totales y µs por fila: si el layout escala
+lineal, µs/fila se mantiene plano de 100 a 100k filas.
+
+Uso (desde report-service/):
+    python -m bench.bench_pdf
+    python -m bench.bench_pdf --rows 100 1000 10000 --reports teams --memory
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from app import pdf_utils
+
+
+def _teams(n: int) -> list[dict[str, Any]]:
+    return [{"id": i, "name": f"Equipo {i}", "city": f"Ciudad {i % 97}", "coach": f"DT {i}"}
+            for i in range(1, n + 1)]
+
+def _players(n: int) -> list[dict[str, Any]]:
+    return [{"name": f"Jugador {i}", "age": 18 + i % 20, "position": ("G", "F", "C")[i % 3],
+             "teamId": str(1 + i % 50)} for i in range(n)]
+
+def _matches(n: int) -> list[dict[str, Any]]:
+    return [{"id": i, "date": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T20:00:00Z",
+             "status": "Finished", "homeTeamId": str(1 + i % 50), "awayTeamId": str(1 + (i + 7) % 50),
+             "homeScore": 80 + i % 30, "awayScore": 75 + i % 33} for i in range(n)]
+
+_TMAP = {str(i): f"Equipo {i}" for i in range(1, 51)}
+
+REPORTS: dict[str, Callable[[str, int], None]] = {
+    "teams": lambda path, n: pdf_utils.write_pdf(path, pdf_utils.build_pdf_teams, _teams(n)),
+    "players_all": lambda path, n: pdf_utils.write_pdf_all_players(path, _players(n), _TMAP),
+    "history": lambda path, n: pdf_utils.write_pdf_matches_history(path, _matches(n), None, None, _TMAP),
+}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10_000, 100_000])
+    ap.add_argument("--reports", nargs="+", choices=list(REPORTS), default=list(REPORTS))
+    ap.add_argument("--memory", action="store_true", help="pico de memoria (tracemalloc, más lento)")
+    args = ap.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    REPORTS["teams"](path, 10)  # calienta fuentes y estilos
+    try:
+        print(f"{'report':<12} {'rows':>8} {'ms':>10} {'µs/row':>8} {'KiB':>8}" + (f" {'peak MiB':>9}" if args.memory else ""))
+        for name in args.reports:
+            for n in args.rows:
+                if args.memory:
+                    tracemalloc.start()
+                t0 = time.perf_counter()
+                REPORTS[name](path, n)
+                ms = (time.perf_counter() - t0) * 1000
+                extra = ""
+                if args.memory:
+                    extra = f" {tracemalloc.get_traced_memory()[1] / 2**20:>9.1f}"
+                    tracemalloc.stop()
+                size = os.path.getsize(path) / 1024
+                print(f"{name:<12} {n:>8} {ms:>10.0f} {ms * 1000 / n:>8.0f} {size:>8.0f}{extra}")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: reutilización de conexiones hacia los upstreams.
+
+Levanta upstreams falsos en un puerto local, apunta report-service a ellos y
+dispara N peticiones concurrentes a /reports/*. Al final compara llamadas HTTP
+al upstream contra conexiones TCP realmente abiertas.
+
+Uso (desde report-service/):
+    python -m bench.bench_pool --concurrency 20 --rounds 5
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from .fake_upstreams import running
+
+BENCH_SECRET = "bench-secret"
+ENDPOINTS = [
+    "/reports/teams.pdf",
+    "/reports/players/all.pdf",
+    "/reports/teams/1/players.pdf",
+    "/reports/matches/history.pdf",
+    "/reports/standings",
+    "/reports/stats/summary",
+    "/reports/matches/1/roster.pdf",
+]
+
+
+def _configure_env(base_url: str) -> None:
+    os.environ["TEAMS_API_BASE"] = base_url
+    os.environ["PLAYERS_API_BASE"] = base_url
+    os.environ["MATCHES_API_BASE"] = base_url
+    os.environ["AUTH_HS256_SECRET"] = BENCH_SECRET
+    os.environ.pop("AUTH_PUBLIC_KEY_PEM", None)
+
+def _admin_token() -> str:
+    from jose import jwt
+    from app.deps_auth import AUD, ISS
+    claims = {"sub": "bench", "role": "Admin", "aud": AUD, "iss": ISS,
+              "exp": int(time.time()) + 3600}
+    return jwt.encode(claims, BENCH_SECRET, algorithm="HS256")
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=20)
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--teams", type=int, default=50)
+    ap.add_argument("--players", type=int, default=1000)
+    ap.add_argument("--matches", type=int, default=2000)
+    args = ap.parse_args()
+
+    async with running(teams=args.teams, players=args.players, matches=args.matches) as fake:
+        _configure_env(fake.base_url)
+        from app import cache, clients, render
+        from app.main import app  # import tardío: config lee el entorno al importar
+
+        headers = {"Authorization": f"Bearer {_admin_token()}"}
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app), \
+                httpx.AsyncClient(transport=transport, base_url="http://report") as cx:
+            sem = asyncio.Semaphore(args.concurrency)
+
+            async def one(path: str) -> int:
+                async with sem:
+                    r = await cx.get(path, headers=headers)
+                    return r.status_code
+
+            paths = [p for _ in range(args.rounds) for p in ENDPOINTS]
+            t0 = time.perf_counter()
+            codes = await asyncio.gather(*(one(p) for p in paths))
+            elapsed = time.perf_counter() - t0
+
+    bad = [c for c in codes if c != 200]
+    print(f"report requests     : {len(paths)} ({len(bad)} non-200)")
+    print(f"elapsed             : {elapsed:.2f}s ({len(paths) / elapsed:.1f} req/s)")
+    print(f"upstream requests   : {fake.requests}")
+    print(f"upstream connections: {len(fake.connections)}")
+    if fake.connections:
+        print(f"requests/connection : {fake.requests / len(fake.connections):.1f}")
+    print(f"single-flight       : {clients.flight_stats()}")
+    print(f"response cache      : {cache.cache_stats()}")
+    print(f"pdf render          : {render.render_stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
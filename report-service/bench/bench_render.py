@@ -0,0 +1,113 @@
+"""
+Benchmark: render de PDF dentro vs. fuera del event loop.
+
+Dispara PDFs grandes (players/all.pdf) en paralelo y, mientras tanto, sondea
+/health cada 10 ms. Con render en el loop /health se congela; con el pool no.
+Imprime la latencia de /health y la espera en cola vs. tiempo de render.
+
+Uso (desde report-service/):
+    python -m bench.bench_render --executor process --renders 16
+    python -m bench.bench_render --executor inline   # línea base (sin pool)
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from .bench_pool import _admin_token, _configure_env
+from .fake_upstreams import running
+
+
+def _pct(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--executor", choices=["process", "thread", "inline"], default="process")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    ap.add_argument("--renders", type=int, default=16)
+    ap.add_argument("--players", type=int, default=3000)
+    ap.add_argument("--path", default="/reports/players/all.pdf")
+    args = ap.parse_args()
+
+    os.environ["PDF_RENDER_EXECUTOR"] = "thread" if args.executor == "inline" else args.executor
+    os.environ["PDF_RENDER_WORKERS"] = str(args.workers)
+    os.environ["PDF_RENDER_MAX_PENDING"] = str(max(args.renders, args.workers))
+    # Upstream memoizado: se mide el render, no la descarga
+    os.environ.setdefault("UPSTREAM_MEMO_TTL_SECONDS", "60")
+
+    async with running(teams=50, players=args.players, matches=10) as fake:
+        _configure_env(fake.base_url)
+        from app import render
+        from app.main import app
+
+        if args.executor == "inline":
+            # Línea base: el builder corre en el event loop como antes del pool
+            async def inline(fn, *fargs):
+                return fn(*fargs)
+
+            async def inline_to_file(fn, *fargs):
+                fd, path = tempfile.mkstemp(suffix=".pdf")
+                os.close(fd)
+                fn(path, *fargs)
+                return path
+            render.render = inline
+            render.render_to_file = inline_to_file
+
+        headers = {"Authorization": f"Bearer {_admin_token()}"}
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app), \
+                httpx.AsyncClient(transport=transport, base_url="http://report", timeout=300) as cx:
+            # Calienta upstreams y workers (import de reportlab en cada proceso)
+            await cx.get(args.path, headers=headers)
+
+            done = asyncio.Event()
+            health_ms: list[float] = []
+
+            async def probe() -> None:
+                # Se mide el ciclo completo (sleep incluido): si el loop está
+                # bloqueado el sleep de 10 ms se estira hasta que se libera.
+                while not done.is_set():
+                    t = time.perf_counter()
+                    await asyncio.sleep(0.01)
+                    await cx.get("/health")
+                    health_ms.append((time.perf_counter() - t) * 1000 - 10)
+
+            async def one() -> int:
+                r = await cx.get(args.path, headers=headers)
+                return r.status_code
+
+            prober = asyncio.create_task(probe())
+            t0 = time.perf_counter()
+            codes = await asyncio.gather(*(one() for _ in range(args.renders)))
+            elapsed = time.perf_counter() - t0
+            done.set()
+            await prober
+
+    bad = [c for c in codes if c != 200]
+    print(f"executor               : {args.executor} (workers={args.workers})")
+    print(f"renders                : {len(codes)} ({len(bad)} non-200) in {elapsed:.2f}s")
+    print(f"/health probes         : {len(health_ms)}")
+    if health_ms:
+        print(f"/health lag p50/p99/max: {statistics.median(health_ms):.1f} / "
+              f"{_pct(health_ms, 0.99):.1f} / {max(health_ms):.1f} ms")
+    if args.executor != "inline":
+        s = render.render_stats()
+        n = s["renders"] or 1
+        print(f"queue wait avg/max     : {s['wait_ms_total'] / n:.1f} / {s['wait_ms_max']:.1f} ms")
+        print(f"render avg/max         : {s['render_ms_total'] / n:.1f} / {s['render_ms_max']:.1f} ms")
+        print(f"render stats           : {s}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+Benchmark: agregación de estadísticas por equipo y rankings top-k.
+
+Por tamaño compara:
+  loop       el bucle por dict anterior (int()/.get() por partido)
+  load+agg   leaguestats.load_matches + aggregate desde los mismos dicts
+  agg        aggregate sobre columnas ya armadas (sin dicts)
+Los dicts se generan solo hasta --max-dict-rows (10M dicts no caben en memoria
+razonable); por encima se mide solo la agregación columnar.
+
+Después, los 4 rankings del resumen: sorted() completo vs top_k (selección parcial).
+
+Uso (desde report-service/, con ../shared en PYTHONPATH):
+    python -m bench.bench_stats
+    python -m bench.bench_stats --rows 10000 1000000 10000000 --teams 50 --rank-teams 100000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Any, Callable
+
+import numpy as np
+
+import leaguestats
+
+from app.aggregators import SUMMARY_RANKINGS, SUMMARY_TOP
+
+
+def _legacy(matches: list[dict[str, Any]], tmap: dict[str, str]) -> dict[str, dict[str, Any]]:
+    """Copia del agregador previo (referencia)."""
+    def _i(v, default=0) -> int:
+        try: return int(v)
+        except Exception: return default
+    stats: dict[str, dict[str, Any]] = {}
+    def ensure(team_id: str) -> dict[str, Any]:
+        if team_id not in stats:
+            stats[team_id] = {"teamId": team_id, "team": tmap.get(team_id, team_id),
+                              "played": 0, "wins": 0, "losses": 0, "pf": 0, "pa": 0}
+        return stats[team_id]
+    for m in matches:
+        h_id = str(m.get("HomeTeamId") or m.get("homeTeamId") or "")
+        a_id = str(m.get("AwayTeamId") or m.get("awayTeamId") or "")
+        hs   = _i(m.get("HomeScore") or m.get("homeScore"))
+        as_  = _i(m.get("AwayScore") or m.get("awayScore"))
+        if not h_id or not a_id:
+            continue
+        H = ensure(h_id); A = ensure(a_id)
+        H["played"] += 1; A["played"] += 1
+        H["pf"] += hs; H["pa"] += as_
+        A["pf"] += as_; A["pa"] += hs
+        if hs > as_: H["wins"] += 1; A["losses"] += 1
+        elif as_ > hs: A["wins"] += 1; H["losses"] += 1
+    return stats
+
+def _columns(n: int, teams: int, seed: int = 7) -> leaguestats.MatchColumns:
+    rng = np.random.default_rng(seed)
+    home = rng.integers(0, teams, n)
+    away = (home + rng.integers(1, teams, n)) % teams
+    return leaguestats.from_arrays([str(i + 1) for i in range(teams)], home, away,
+                                   rng.integers(60, 120, n), rng.integers(60, 120, n))
+
+def _dicts(cols: leaguestats.MatchColumns) -> list[dict[str, Any]]:
+    ids = cols.team_ids
+    return [{"homeTeamId": ids[h], "awayTeamId": ids[a], "homeScore": hs, "awayScore": as_}
+            for h, a, hs, as_ in zip(cols.home.tolist(), cols.away.tolist(),
+                                     cols.home_score.tolist(), cols.away_score.tolist())]
+
+def _ms(fn: Callable[[], Any]) -> tuple[float, Any]:
+    t0 = time.perf_counter()
+    out = fn()
+    return (time.perf_counter() - t0) * 1000, out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    ap.add_argument("--teams", type=int, default=50)
+    ap.add_argument("--max-dict-rows", type=int, default=1_000_000)
+    ap.add_argument("--rank-teams", type=int, nargs="+", default=[50, 10_000, 1_000_000])
+    args = ap.parse_args()
+    tmap = {str(i + 1): f"Equipo {i + 1}" for i in range(args.teams)}
+
+    print(f"{'matches':>10} {'path':<9} {'ms':>10} {'matches/s':>14}")
+    for n in args.rows:
+        cols = _columns(n, args.teams)
+        if n <= args.max_dict_rows:
+            matches = _dicts(cols)
+            ms_loop, ref = _ms(lambda: _legacy(matches, tmap))
+            ms_load, table = _ms(lambda: leaguestats.aggregate(leaguestats.load_matches(matches), tmap))
+            got = {r["teamId"]: r for r in table.records()}
+            assert all(got[t][c] == ref[t][c] for t in ref for c in leaguestats.STAT_COLUMNS)
+            del matches
+            for path, ms in (("loop", ms_loop), ("load+agg", ms_load)):
+                print(f"{n:>10} {path:<9} {ms:>10.1f} {n / ms * 1000:>14,.0f}")
+        ms_agg, _ = _ms(lambda: leaguestats.aggregate(cols, tmap))
+        print(f"{n:>10} {'agg':<9} {ms_agg:>10.1f} {n / ms_agg * 1000:>14,.0f}")
+
+    print(f"\n{'teams':>10} {'rankings':<9} {'ms':>10}")
+    for t in args.rank_teams:
+        rng = np.random.default_rng(t)
+        stats = {c: rng.integers(0, 1000, t) for c in leaguestats.STAT_COLUMNS}
+        table = leaguestats.LeagueTable([str(i) for i in range(t)], [f"Equipo {i}" for i in range(t)], stats)
+        values = table.records()
+        sort_keys: list[Callable[[dict[str, Any]], Any]] = [
+            lambda s: (-s["wins"], s["team"]), lambda s: (-s["pf"], s["team"]),
+            lambda s: (s["pf"], s["team"]), lambda s: (s["losses"], -s["wins"], s["team"]),
+        ]
+        ms_sorted, ref = _ms(lambda: [sorted(values, key=k)[:SUMMARY_TOP] for k in sort_keys])
+        ms_topk, got = _ms(lambda: [table.records(table.top(SUMMARY_TOP, *order))
+                                    for _, _, order in SUMMARY_RANKINGS])
+        assert [[r["teamId"] for r in x] for x in ref] == [[r["teamId"] for r in x] for x in got]
+        print(f"{t:>10} {'sorted':<9} {ms_sorted:>10.2f}")
+        print(f"{t:>10} {'top_k':<9} {ms_topk:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
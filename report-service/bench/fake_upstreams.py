@@ -0,0 +1,152 @@
+"""
+Upstreams falsos (teams/players/matches) para benchmarks locales.
+
+Reproducen las formas de respuesta reales:
+  - teams-service   (Spring):  {content, number, totalPages, last}
+  - players-service (Express): {items, totalCount}
+  - matches-service (.NET):    {content, number, totalPages, last}
+Con `plain` los servicios indicados responden una lista JSON completa sin
+paginar (como un upstream que ignora page/size).
+
+`latency_ms` (+ `jitter_ms` uniforme) se agrega a cada respuesta con
+asyncio.sleep: simula red/base de datos sin gastar CPU del proceso.
+
+Cada petición registra el par (host, puerto) del cliente, de modo que el
+número de pares distintos es el número de conexiones TCP abiertas.
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import socket
+from contextlib import asynccontextmanager
+from typing import Any
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+
+
+def _teams(n: int) -> list[dict[str, Any]]:
+    return [{"id": i, "name": f"Team {i}", "city": f"City {i % 17}", "coach": f"Coach {i}"}
+            for i in range(1, n + 1)]
+
+def _players(n: int, teams: int) -> list[dict[str, Any]]:
+    return [{"id": i, "name": f"Player {i}", "age": 18 + i % 20, "position": "G",
+             "teamId": 1 + i % teams} for i in range(1, n + 1)]
+
+def _matches(n: int, teams: int) -> list[dict[str, Any]]:
+    out = []
+    for i in range(1, n + 1):
+        h = 1 + i % teams; a = 1 + (i * 7 + 3) % teams
+        if a == h: a = 1 + h % teams
+        out.append({"id": i, "homeTeamId": h, "awayTeamId": a,
+                    "homeScore": (i * 13) % 90, "awayScore": (i * 29) % 90,
+                    "status": "Finished", "dateMatch": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}T18:00:00"})
+    return out
+
+def _spring_page(rows: list[dict[str, Any]], page: int, size: int) -> dict[str, Any]:
+    total_pages = max(1, -(-len(rows) // size))
+    return {"content": rows[page * size:(page + 1) * size], "number": page,
+            "size": size, "totalPages": total_pages, "totalElements": len(rows),
+            "last": page >= total_pages - 1}
+
+
+class FakeUpstreams:
+    def __init__(
+        self, teams: int = 50, players: int = 1000, matches: int = 2000,
+        latency_ms: float = 0.0, jitter_ms: float = 0.0, plain: tuple[str, ...] = (),
+    ):
+        self.teams = _teams(teams)
+        self.players = _players(players, teams)
+        self.matches = _matches(matches, teams)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.plain = set(plain)
+        self.connections: set[tuple[str, int]] = set()
+        self.requests = 0
+        self.port = 0
+        self.app = self._build_app()
+        self._server: uvicorn.Server | None = None
+        self._task: asyncio.Task | None = None
+
+    def reset_counters(self) -> None:
+        self.connections.clear()
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.middleware("http")
+        async def _count(request: Request, call_next):
+            self.requests += 1
+            if request.client:
+                self.connections.add((request.client.host, request.client.port))
+            delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+            if delay > 0:
+                await asyncio.sleep(delay / 1000)
+            return await call_next(request)
+
+        @app.get("/api/teams")
+        async def teams(page: int = 0, size: int = 100):
+            if "teams" in self.plain:
+                return self.teams
+            return _spring_page(self.teams, page, size)
+
+        @app.get("/api/teams/{team_id}")
+        async def team(team_id: int):
+            for t in self.teams:
+                if t["id"] == team_id:
+                    return t
+            raise HTTPException(status_code=404)
+
+        @app.get("/api/players")
+        async def players(page: int = 0, size: int = 100, teamId: int | None = None):
+            rows = self.players if teamId is None else [p for p in self.players if p["teamId"] == teamId]
+            if "players" in self.plain:
+                return rows
+            return {"items": rows[page * size:(page + 1) * size], "totalCount": len(rows)}
+
+        @app.get("/api/matches")
+        async def matches(page: int = 0, size: int = 100):
+            if "matches" in self.plain:
+                return self.matches
+            return _spring_page(self.matches, page, size)
+
+        @app.get("/api/matches/{match_id}")
+        async def match(match_id: int):
+            if 1 <= match_id <= len(self.matches):
+                return self.matches[match_id - 1]
+            raise HTTPException(status_code=404)
+
+        return app
+
+    async def start(self) -> None:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("127.0.0.1", 0))
+        self.port = sock.getsockname()[1]
+        config = uvicorn.Config(self.app, log_level="warning", lifespan="off")
+        self._server = uvicorn.Server(config)
+        self._task = asyncio.create_task(self._server.serve(sockets=[sock]))
+        while not self._server.started:
+            await asyncio.sleep(0.01)
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.should_exit = True
+        if self._task:
+            await self._task
+
+
+@asynccontextmanager
+async def running(**options: Any):
+    fake = FakeUpstreams(**options)
+    await fake.start()
+    try:
+        yield fake
+    finally:
+        await fake.stop()
@@ -0,0 +1,6 @@
+from __future__ import annotations
+import os, sys
+
+# Como en la imagen: /app/app + /app/leaguestats
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), os.path.join(HERE, "..", "..", "shared")]
@@ -0,0 +1,78 @@
+from __future__ import annotations
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app import config, jobs, render, reports
+from app.jobs import JobManager, LocalDiskStore
+from app.planner import Creds
+from app.reports import Prepared
+
+
+def write_slow(path: str, seconds: float) -> None:
+    """Builder de spool lento (función de módulo, como los write_* de pdf_utils)."""
+    time.sleep(seconds)
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4 slow")
+
+
+@pytest.fixture
+def renderer(monkeypatch, tmp_path):
+    # Un worker y un solo lugar: timeout interactivo corto, jobs sin límite
+    r = render.Renderer("thread", 1, 1, timeout=0.1, job_timeout=None)
+    monkeypatch.setattr(render, "_renderer", r)
+    monkeypatch.setattr(config, "PDF_SPOOL_DIR", str(tmp_path / "spool"))
+    (tmp_path / "spool").mkdir()
+    yield r
+    r.shutdown()
+
+
+def slow_report(monkeypatch, seconds: float) -> None:
+    async def prepare(_creds: Creds) -> Prepared:
+        return Prepared("slow.pdf", [], reports._ready(write_slow, seconds), spool=True)
+    monkeypatch.setitem(reports.REPORTS, "slow", (prepare, (), ()))
+
+
+async def wait_finished(job: jobs.Job, limit: float = 5) -> None:
+    t0 = time.monotonic()
+    while job.finished_at is None:
+        assert time.monotonic() - t0 < limit, job.public()
+        await asyncio.sleep(0.02)
+
+
+def test_job_render_outlives_interactive_timeout(renderer, monkeypatch, tmp_path):
+    async def go():
+        slow_report(monkeypatch, 0.3)                 # 3x el timeout de los endpoints
+        m = JobManager(LocalDiskStore(str(tmp_path / "jobs")), 1, 10, 3600)
+        job = m.submit("slow", {}, Creds())
+        await wait_finished(job)
+        assert job.status == "done", job.error
+        with open(m.artifact(job), "rb") as f:
+            assert f.read() == b"%PDF-1.4 slow"
+        assert renderer.stats.timeouts == 0
+        await m.close()
+    asyncio.run(go())
+
+
+def test_job_waits_for_a_pool_slot_instead_of_503(renderer, monkeypatch, tmp_path):
+    async def go():
+        slow_report(monkeypatch, 0.05)
+        # Un PDF de endpoint abandonado por timeout sigue ocupando el único lugar
+        with pytest.raises(HTTPException) as e:
+            await render.render_to_file(write_slow, 0.3)
+        assert e.value.status_code == 504 and renderer._pending == 1
+        with pytest.raises(HTTPException) as e:
+            await render.render_to_file(write_slow, 0.01)
+        assert e.value.status_code == 503
+
+        m = JobManager(LocalDiskStore(str(tmp_path / "jobs")), 1, 10, 3600)
+        job = m.submit("slow", {}, Creds())
+        await asyncio.sleep(0.05)
+        assert job.stage == "rendering" and len(renderer._waiters) == 1
+        await wait_finished(job)
+        assert job.status == "done", job.error
+        assert renderer._pending == 0 and not renderer._waiters
+        await m.close()
+    asyncio.run(go())
@@ -0,0 +1,25 @@
+from __future__ import annotations
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app import planner, reports
+from app.planner import Creds
+
+
+@pytest.fixture
+def no_stats(monkeypatch):
+    """El read-model no tiene estadísticas del jugador (el ETL aún no corrió)."""
+    async def fetch(_creds, **needs):
+        return {name: None for name in needs}
+    monkeypatch.setattr(planner, "fetch", fetch)
+
+
+def test_player_stats_pdf_is_404_like_json(no_stats):
+    with pytest.raises(HTTPException) as pdf:
+        asyncio.run(reports.player_stats(Creds(), "7"))
+    with pytest.raises(HTTPException) as json_:
+        asyncio.run(reports.fetch_player_stats(Creds(), "7"))
+    assert pdf.value.status_code == json_.value.status_code == 404
+    assert pdf.value.detail == json_.value.detail
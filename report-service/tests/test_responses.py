@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from app.responses import BodyCache
+
+
+def test_put_replacing_a_key_keeps_size_exact():
+    c = BodyCache(10_000)
+    first = c.put("k", b"x" * 1000)
+    c.variant("k", first, "gzip")
+    c.put("k", b"y" * 300)                      # p. ej. dos requests que serializaron a la vez
+    assert c.size == 300
+
+    stale = c.put("k", b"z" * 500)
+    c.put("k", b"w" * 200)
+    c.variant("k", stale, "gzip")               # variante de un item ya reemplazado: no se cuenta
+    assert c.size == 200
+    assert sum(len(b) for v in c._items.values() for b in v.values()) == c.size
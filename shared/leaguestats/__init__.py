@@ -0,0 +1,26 @@
+"""Estadísticas de liga en columnas NumPy, compartidas por report-service y etl-service."""
+from .engine import (
+    STAT_COLUMNS,
+    STATS_SKIP_STATUSES,
+    LeagueTable,
+    MatchColumns,
+    SortKey,
+    aggregate,
+    counts_for_stats,
+    from_arrays,
+    load_matches,
+    top_k,
+)
+
+__all__ = [
+    "STAT_COLUMNS",
+    "STATS_SKIP_STATUSES",
+    "LeagueTable",
+    "MatchColumns",
+    "SortKey",
+    "aggregate",
+    "counts_for_stats",
+    "from_arrays",
+    "load_matches",
+    "top_k",
+]
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Mapping, Optional, Sequence
+
+import numpy as np
+
+# Motor de estadísticas por equipo (compartido por report-service y etl-service).
+# Los partidos se cargan una vez a columnas NumPy (ids de equipo como códigos
+# enteros) y las métricas salen de reducciones agrupadas (bincount); los rankings
+# usan selección parcial en vez de ordenar todos los equipos.
+
+# Columnas numéricas de la tabla, en el orden de los registros
+STAT_COLUMNS = ("played", "wins", "losses", "pf", "pa")
+
+# (columna, descendente); el nombre del equipo es siempre el último desempate
+SortKey = tuple[str, bool]
+
+# Estados (sin distinguir mayúsculas) que no suman a la tabla: un partido
+# programado 0-0 no es un partido jugado. Lo leen ETL y reportes por igual.
+STATS_SKIP_STATUSES = frozenset(
+    s.strip().lower()
+    for s in os.getenv("STATS_SKIP_STATUSES", "scheduled,live,canceled,cancelled,suspended").split(",")
+    if s.strip()
+)
+
+
+# -------------------------
+# Carga a columnas
+# -------------------------
+@dataclass
+class MatchColumns:
+    team_ids: list[str]          # código -> id de equipo
+    home: np.ndarray             # código del local por partido
+    away: np.ndarray
+    home_score: np.ndarray
+    away_score: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.home)
+
+def _score(v: Any) -> int:
+    if type(v) is int:
+        return v
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return 0
+
+def counts_for_stats(m: Mapping[str, Any]) -> bool:
+    """Un partido (API cruda o normalizado) suma a la tabla si tiene ambos equipos y no está en STATS_SKIP_STATUSES."""
+    return bool((m.get("HomeTeamId") or m.get("homeTeamId")) and (m.get("AwayTeamId") or m.get("awayTeamId"))) and \
+        str(m.get("Status") or m.get("status") or "").strip().lower() not in STATS_SKIP_STATUSES
+
+def load_matches(matches: Iterable[Mapping[str, Any]]) -> MatchColumns:
+    """
+    Partidos (API cruda o normalizados por el ETL) -> columnas. Solo entran
+    los que cuentan (counts_for_stats); marcadores no numéricos cuentan como 0.
+    """
+    index: dict[str, int] = {}
+    intern = index.setdefault
+    home: list[int] = []
+    away: list[int] = []
+    hs: list[int] = []
+    as_: list[int] = []
+    for m in matches:
+        if not counts_for_stats(m):
+            continue
+        h = str(m.get("HomeTeamId") or m.get("homeTeamId"))
+        a = str(m.get("AwayTeamId") or m.get("awayTeamId"))
+        home.append(intern(h, len(index)))
+        away.append(intern(a, len(index)))
+        hs.append(_score(m.get("HomeScore") or m.get("homeScore")))
+        as_.append(_score(m.get("AwayScore") or m.get("awayScore")))
+    return MatchColumns(
+        list(index),
+        np.array(home, dtype=np.intp), np.array(away, dtype=np.intp),
+        np.array(hs, dtype=np.int64), np.array(as_, dtype=np.int64),
+    )
+
+def from_arrays(team_ids: Sequence[str], home: Any, away: Any, home_score: Any, away_score: Any) -> MatchColumns:
+    """Columnas ya armadas (p. ej. una proyección de Mongo o un benchmark)."""
+    return MatchColumns(
+        list(team_ids),
+        np.asarray(home, dtype=np.intp), np.asarray(away, dtype=np.intp),
+        np.asarray(home_score, dtype=np.int64), np.asarray(away_score, dtype=np.int64),
+    )
+
+
+# -------------------------
+# Agregación
+# -------------------------
+@dataclass
+class LeagueTable:
+    team_ids: list[str]
+    names: list[str]
+    stats: dict[str, np.ndarray] = field(default_factory=dict)   # STAT_COLUMNS -> int64[n]
+
+    def __len__(self) -> int:
+        return len(self.team_ids)
+
+    @property
+    def diff(self) -> np.ndarray:
+        return self.stats["pf"] - self.stats["pa"]
+
+    def _key(self, name: str) -> np.ndarray:
+        return self.diff if name == "diff" else self.stats[name]
+
+    def top(self, k: Optional[int], *by: SortKey) -> np.ndarray:
+        """Índices de los k primeros según `by` (+ nombre); k=None ordena todo."""
+        keys = [-self._key(c) if desc else self._key(c) for c, desc in by]
+        keys.append(np.array(self.names, dtype=str))
+        return top_k(keys, len(self) if k is None else k)
+
+    def records(self, order: Optional[Sequence[int]] = None, name_key: str = "team") -> list[dict[str, Any]]:
+        """Filas como dicts (ints de Python) en el orden dado (por defecto, el de carga)."""
+        idx = np.arange(len(self)) if order is None else np.asarray(order, dtype=np.intp)
+        cols = {c: self.stats[c][idx].tolist() for c in STAT_COLUMNS}
+        diff = self.diff[idx].tolist()
+        out: list[dict[str, Any]] = []
+        for j, i in enumerate(idx.tolist()):
+            row: dict[str, Any] = {"teamId": self.team_ids[i], name_key: self.names[i]}
+            for c in STAT_COLUMNS:
+                row[c] = cols[c][j]
+            row["diff"] = diff[j]
+            out.append(row)
+        return out
+
+    def to_columns(self) -> dict[str, list[Any]]:
+        """Forma serializable (cache msgpack/JSON)."""
+        return {"teamId": self.team_ids, "team": self.names,
+                **{c: self.stats[c].tolist() for c in STAT_COLUMNS}}
+
+    @classmethod
+    def from_columns(cls, cols: Mapping[str, Sequence[Any]]) -> "LeagueTable":
+        return cls(list(cols["teamId"]), list(cols["team"]),
+                   {c: np.asarray(cols[c], dtype=np.int64) for c in STAT_COLUMNS})
+
+def aggregate(cols: MatchColumns, names: Optional[Mapping[str, str]] = None) -> LeagueTable:
+    """PJ/PG/PP/PF/PC por equipo con reducciones agrupadas sobre los códigos."""
+    n = len(cols.team_ids)
+    home, away, hs, as_ = cols.home, cols.away, cols.home_score, cols.away_score
+
+    def count(idx: np.ndarray) -> np.ndarray:
+        return np.bincount(idx, minlength=n).astype(np.int64)
+
+    def total(idx: np.ndarray, w: np.ndarray) -> np.ndarray:
+        # bincount acumula en float64: exacto hasta 2**53 puntos por equipo
+        return np.bincount(idx, weights=w, minlength=n).astype(np.int64)
+
+    home_won = hs > as_
+    away_won = as_ > hs
+    stats = {
+        "played": count(home) + count(away),
+        "wins": count(home[home_won]) + count(away[away_won]),
+        "losses": count(home[away_won]) + count(away[home_won]),
+        "pf": total(home, hs) + total(away, as_),
+        "pa": total(home, as_) + total(away, hs),
+    }
+    names = names or {}
+    return LeagueTable(cols.team_ids, [names.get(t, t) for t in cols.team_ids], stats)
+
+
+# -------------------------
+# Top-k
+# -------------------------
+def top_k(keys: Sequence[np.ndarray], k: int) -> np.ndarray:
+    """
+    Índices de las k filas menores en orden lexicográfico por `keys` (primaria
+    primero; para descendente se pasa la columna negada). La clave primaria se
+    selecciona con np.partition y solo se ordenan los candidatos (incluidos los
+    empates en el corte). Empates completos conservan el orden original.
+    """
+    primary = keys[0]
+    n = len(primary)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        kth = np.partition(primary, k - 1)[k - 1]
+        cand = np.flatnonzero(primary <= kth)
+    else:
+        cand = np.arange(n)
+    order = np.lexsort([key[cand] for key in reversed(keys)])
+    return cand[order[:k]]